@@ -1,5 +1,6 @@
 import click
 from .docker_compose import docker
+from .results import results
 from lume_services.config import configure
 
 
@@ -11,6 +12,7 @@ def main(ctx):
 
 
 main.add_command(docker)
+main.add_command(results)
 
 
 """
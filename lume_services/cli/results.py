@@ -0,0 +1,56 @@
+import click
+from lume_services import config
+
+
+@click.group()
+def results():
+    pass
+
+
+@results.command(help="Report profiled results queries and recommended indices.")
+@click.option(
+    "--collection",
+    default=None,
+    help="Name of the queried collection. Reports all collections if not passed.",
+)
+@click.option(
+    "--limit",
+    default=20,
+    help="Maximum number of query shapes reported.",
+)
+def index_report(collection, limit):
+    """CLI utility for reporting the query shapes recorded by results databases in
+    profile mode, slowest first in total, with indices recommended for queries
+    scanning collections or sorting in memory.
+
+    """
+    if config._settings is None or config._settings.results_db is None:
+        raise click.ClickException("Results database is not configured.")
+
+    results_db_service = config.context.results_db_service()
+    reports = results_db_service.get_index_report(collection=collection)
+
+    if not reports:
+        click.echo(
+            "No query profiles recorded. Queries are profiled with "
+            "LUME_RESULTS_DB__PROFILE=true."
+        )
+        return
+
+    for report in reports[:limit]:
+        click.echo(f"{report.collection} {report.query} sort={report.sort}")
+        click.echo(
+            f"  count {report.count}, mean {report.mean_ms:.1f} ms, max "
+            f"{report.max_ms:.1f} ms"
+        )
+
+        if report.explained:
+            click.echo(
+                f"  explained {report.explained}, collection scans "
+                f"{report.collscans}, in-memory sorts {report.in_memory_sorts}, "
+                f"examined per returned {report.docs_examined_per_returned:.1f}, "
+                f"indices {report.indices}"
+            )
+
+        if report.recommended_index is not None:
+            click.echo(f"  recommended index {report.recommended_index.fields}")
@@ -159,6 +159,20 @@ def configure(settings: Optional[LUMEServicesSettings] = None):
         filesystems=filesystems,
         scheduling_backend=backend
     )
+
+    if settings.results_db is not None:
+        context.results_db_service.add_kwargs(
+            write_behind=settings.results_db.write_behind,
+            write_batch_size=settings.results_db.write_batch_size,
+            write_flush_interval=settings.results_db.write_flush_interval,
+        )
+
+        # indices are built on startup rather than on the insert path
+        if settings.results_db.result_types:
+            context.results_db_service().configure_result_types(
+                settings.results_db.result_types
+            )
+
     _settings = settings
     logger.info("Environment configured.")
     logger.debug("Environment configured using %s", settings.dict())
@@ -1,3 +1,4 @@
 from .text import TextSerializer
 from .yaml import YAMLSerializer
 from .image import ImageSerializer
+from .hdf5 import HDF5ValueSerializer
@@ -0,0 +1,109 @@
+import re
+from typing import Any, Dict
+
+import h5py
+import numpy as np
+from lume.serializers.base import SerializerBase
+
+# dataset path, optional attribute and optional element index, e.g.
+# output/stats/norm_emit_x[-1] or @pv_collection_isotime
+_VALUE_ADDRESS = re.compile(
+    r"^(?P<path>[^@\[\]]*)(?:@(?P<attribute>[^@\[\]]+))?(?:\[(?P<index>-?\d+)\])?$"
+)
+
+
+class HDF5ValueSerializer(SerializerBase):
+    """Serializer of selected scalar values of an HDF5 file, loaded in one pass
+    without deserializing the archived object. Values are addressed by dataset path,
+    by path@attribute for attributes, and with a trailing [index] for an element of
+    a one-dimensional value.
+
+    """
+
+    def __init__(self, values: Dict[str, str]):
+        """
+        Args:
+            values (Dict[str, str]): Mapping of value name to address, e.g.
+                {"final_norm_emit_x": "output/stats/norm_emit_x[-1]"}
+
+        """
+        self._values = {}
+        for name, address in values.items():
+            match = _VALUE_ADDRESS.match(address)
+            if match is None:
+                raise ValueError(f"Invalid HDF5 value address {address}")
+
+            self._values[name] = (address, *match.groups())
+
+    def serialize(self, filename, object: Dict[str, Any]):
+        """Write values into an HDF5 file, created if missing. Other contents of the
+        file are left unchanged. Missing groups, datasets and attributes are
+        created, while elements addressed by index are written into existing
+        values.
+
+        Args:
+            filename (str): Name of the file
+            object (Dict[str, Any]): Mapping of value name to scalar value. Values
+                not passed are left unchanged.
+
+        """
+        unknown = set(object) - set(self._values)
+        if unknown:
+            raise ValueError(f"No address for values {sorted(unknown)}")
+
+        with h5py.File(filename, "a") as f:
+            for name, value in object.items():
+                _, path, attribute, index = self._values[name]
+
+                if np.ndim(value) != 0:
+                    raise ValueError(f"{name} is not a scalar")
+
+                if attribute is not None:
+                    path = path or "/"
+                    node = f[path] if path in f else f.create_group(path)
+                    if index is not None:
+                        values = np.array(node.attrs[attribute])
+                        values[int(index)] = value
+                        value = values
+
+                    node.attrs[attribute] = value
+
+                elif index is not None:
+                    f[path][int(index)] = value
+
+                # replaced, as the stored dtype may not hold the value
+                else:
+                    if path in f:
+                        del f[path]
+
+                    f.create_dataset(path, data=value)
+
+    def deserialize(self, filename) -> Dict[str, Any]:
+        values = {}
+
+        with h5py.File(filename, "r") as f:
+            for name, (address, path, attribute, index) in self._values.items():
+                node = f[path] if path else f
+
+                if attribute is not None:
+                    value = np.asarray(node.attrs[attribute])
+                    if index is not None:
+                        value = value[int(index)]
+
+                # read only the selected element of datasets
+                elif index is not None:
+                    value = node[int(index)]
+
+                else:
+                    value = node[()]
+
+                if np.ndim(value) != 0:
+                    raise ValueError(f"{address} of {filename} is not a scalar")
+
+                value = np.asarray(value).item()
+                if isinstance(value, (bytes,)):
+                    value = value.decode("utf-8")
+
+                values[name] = value
+
+        return values
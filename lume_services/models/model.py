@@ -1,5 +1,7 @@
+from datetime import datetime
+from itertools import islice
 from pydantic import BaseModel, root_validator
-from typing import Optional, List
+from typing import Dict, Iterator, Optional, List, Tuple
 import pandas as pd
 from importlib_metadata import distribution
 from dependency_injector.wiring import Provide
@@ -18,9 +20,13 @@ from lume_services.errors import (
 from lume_services.services.scheduling import SchedulingService
 from lume_services.flows.flow import Flow
 from lume_services.flows.flow_of_flows import FlowOfFlows
-from lume_services.results import Result
+from lume_services.results import LazyResult, Result, ResultsMirror
+from lume_services.results.generic import BlobStore
 from lume_services.files import get_file_from_serializer_string
-from lume_services.results.utils import get_result_from_string
+from lume_services.results.utils import (
+    get_result_from_string,
+    get_results_df_from_documents,
+)
 from lume_services.services.models.service import ModelDBService
 from lume_services.services.models.db.schema import (
     Model as ModelSchema,
@@ -28,7 +34,6 @@ from lume_services.services.models.db.schema import (
     Project as ProjectSchema,
 )
 from lume_services.services.results import ResultsDBService
-from lume_services.utils import flatten_dict
 
 import logging
 
@@ -457,6 +462,9 @@ class Model(BaseModel):
         model_db_service: ModelDBService = Provide[Context.model_db_service],
         all_deployments: bool = False,
         query: Optional[dict] = None,
+        lazy: bool = False,
+        time_range: Optional[Tuple[Optional[datetime], Optional[datetime]]] = None,
+        time_field: str = "date_modified",
     ):
         """Query model results.
 
@@ -469,6 +477,14 @@ class Model(BaseModel):
                 load the active deployment. If True is passed, the results from all
                 deployments will be returned.
             query (Optional[dict]): Query formatted using pymongo convention
+            lazy (bool): If True, LazyResults holding the raw documents are returned
+                and fields are decoded on access.
+            time_range (Optional[Tuple[Optional[datetime], Optional[datetime]]]):
+                Start, inclusive, and end, exclusive, of the time range of the
+                results. Either may be None for an open range. Results are returned
+                sorted by time.
+            time_field (str): Time field of the results selected by time_range, e.g.
+                pv_collection_isotime for ImpactResults
 
         """
 
@@ -476,45 +492,105 @@ class Model(BaseModel):
             query = {}
 
         results = []
-        if not all_deployments:
+        if time_range is not None:
+            start, end = time_range
+            flow_ids = self._get_flow_ids(model_db_service, all_deployments)
+            results = [
+                (project_name, res)
+                for project_name, project_flow_ids in flow_ids.items()
+                for res in results_db_service.find_time_range(
+                    collection=project_name,
+                    start=start,
+                    end=end,
+                    time_field=time_field,
+                    query={**query, "flow_id": {"$in": project_flow_ids}},
+                    raw=lazy,
+                )
+            ]
+
+        elif not all_deployments:
             query.update({"flow_id": self.deployment.flow.flow_id})
             project_name = self.deployment.flow.project_name
-            results = results_db_service.find(collection=project_name, query=query)
+            results = [
+                (project_name, res)
+                for res in results_db_service.find(
+                    collection=project_name, query=query, raw=lazy
+                )
+            ]
 
         else:
-            # require all flows
-            # these queries are bad. A join should be used instead, but going
-            # with it because of time constraints.
-            flow_ids = []
-            deployments = model_db_service.get_deployments(
-                model_id=self.metadata.model_id
+            flow_ids = model_db_service.get_model_flow_ids(self.metadata.model_id)
+
+            # flow ids are unique, so all project collections share one query
+            found = results_db_service.find_across(
+                list(flow_ids),
+                query={
+                    **query,
+                    "flow_id": {"$in": sum(flow_ids.values(), [])},
+                },
+                raw=lazy,
             )
-            for deployment in deployments:
-                flow = model_db_service.get_flow(deployment_id=deployment.deployment_id)
-
-                query["flow_id"] = flow.flow_id
-                results += results_db_service.find(
-                    collection=flow.project_name, query=query
-                )
-
-            query["flow_id"] = flow_ids
+            results = list(zip(found.collections, found.documents))
 
         res_objs = []
-        for res in results:
+        for project_name, res in results:
+            if lazy:
+                res_objs.append(LazyResult(res, project_name))
+                continue
+
             result_type_string = res.pop("result_type_string")
             res_type = get_result_from_string(result_type_string)
-            res_objs.append(res_type(**res))
+            res_objs.append(res_type(project_name=project_name, **res))
 
         return res_objs
 
+    def get_result_summary(
+        self,
+        results_db_service: ResultsDBService = Provide[Context.results_db_service],
+        model_db_service: ModelDBService = Provide[Context.model_db_service],
+        all_deployments: bool = False,
+    ) -> List[dict]:
+        """Get the materialized summaries of the model's flows: the run count, the
+        latest result and statistics of the summarized outputs. Summaries are read
+        by key and do not scan results. Flows of projects not configured for
+        summaries are omitted.
+
+        Args:
+            results_db_service (ResultsDBService): Results database service. Injected
+                if not provided.
+            model_db_service (ModelDBService): Model database service. Injected if
+                not provided.
+            all_deployments (bool): The default behavior is to
+                summarize the active deployment. If True is passed, the flows of all
+                deployments are summarized.
+
+        Returns:
+            List[dict]: One summary per flow
+
+        """
+        summaries = []
+        flow_ids = self._get_flow_ids(model_db_service, all_deployments)
+        for project_name, project_flow_ids in flow_ids.items():
+            summaries += [
+                {"project_name": project_name, **summary}
+                for summary in results_db_service.find_summaries(
+                    project_name, project_flow_ids
+                )
+            ]
+
+        return summaries
+
     def get_results_df(
         self,
         results_db_service: ResultsDBService = Provide[Context.results_db_service],
         model_db_service: ModelDBService = Provide[Context.model_db_service],
         all_deployments: bool = False,
         query: Optional[dict] = None,
-    ):
-        """Get results and format into a dataframe.
+        mirror: Optional[ResultsMirror] = None,
+    ) -> pd.DataFrame:
+        """Get results and format into a dataframe. Documents are streamed from the
+        database cursor into columns without constructing results. Columns of nested
+        fields are named by their dotted path, e.g. inputs.x and outputs.x.
 
         Args:
             query: Query formatted using Pymongo convention
@@ -525,21 +601,146 @@ class Model(BaseModel):
             deployments (bool): The default behavior is to
                 load the active deployment. If True is passed, the results from all
                 deployments will be returned.
+            mirror (Optional[ResultsMirror]): Local mirror of results. If provided,
+                only results stored since the last call are fetched and the
+                DataFrame is built from the mirror. Queries are not supported with a
+                mirror, filter the returned DataFrame instead.
+
+        """
+
+        if mirror is not None:
+            if query:
+                raise ValueError("Queries are not supported with a results mirror.")
+
+            frames = []
+            flow_ids = self._get_flow_ids(model_db_service, all_deployments)
+            for project_name, project_flow_ids in flow_ids.items():
+                for flow_id in project_flow_ids:
+                    mirror.sync(
+                        project_name, flow_id, results_db_service=results_db_service
+                    )
+                    frames.append(
+                        mirror.get_results_df(
+                            project_name, flow_id, results_db_service=results_db_service
+                        )
+                    )
+
+            return pd.concat(frames, ignore_index=True)
+
+        documents = self._iter_result_documents(
+            results_db_service=results_db_service,
+            model_db_service=model_db_service,
+            all_deployments=all_deployments,
+            query=query,
+        )
+
+        return get_results_df_from_documents(
+            documents, blob_store=BlobStore(results_db_service, write=False)
+        )
+
+    def iter_results_df(
+        self,
+        chunksize: int = 10000,
+        query: Optional[dict] = None,
+        fields: Optional[List[str]] = None,
+        results_db_service: ResultsDBService = Provide[Context.results_db_service],
+        model_db_service: ModelDBService = Provide[Context.model_db_service],
+        all_deployments: bool = False,
+    ) -> Iterator[pd.DataFrame]:
+        """Iterate over results in DataFrame chunks of bounded size. Documents are
+        read from a server-side cursor, so only one chunk is held in memory at a
+        time. Columns are formatted as in get_results_df. A chunk only has columns
+        for fields set in at least one of its results.
+
+        Args:
+            chunksize (int): Maximum number of results per chunk
+            query (Optional[dict]): Query formatted using Pymongo convention
+            fields (Optional[List[str]]): Stored fields to load, e.g.
+                ["inputs.x", "outputs.y"]. All fields are loaded if not provided.
+            results_db_service (ResultsDBService): Results database service. Injected
+                if not provided.
+            model_db_service (ModelDBService): Model database service. Injected if
+                not provided.
+            all_deployments (bool): The default behavior is to
+                load the active deployment. If True is passed, the results from all
+                deployments will be returned.
+
+        Returns:
+            Iterator[pd.DataFrame]: Chunks of at most chunksize results
+
+        Raises:
+            ValueError: If chunksize is not positive
 
         """
+        # checked before the generator is returned rather than on the first read
+        if chunksize < 1:
+            raise ValueError(f"chunksize must be positive, got {chunksize}")
 
-        results = self.get_results(
+        documents = self._iter_result_documents(
             results_db_service=results_db_service,
             model_db_service=model_db_service,
             all_deployments=all_deployments,
             query=query,
+            fields=fields,
+            batch_size=chunksize,
+        )
+        return self._iter_chunks(
+            documents, chunksize, BlobStore(results_db_service, write=False)
         )
 
-        flattened = [flatten_dict(res.dict()) for res in results]
-        df = pd.DataFrame(flattened)
+    def _iter_chunks(
+        self,
+        documents: Iterator[Tuple[str, dict]],
+        chunksize: int,
+        blob_store: BlobStore,
+    ) -> Iterator[pd.DataFrame]:
+        """Read chunks of result documents into DataFrames."""
+        try:
+            while True:
+                chunk = list(islice(documents, chunksize))
+                if not chunk:
+                    return
+
+                yield get_results_df_from_documents(chunk, blob_store=blob_store)
+
+        finally:
+            # release the cursor if iteration stops early
+            documents.close()
+
+    def _get_flow_ids(
+        self, model_db_service: ModelDBService, all_deployments: bool = False
+    ) -> Dict[str, List[str]]:
+        """Get flow ids of the active deployment, or of all deployments, grouped by
+        project name.
 
-        # Load DataFrame
-        # df["date"] = pd.to_datetime(df["pv_collection_isotime"])
-        #  df["_id"] = df["_id"].astype(str)
+        """
+        if not all_deployments:
+            return {self.deployment.flow.project_name: [self.deployment.flow.flow_id]}
+
+        return model_db_service.get_model_flow_ids(self.metadata.model_id)
+
+    def _iter_result_documents(
+        self,
+        results_db_service: ResultsDBService,
+        model_db_service: ModelDBService,
+        all_deployments: bool = False,
+        query: Optional[dict] = None,
+        fields: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Iterator[Tuple[str, dict]]:
+        """Stream stored result documents of the model from the database cursor.
+        Keyword arguments are passed to ResultsDBService.find_iter.
 
-        return df
+        Yields:
+            Tuple[str, dict]: Project name and stored document
+
+        """
+        query = dict(query or {})
+        flow_ids = self._get_flow_ids(model_db_service, all_deployments)
+
+        for project_name, project_flow_ids in flow_ids.items():
+            project_query = {**query, "flow_id": {"$in": project_flow_ids}}
+            for document in results_db_service.find_iter(
+                collection=project_name, query=project_query, fields=fields, **kwargs
+            ):
+                yield project_name, document
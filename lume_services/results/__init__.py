@@ -1,5 +1,6 @@
-from .generic import Result
+from .generic import HDF5Extractor, LazyResult, Result
 from .impact import ImpactResult
+from .mirror import ResultsMirror
 from .utils import (
     get_result_from_string,
     get_result_types,
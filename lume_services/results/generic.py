@@ -1,20 +1,36 @@
+import functools
+import hashlib
+import io
 import json
+from importlib import import_module
 from pydantic import BaseModel, root_validator, Field, Extra, validator
 from datetime import datetime
-from lume_services.services.results import ResultsDB
+from decimal import Decimal
+from lume_services.services.files import FileService
+from lume_services.services.results import (
+    ResultIndex,
+    ResultsDB,
+    ResultsDBService,
+    UpsertReport,
+)
 from lume_services.utils import fingerprint_dict
-from typing import List, Optional, Union, Dict
+from typing import Any, Callable, ClassVar, List, Optional, Tuple, Type, Union, Dict
 import numpy as np
 import pandas as pd
 import pickle
 
 from dependency_injector.wiring import Provide, inject
 from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
 from bson import Binary
+from bson.decimal128 import Decimal128
+from bson.errors import InvalidDocument
+import bson
 
 from lume_services.config import Context
-from lume_services.utils import JSON_ENCODERS
+from lume_services.utils import JSON_ENCODERS, get_callable_from_string
 from lume_services.files import File, get_file_from_serializer_string
+from lume_services.files.serializers import HDF5ValueSerializer
 
 from prefect import context as prefect_context
 
@@ -33,6 +49,194 @@ def round_datetime_to_milliseconds(time: Union[datetime, str]) -> datetime:
     return time
 
 
+# key marking encoded documents with the encoding type
+_ENCODING_KEY = "_lume_type"
+_ARRAY_ENCODING = "ndarray"
+_DATAFRAME_ENCODING = "dataframe"
+_BLOB_ENCODING = "blob"
+
+# map of supported compression codecs to the modules implementing them
+_COMPRESSION_MODULES = {
+    "zlib": "zlib",
+    "zstd": "zstandard",
+    "lz4": "lz4.frame",
+}
+
+
+class BlobStore:
+    """Content-addressed storage of large binary payloads of result documents.
+    Payloads above the blob threshold of the results database service are stored once
+    per sha256 hash and replaced in the document by a reference.
+
+    """
+
+    def __init__(self, results_db_service: ResultsDBService, write: bool = True):
+        """
+        Args:
+            results_db_service (ResultsDBService): Results database service used for
+                blob storage.
+            write (bool): Whether to write offloaded payloads. Disable when encoding
+                queries against stored references.
+
+        """
+        self.results_db_service = results_db_service
+        self.threshold = results_db_service.blob_threshold
+        self.legacy_dataframes = results_db_service.legacy_dataframes
+        self.write = write
+
+    def encode(self, data: bytes) -> Union[Binary, dict]:
+        """Encode a payload, moving it to blob storage if above the threshold.
+
+        Args:
+            data (bytes): Payload to encode
+
+        Returns:
+            Union[Binary, dict]: Payload or reference to stored payload
+
+        """
+        if self.threshold is None or len(data) <= self.threshold:
+            return Binary(data)
+
+        key = hashlib.sha256(data).hexdigest()
+        if self.write:
+            self.results_db_service.insert_blob(key, data)
+
+        return {_ENCODING_KEY: _BLOB_ENCODING, "key": key, "size": len(data)}
+
+    def load(self, key: str) -> bytes:
+        """Load a payload from blob storage.
+
+        Args:
+            key (str): Content hash of the payload
+
+        Returns:
+            bytes
+
+        """
+        return self.results_db_service.find_blob(key)
+
+
+@inject
+def _get_default_blob_store(
+    results_db_service: ResultsDBService = Provide[Context.results_db_service],
+) -> BlobStore:
+    return BlobStore(results_db_service, write=False)
+
+
+def _has_blobs(value) -> bool:
+    """Check whether an encoded value references payloads in blob storage."""
+    if isinstance(value, (dict,)):
+        return value.get(_ENCODING_KEY) == _BLOB_ENCODING or any(
+            _has_blobs(item) for item in value.values()
+        )
+
+    if isinstance(value, (list,)):
+        return any(_has_blobs(item) for item in value if isinstance(item, (dict,)))
+
+    return False
+
+
+def _resolve_blobs(value, blob_store: BlobStore):
+    """Replace blob references inside an encoded value with the stored payloads."""
+    if isinstance(value, (dict,)):
+        if value.get(_ENCODING_KEY) == _BLOB_ENCODING:
+            return blob_store.load(value["key"])
+
+        return {key: _resolve_blobs(item, blob_store) for key, item in value.items()}
+
+    if isinstance(value, (list,)):
+        return [
+            _resolve_blobs(item, blob_store) if isinstance(item, (dict,)) else item
+            for item in value
+        ]
+
+    return value
+
+
+class DeferredValue:
+    """Encoded value referencing payloads in blob storage. Payloads are loaded and the
+    value decoded on the first call to load.
+
+    """
+
+    def __init__(self, encoded: dict, blob_store: Optional[BlobStore] = None):
+        """
+        Args:
+            encoded (dict): Encoded value
+            blob_store (Optional[BlobStore]): Blob store for loading payloads. If
+                not provided, the injected results database service is used.
+
+        """
+        self.encoded = encoded
+        self.blob_store = blob_store
+        self._value = None
+        self._loaded = False
+
+    def load(self):
+        """Load and decode the value."""
+        if not self._loaded:
+            blob_store = self.blob_store
+            if blob_store is None:
+                blob_store = _get_default_blob_store()
+
+            encoded = _resolve_blobs(self.encoded, blob_store)
+            self._value = _DECODERS[encoded[_ENCODING_KEY]](encoded)
+            self._loaded = True
+
+        return self._value
+
+
+class LazyDict(dict):
+    """Dictionary that loads deferred values on access."""
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+
+        if isinstance(value, (DeferredValue,)):
+            value = value.load()
+            super().__setitem__(key, value)
+
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+
+class HDF5Extractor:
+    """Extractor of scalar values from an HDF5 file of a result, e.g. the archive of
+    an ImpactResult. All values are read in one pass over the file.
+
+    """
+
+    def __init__(self, field: str, values: Dict[str, str]):
+        """
+        Args:
+            field (str): Name of the result field holding the file
+            values (Dict[str, str]): Mapping of value name to address in the file,
+                see HDF5ValueSerializer
+
+        """
+        self.field = field
+        # names of the extracted values, indexed by Result.configure
+        self.names = list(values)
+        self._serializer = HDF5ValueSerializer(values)
+
+    def __call__(self, result: "Result", file_service: FileService) -> Dict[str, Any]:
+        file = getattr(result, self.field)
+        if file is None:
+            return {}
+
+        return file_service.read(
+            file.filesystem_identifier, file.filename, self._serializer
+        )
+
+
 class Result(BaseModel):
     """Creates a data model for a result and generates a unique result hash."""
 
@@ -45,9 +249,9 @@ class Result(BaseModel):
 
     # db fields
     flow_id: str
-    inputs: Dict[str, Union[float, str, np.ndarray, list, pd.DataFrame]]
-    outputs: Dict[str, Union[float, str, np.ndarray, list, pd.DataFrame]]
-    date_modified: datetime = datetime.utcnow()
+    inputs: Dict[str, Union[float, str, np.ndarray, list, pd.DataFrame, DeferredValue]]
+    outputs: Dict[str, Union[float, str, np.ndarray, list, pd.DataFrame, DeferredValue]]
+    date_modified: datetime = Field(default_factory=datetime.utcnow)
 
     # set of establishes uniqueness
     unique_on: List[str] = Field(
@@ -60,6 +264,32 @@ class Result(BaseModel):
     # store result type
     result_type_string: str
 
+    # scalar values extracted from files of the result, stored as indexed fields
+    extracted: Dict[str, Any] = {}
+
+    # compute unique_hash with the json based hash of earlier versions, for projects
+    # deduplicating against results stored before the canonical hash
+    legacy_unique_hash: ClassVar[bool] = False
+
+    # store results of high-rate flows packed into buckets per flow and time window
+    # of bucket_seconds, holding at most bucket_size results. Bucketed results are
+    # not deduplicated on unique_hash.
+    bucket_seconds: ClassVar[Optional[int]] = None
+    bucket_size: ClassVar[int] = 1000
+
+    # callables receiving the result and file service and returning scalar values,
+    # e.g. HDF5Extractors, run on insert so that the values can be queried without
+    # loading files. Values of extractors listing their names are indexed.
+    extractors: ClassVar[List[Callable[["Result", FileService], Dict[str, Any]]]] = []
+
+    # secondary indices of the project collection, created on startup for result
+    # types listed in the result_types setting of the results database or by
+    # Result.configure. Subclasses may extend the list with indices on queried inputs
+    # and outputs, e.g. partial indices on outputs set only by some flows.
+    secondary_indices: ClassVar[List[ResultIndex]] = [
+        ResultIndex(fields=[("flow_id", 1), ("date_modified", 1)]),
+    ]
+
     class Config:
         arbitrary_types_allowed = True
         json_encoders = JSON_ENCODERS
@@ -78,6 +308,14 @@ class Result(BaseModel):
     def validate_outputs(cls, v):
         return load_db_dict(v)
 
+    @validator("inputs", "outputs")
+    def defer_blob_loading(cls, v):
+        # values referencing blob storage are loaded on access
+        if any(isinstance(value, (DeferredValue,)) for value in v.values()):
+            return LazyDict(v)
+
+        return v
+
     @root_validator(pre=True)
     def validate_all(cls, values):
         unique_fields = cls.__fields__["unique_on"].default
@@ -104,7 +342,8 @@ class Result(BaseModel):
                     raise ValueError("%s not provided.", field)
 
             values["unique_hash"] = fingerprint_dict(
-                {index: values[index] for index in unique_fields}
+                {index: values[index] for index in unique_fields},
+                legacy=cls.legacy_unique_hash,
             )
 
         if values.get("_id"):
@@ -119,15 +358,216 @@ class Result(BaseModel):
     def get_unique_result_index(self) -> dict:
         return {field: getattr(self, field) for field in self.unique_on}
 
+    @inject
+    def extract(
+        self, file_service: FileService = Provide[Context.file_service]
+    ) -> Dict[str, Any]:
+        """Run the extractors of the result type. Extractors failing, e.g. on files
+        missing a value, are logged and skipped.
+
+        Args:
+            file_service (FileService): File service used for reading files
+
+        Returns:
+            Dict[str, Any]: Mapping of value name to extracted value
+
+        """
+        extracted = {}
+        for extractor in self.extractors:
+            try:
+                extracted.update(extractor(self, file_service))
+
+            except Exception:
+                logger.exception("Unable to extract values with %s", extractor)
+
+        return extracted
+
+    def _extract_on_insert(
+        self, results_db_service: ResultsDBService, file_service: FileService
+    ) -> None:
+        """Store extracted values with the result."""
+        if not self.extractors:
+            return
+
+        self.extracted.update(self.extract(file_service=file_service))
+
+    @classmethod
+    @inject
+    def configure(
+        cls,
+        project_name: str,
+        results_db_service: ResultsDBService = Provide[Context.results_db_service],
+    ) -> List[ResultIndex]:
+        """Create the unique index and secondary indices of the result type in the
+        project collection, e.g. on startup of a flow. Existing indices are left
+        unchanged. Result types listed in the result_types setting of the results
+        database are configured when the environment is configured.
+
+        Args:
+            project_name (str): Name of the project collection
+            results_db_service (ResultsDBService): Results database service
+
+        Returns:
+            List[ResultIndex]: Secondary indices missing after configuration, e.g.
+                because an index of the same name has different options
+
+        """
+        missing = results_db_service.configure(
+            collections={project_name: ["unique_hash"]},
+            indices={project_name: cls.get_secondary_indices()},
+        )
+        return (missing or {}).get(project_name, [])
+
+    @classmethod
+    def get_secondary_indices(cls) -> List[ResultIndex]:
+        """Get the declared secondary indices of the result type along with sparse
+        indices on the extracted values of extractors listing their value names.
+
+        Returns:
+            List[ResultIndex]
+
+        """
+        indices = list(cls.secondary_indices)
+        for extractor in cls.extractors:
+            for name in getattr(extractor, "names", []):
+                result_index = ResultIndex(
+                    fields=[(f"extracted.{name}", 1)], sparse=True
+                )
+                if result_index not in indices:
+                    indices.append(result_index)
+
+        return indices
+
     @inject
     def insert(
-        self, results_db_service: ResultsDB = Provide[Context.results_db_service]
+        self,
+        results_db_service: ResultsDB = Provide[Context.results_db_service],
+        upsert: bool = False,
+        file_service: FileService = Provide[Context.file_service],
     ):
+        """Insert the result into the results database.
+
+        Args:
+            results_db_service (ResultsDBService): Results database service
+            upsert (bool): If True, the id of an existing result with the same
+                unique_hash is returned instead of raising on the unique index.
+                Ignored for bucketed results.
+            file_service (FileService): File service used by extractors
+
+        Returns:
+            Id of the inserted or existing result document
+
+        """
+        self._extract_on_insert(results_db_service, file_service)
 
         # must convert to jsonable dict
-        rep = self.get_db_dict()
+        rep = self.get_db_dict(
+            blob_store=BlobStore(results_db_service),
+            compression=results_db_service.get_compression(self.project_name),
+        )
+
+        if self.bucket_seconds is not None:
+            rep.pop("collection")
+            return results_db_service.insert_bucketed(
+                [rep],
+                collection=self.project_name,
+                bucket_seconds=self.bucket_seconds,
+                bucket_size=self.bucket_size,
+            )[0]
+
+        if upsert:
+            inserted_id, _ = results_db_service.upsert_one(rep)
+            return inserted_id
+
         return results_db_service.insert_one(rep)
 
+    @classmethod
+    @inject
+    def insert_many(
+        cls,
+        results: List["Result"],
+        results_db_service: ResultsDB = Provide[Context.results_db_service],
+        file_service: FileService = Provide[Context.file_service],
+    ) -> UpsertReport:
+        """Insert many results with one unordered bulk write per project. Results
+        matching the unique_hash of a stored result are not written again, except for
+        bucketed results, which are packed into buckets.
+
+        Args:
+            results (List[Result]): Results to insert
+            results_db_service (ResultsDBService): Results database service
+            file_service (FileService): File service used by extractors
+
+        Returns:
+            UpsertReport: Inserted, matched and failed results, identified by their
+                position in results
+
+        """
+        project_indices = {}
+        for i, result in enumerate(results):
+            project_indices.setdefault(result.project_name, []).append(i)
+
+        report = UpsertReport()
+        for project_name, indices in project_indices.items():
+            blob_store = BlobStore(results_db_service)
+            compression = results_db_service.get_compression(project_name)
+
+            items = []
+            buckets = {}
+            for i in indices:
+                results[i]._extract_on_insert(results_db_service, file_service)
+                rep = results[i].get_db_dict(
+                    blob_store=blob_store, compression=compression
+                )
+                # collection is passed separately
+                rep.pop("collection")
+
+                if results[i].bucket_seconds is not None:
+                    buckets.setdefault(
+                        (results[i].bucket_seconds, results[i].bucket_size), []
+                    ).append((i, rep))
+
+                else:
+                    items.append(rep)
+
+            for (bucket_seconds, bucket_size), entries in buckets.items():
+                inserted_ids = results_db_service.insert_bucketed(
+                    [rep for _, rep in entries],
+                    collection=project_name,
+                    bucket_seconds=bucket_seconds,
+                    bucket_size=bucket_size,
+                )
+                report.inserted.update(
+                    {
+                        i: inserted_id
+                        for (i, _), inserted_id in zip(entries, inserted_ids)
+                    }
+                )
+
+            # reports of upserts identify results by their position in items
+            indices = [i for i in indices if results[i].bucket_seconds is None]
+            if not indices:
+                continue
+
+            project_report = results_db_service.upsert_many(
+                items, collection=project_name
+            )
+
+            report.inserted.update(
+                {
+                    indices[i]: inserted_id
+                    for i, inserted_id in project_report.inserted.items()
+                }
+            )
+            report.matched.extend(indices[i] for i in project_report.matched)
+            report.failed.update(
+                {indices[i]: error for i, error in project_report.failed.items()}
+            )
+
+        report.matched.sort()
+
+        return report
+
     @classmethod
     @inject
     def load_from_query(
@@ -135,9 +575,27 @@ class Result(BaseModel):
         project_name: str,
         query: dict,
         results_db_service: ResultsDB = Provide[Context.results_db_service],
+        lazy: bool = False,
     ):
-        query = get_bson_dict(query)
-        res = results_db_service.find(collection=project_name, query=query)
+        """Load a result matching a query.
+
+        Args:
+            project_name (str): Name of the project collection
+            query (dict): Query matching a single result
+            results_db_service (ResultsDBService): Results database service
+            lazy (bool): If True, a LazyResult decoding fields on access is returned
+
+        Returns:
+            Union[Result, LazyResult]
+
+        """
+        blob_store = BlobStore(results_db_service, write=False)
+        query = get_bson_dict(
+            query,
+            blob_store=blob_store,
+            compression=results_db_service.get_compression(project_name),
+        )
+        res = results_db_service.find(collection=project_name, query=query, raw=lazy)
 
         if len(res) == 0:
             raise ValueError("Provided query returned no results. %s", query)
@@ -145,7 +603,12 @@ class Result(BaseModel):
         elif len(res) > 1:
             raise ValueError("Provided query returned multiple results. %s", query)
 
-        values = load_db_dict(res[0])
+        if lazy:
+            return LazyResult(
+                res[0], project_name, result_type=cls, blob_store=blob_store
+            )
+
+        values = load_db_dict(res[0], blob_store=blob_store)
         return cls(project_name=project_name, **values)
 
     def unique_rep(self) -> dict:
@@ -157,96 +620,754 @@ class Result(BaseModel):
             "query": {"unique_hash": self.unique_hash},
         }
 
-    def get_db_dict(self) -> dict:
+    def get_db_dict(
+        self,
+        blob_store: Optional[BlobStore] = None,
+        compression: Optional[str] = None,
+    ) -> dict:
         rep = self.dict(by_alias=True)
-        return get_bson_dict(rep)
 
+        # documents of results without extracted values are unchanged
+        if not rep["extracted"]:
+            rep.pop("extracted")
+
+        return get_bson_dict(rep, blob_store=blob_store, compression=compression)
+
+
+def _inflate(value):
+    """Decode raw bson documents nested in a value."""
+    if isinstance(value, (RawBSONDocument,)):
+        return bson.decode(value.raw)
+
+    if isinstance(value, (list,)):
+        return [_inflate(item) for item in value]
+
+    return value
+
+
+class _RawValue(DeferredValue):
+    """Value of a raw database document decoded on the first call to load."""
+
+    def load(self):
+        if not self._loaded:
+            value = load_db_dict(
+                {"value": _inflate(self.encoded)}, blob_store=self.blob_store
+            )["value"]
 
-def get_bson_dict(dictionary: dict) -> dict:
-    """Recursively converts numpy arrays inside a dictionary to bson encoded items and
-    pandas dataframes to json reps.
+            if isinstance(value, (DeferredValue,)):
+                value = value.load()
+
+            self._value = value
+            self._loaded = True
+
+        return self._value
+
+
+# result types of raw documents, cached as import lookups dominate listing costs
+_get_result_type = functools.lru_cache(maxsize=None)(get_callable_from_string)
+
+
+class LazyResult:
+    """Result backed by its raw database document. Fields are decoded on first
+    access and entries of inputs and outputs are decoded individually, so loading
+    many results costs little more than listing their ids. Other attributes and
+    methods of the result type are served by the validated result built by load.
+
+    """
+
+    def __init__(
+        self,
+        document: RawBSONDocument,
+        project_name: str,
+        result_type: Optional[Type[Result]] = None,
+        blob_store: Optional[BlobStore] = None,
+    ):
+        """
+        Args:
+            document (RawBSONDocument): Raw result document
+            project_name (str): Name of the project collection
+            result_type (Optional[Type[Result]]): Result type. If not provided, the
+                type is loaded from the result_type_string of the document.
+            blob_store (Optional[BlobStore]): Blob store for loading offloaded
+                payloads. If not provided, the injected results database service is
+                used.
+
+        """
+        if result_type is None:
+            result_type = _get_result_type(document["result_type_string"])
+
+        self._document = document
+        self._project_name = project_name
+        self._result_type = result_type
+        self._blob_store = blob_store
+        self._fields = {}
+        self._result = None
+
+    def __getattr__(self, name: str):
+        # only called for attributes not set on the instance
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        field = self._result_type.__fields__.get(name)
+        if field is None:
+            return getattr(self.load(), name)
+
+        if name not in self._fields:
+            self._fields[name] = self._decode_field(name, field)
+
+        return self._fields[name]
+
+    def _decode_field(self, name: str, field):
+        if name == "project_name":
+            return self._project_name
+
+        if name in ["inputs", "outputs"]:
+            raw = self._document.get(field.alias, {})
+            return LazyDict(
+                {key: _RawValue(raw[key], blob_store=self._blob_store) for key in raw}
+            )
+
+        if field.alias not in self._document:
+            return field.get_default()
+
+        value = self._document[field.alias]
+        if name == "id":
+            return str(value)
+
+        # plain strings, e.g. hashes and ids, need no decoding or validation
+        if isinstance(value, (str,)) and field.outer_type_ is str:
+            return value
+
+        value = load_db_dict({name: _inflate(value)}, blob_store=self._blob_store)[name]
+
+        value, errors = field.validate(value, {}, loc=name, cls=self._result_type)
+        if errors:
+            raise ValueError(f"Unable to decode field {name}: {errors}")
+
+        return value
+
+    def load(self) -> Result:
+        """Decode the full document and validate the result.
+
+        Returns:
+            Result
+
+        """
+        if self._result is None:
+            values = load_db_dict(
+                bson.decode(self._document.raw), blob_store=self._blob_store
+            )
+            self._result = self._result_type(project_name=self._project_name, **values)
+
+        return self._result
+
+    def __repr__(self) -> str:
+        return (
+            f"LazyResult({self._result_type.__name__}, "
+            f"project_name={self._project_name!r}, unique_hash={self.unique_hash!r})"
+        )
+
+
+# globals referenced by pickled numpy arrays stored with legacy encoding
+_LEGACY_ARRAY_PICKLE_GLOBALS = {
+    ("numpy", "ndarray"),
+    ("numpy", "dtype"),
+    ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy.core.multiarray", "scalar"),
+    ("numpy._core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "scalar"),
+    ("_codecs", "encode"),
+}
+
+
+class _LegacyArrayUnpickler(pickle.Unpickler):
+    """Unpickler restricted to the globals needed for loading numpy arrays, so that
+    pickled payloads stored in a shared database cannot execute arbitrary code.
+
+    """
+
+    def find_class(self, module: str, name: str):
+        if (module, name) not in _LEGACY_ARRAY_PICKLE_GLOBALS:
+            raise pickle.UnpicklingError(
+                f"Loading {module}.{name} from a database document is not permitted."
+            )
+
+        return super().find_class(module, name)
+
+
+def _get_compression_module(compression: str):
+    """Import the module implementing a compression codec. All supported modules
+    provide compress and decompress functions operating on bytes.
+
+    """
+    if compression not in _COMPRESSION_MODULES:
+        raise ValueError(f"Unsupported compression codec {compression}")
+
+    try:
+        return import_module(_COMPRESSION_MODULES[compression])
+
+    except ModuleNotFoundError as err:
+        logger.error(
+            "Compression codec %s requires the %s package",
+            compression,
+            _COMPRESSION_MODULES[compression].split(".")[0],
+        )
+        raise err
+
+
+def compress_buffer(
+    data: bytes, compression: Optional[str] = None
+) -> Tuple[bytes, Optional[str]]:
+    """Compress a binary payload. Payloads that do not shrink under compression are
+    returned unchanged.
 
     Args:
-        dictionary (dict): Dictionary to load.
+        data (bytes): Payload to compress
+        compression (Optional[str]): Compression codec, one of zlib, zstd or lz4.
+            If None, the payload is not compressed.
+
+    Returns:
+        Tuple[bytes, Optional[str]]: Payload and the codec used for compressing it
+            or None if the payload is uncompressed.
+
+    """
+    if compression is None:
+        return data, None
+
+    compressed = _get_compression_module(compression).compress(data)
+    if len(compressed) >= len(data):
+        return data, None
+
+    return compressed, compression
+
+
+def decompress_buffer(data: bytes, compression: Optional[str] = None) -> bytes:
+    """Decompress a binary payload compressed with compress_buffer.
+
+    Args:
+        data (bytes): Payload to decompress
+        compression (Optional[str]): Compression codec used for the payload. If
+            None, the payload is returned unchanged.
+
+    Returns:
+        bytes
+
+    """
+    if compression is None:
+        return data
+
+    return _get_compression_module(compression).decompress(data)
+
+
+def _shuffle_bytes(data: bytes, itemsize: int) -> bytes:
+    """Group the bytes of array elements by significance. Neighbouring values of
+    smooth numeric arrays share their leading bytes, so shuffled buffers compress
+    considerably better.
 
-    Returns
-        dict
     """
+    values = np.frombuffer(data, dtype=np.uint8).reshape(-1, itemsize)
+    shuffled = np.empty((itemsize, values.shape[0]), dtype=np.uint8)
+
+    # copying byte by byte is considerably faster than a transposed copy
+    for i in range(itemsize):
+        shuffled[i] = values[:, i]
+
+    return shuffled.tobytes()
+
+
+def _unshuffle_bytes(data: bytes, itemsize: int) -> bytes:
+    """Restore the byte order of a buffer shuffled with _shuffle_bytes."""
+    shuffled = np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1)
+    values = np.empty((shuffled.shape[1], itemsize), dtype=np.uint8)
+
+    for i in range(itemsize):
+        values[:, i] = shuffled[i]
+
+    return values.tobytes()
+
+
+def _encode_buffer(data: bytes, blob_store: Optional[BlobStore] = None):
+    """Encode a raw binary payload, moving it to blob storage if a blob store is
+    provided and the payload is above its threshold.
+
+    """
+    if blob_store is not None:
+        return blob_store.encode(data)
+
+    return Binary(data)
+
+
+def encode_array(
+    array: np.ndarray,
+    blob_store: Optional[BlobStore] = None,
+    compression: Optional[str] = None,
+) -> dict:
+    """Encode a numpy array as its raw buffer along with dtype and shape. Structured
+    dtypes are stored with the names, dtypes and offsets of their fields. Arrays
+    holding python objects do not have a raw buffer representation and are stored as
+    bson native lists of their elements. Compressed buffers record their codec under
+    the compression key. Buffers of multi-byte dtypes are byte shuffled before
+    compression.
+
+    Args:
+        array (np.ndarray): Array to encode
+        blob_store (Optional[BlobStore]): Blob store for large buffers
+        compression (Optional[str]): Compression codec for the buffer
+
+    Returns:
+        dict: Encoded array
+
+    Raises:
+        ValueError: If an array holding python objects has elements without bson
+            representation
+
+    """
+    if array.dtype.hasobject:
+        return _encode_object_array(array)
+
+    data = array.tobytes()
+    itemsize = array.dtype.itemsize
+
+    if compression is not None:
+        if itemsize > 1:
+            compressed, compression = compress_buffer(
+                _shuffle_bytes(data, itemsize), compression
+            )
+        else:
+            compressed, compression = compress_buffer(data, compression)
+
+        if compression is not None:
+            data = compressed
+
+    encoded = {
+        _ENCODING_KEY: _ARRAY_ENCODING,
+        "dtype": _get_dtype_rep(array.dtype),
+        "shape": list(array.shape),
+        "data": _encode_buffer(data, blob_store=blob_store),
+    }
+
+    if compression is not None:
+        encoded["compression"] = compression
+        encoded["shuffle"] = itemsize > 1
+
+    return encoded
+
 
-    def convert_values(dictionary):
-        """Convert values to list so the dictionary can be inserted and loaded."""
+def decode_array(encoded: dict) -> np.ndarray:
+    """Decode a numpy array from the representation created by encode_array. The
+    returned array is a read-only view of the stored or decompressed buffer and is
+    not copied.
 
-        # convert numpy arrays to binary format
-        dictionary = {
-            key: Binary(pickle.dumps(value, protocol=2))
-            if isinstance(value, (np.ndarray,))
-            else value
-            for key, value in dictionary.items()
+    Args:
+        encoded (dict): Encoded array
+
+    Returns:
+        np.ndarray
+
+    """
+    if "values" in encoded:
+        return _decode_object_array(encoded)
+
+    dtype = _load_dtype(encoded["dtype"])
+    data = decompress_buffer(encoded["data"], encoded.get("compression"))
+
+    if encoded.get("shuffle", False):
+        data = _unshuffle_bytes(data, dtype.itemsize)
+
+    array = np.frombuffer(data, dtype=dtype)
+    return array.reshape(encoded["shape"])
+
+
+def _encode_object_array(array: np.ndarray) -> dict:
+    """Encode an array holding python objects as the list of its elements in C
+    order. Decimals are stored as Decimal128 and numpy scalars as python values.
+
+    """
+
+    def convert_element(value):
+        if isinstance(value, (Decimal,)):
+            return Decimal128(value)
+
+        if isinstance(value, (np.generic,)):
+            return value.item()
+
+        return value
+
+    values = [convert_element(value) for value in array.ravel(order="C")]
+    try:
+        bson.encode({"values": values})
+
+    except (InvalidDocument, OverflowError) as err:
+        raise ValueError(f"Unable to encode array elements: {err}") from err
+
+    return {
+        _ENCODING_KEY: _ARRAY_ENCODING,
+        "dtype": _get_dtype_rep(array.dtype),
+        "shape": list(array.shape),
+        "values": values,
+    }
+
+
+def _decode_object_array(encoded: dict) -> np.ndarray:
+    """Decode an array holding python objects from the representation created by
+    _encode_object_array.
+
+    """
+    array = np.empty(len(encoded["values"]), dtype=_load_dtype(encoded["dtype"]))
+
+    # assigned one by one, so that list elements are not broadcast
+    for i, value in enumerate(encoded["values"]):
+        if isinstance(value, (Decimal128,)):
+            value = value.to_decimal()
+
+        # records of structured dtypes are stored as lists of their fields
+        elif array.dtype.names is not None:
+            value = tuple(value)
+
+        array[i] = value
+
+    return array.reshape(encoded["shape"])
+
+
+def _get_dtype_rep(dtype: np.dtype) -> Union[str, dict]:
+    """Get a BSON compatible representation of a dtype. Structured dtypes are
+    represented by the names, dtypes and offsets of their fields, and subarray
+    dtypes by their base dtype and shape.
+
+    """
+    if dtype.subdtype is not None:
+        base, shape = dtype.subdtype
+        return {"base": _get_dtype_rep(base), "shape": list(shape)}
+
+    if dtype.fields is None:
+        return dtype.str
+
+    return {
+        "names": list(dtype.names),
+        "formats": [_get_dtype_rep(dtype.fields[name][0]) for name in dtype.names],
+        "offsets": [dtype.fields[name][1] for name in dtype.names],
+        "itemsize": dtype.itemsize,
+    }
+
+
+def _load_dtype(rep: Union[str, dict]) -> np.dtype:
+    """Load a dtype from the representation created by _get_dtype_rep."""
+    if isinstance(rep, (str,)):
+        return np.dtype(rep)
+
+    if "base" in rep:
+        return np.dtype((_load_dtype(rep["base"]), tuple(rep["shape"])))
+
+    return np.dtype(
+        {
+            "names": rep["names"],
+            "formats": [_load_dtype(field_format) for field_format in rep["formats"]],
+            "offsets": rep["offsets"],
+            "itemsize": rep["itemsize"],
         }
+    )
+
+
+def load_legacy_array(data: bytes) -> np.ndarray:
+    """Load a numpy array stored as a pickle by earlier versions of get_bson_dict.
+
+    Args:
+        data (bytes): Pickled array
+
+    Returns:
+        np.ndarray
+
+    """
+    return _LegacyArrayUnpickler(io.BytesIO(data)).load()
+
 
-        # convert pandas array to json
-        dictionary = {
-            key: value.to_json() if isinstance(value, (pd.DataFrame,)) else value
-            for key, value in dictionary.items()
+def _encode_values(
+    values: Union[pd.Series, pd.Index],
+    blob_store: Optional[BlobStore] = None,
+    compression: Optional[str] = None,
+) -> Optional[Union[dict, list]]:
+    """Encode the values of a DataFrame column or index. Values with numpy dtypes are
+    stored as raw buffers and timezone-aware datetimes as buffers of UTC timestamps,
+    while python objects and other pandas extension types are stored as bson native
+    lists. Returns None for values without bson representation, e.g. periods.
+
+    """
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        # int64 timestamps since the epoch in UTC in the unit of the dtype
+        return encode_array(
+            pd.DatetimeIndex(values).asi8,
+            blob_store=blob_store,
+            compression=compression,
+        )
+
+    if isinstance(values.dtype, np.dtype) and not values.dtype.hasobject:
+        return encode_array(
+            values.to_numpy(), blob_store=blob_store, compression=compression
+        )
+
+    if not isinstance(values.dtype, np.dtype):
+        values = values.astype(object).where(values.notna(), None)
+
+    values = values.tolist()
+    try:
+        bson.encode({"values": values})
+
+    except (InvalidDocument, OverflowError):
+        return None
+
+    return values
+
+
+def _decode_values(encoded: Union[dict, list], dtype: str):
+    """Decode the values of a DataFrame column or index."""
+    dtype = pd.api.types.pandas_dtype(dtype)
+
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        if isinstance(encoded, (dict,)):
+            values = decode_array(encoded).view(f"datetime64[{dtype.unit}]")
+
+        # stored as lists of naive UTC datetimes by earlier versions
+        else:
+            values = pd.to_datetime(encoded)
+
+        return pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(dtype.tz).array
+
+    if isinstance(encoded, (dict,)):
+        return decode_array(encoded)
+
+    return pd.array(encoded, dtype=dtype)
+
+
+def encode_dataframe(
+    df: pd.DataFrame,
+    format: str = "columns",
+    blob_store: Optional[BlobStore] = None,
+    compression: Optional[str] = None,
+) -> dict:
+    """Encode a pandas DataFrame. The default columnar format stores each column
+    separately along with its dtype, so numeric columns round trip as raw buffers
+    with their dtypes preserved. DataFrames with hierarchical index or columns, or
+    with values without bson representation, e.g. periods or intervals, are stored
+    with their json representation.
+
+    Args:
+        df (pd.DataFrame): DataFrame to encode
+        format (str): Encoding format, either "columns" or "json"
+        blob_store (Optional[BlobStore]): Blob store for large column buffers
+        compression (Optional[str]): Compression codec for column buffers and json
+            representations
+
+    Returns:
+        dict: Encoded DataFrame
+
+    """
+    if format not in ["columns", "json"]:
+        raise ValueError(f"Unsupported DataFrame encoding format {format}")
+
+    if isinstance(df.index, (pd.MultiIndex,)) or isinstance(
+        df.columns, (pd.MultiIndex,)
+    ):
+        format = "json"
+
+    if format == "columns":
+        index = _encode_values(df.index, blob_store=blob_store, compression=compression)
+        data = [
+            _encode_values(
+                df.iloc[:, i], blob_store=blob_store, compression=compression
+            )
+            for i in range(df.shape[1])
+        ]
+
+        if index is None or any(values is None for values in data):
+            format = "json"
+
+    if format == "json":
+        # values without json representation, e.g. periods, are stored as strings
+        data, compression = compress_buffer(
+            df.to_json(default_handler=str).encode(), compression
+        )
+        if compression is None:
+            return {
+                _ENCODING_KEY: _DATAFRAME_ENCODING,
+                "format": "json",
+                "data": data.decode(),
+            }
+
+        return {
+            _ENCODING_KEY: _DATAFRAME_ENCODING,
+            "format": "json",
+            "data": Binary(data),
+            "compression": compression,
         }
 
+    return {
+        _ENCODING_KEY: _DATAFRAME_ENCODING,
+        "format": "columns",
+        "columns": df.columns.tolist(),
+        "dtypes": [str(dtype) for dtype in df.dtypes],
+        "index": index,
+        "index_dtype": str(df.index.dtype),
+        "index_name": df.index.name,
+        "data": data,
+    }
+
+
+def decode_dataframe(encoded: dict) -> pd.DataFrame:
+    """Decode a pandas DataFrame from the representation created by
+    encode_dataframe. Column values are copied into the DataFrame, so the result is
+    writeable.
+
+    Args:
+        encoded (dict): Encoded DataFrame
+
+    Returns:
+        pd.DataFrame
+
+    """
+    if encoded["format"] == "json":
+        data = decompress_buffer(encoded["data"], encoded.get("compression"))
+        return pd.DataFrame(json.loads(data))
+
+    index = pd.Index(
+        _decode_values(encoded["index"], encoded["index_dtype"]),
+        name=encoded["index_name"],
+    )
+    data = {
+        i: _decode_values(values, dtype)
+        for i, (values, dtype) in enumerate(zip(encoded["data"], encoded["dtypes"]))
+    }
+
+    df = pd.DataFrame(data, index=index)
+    df.columns = pd.Index(encoded["columns"])
+
+    return df
+
+
+def load_legacy_dataframe(string: str) -> Union[pd.DataFrame, str]:
+    """Load a pandas DataFrame stored as an untagged json string by earlier versions
+    of get_bson_dict. Strings that are not json objects mapping columns to values are
+    returned unchanged.
+
+    Args:
+        string (str): Candidate json string
+
+    Returns:
+        Union[pd.DataFrame, str]
+
+    """
+    try:
+        loaded = json.loads(string)
+
+    except json.JSONDecodeError:
+        return string
+
+    if isinstance(loaded, dict) and all(
+        isinstance(value, dict) for value in loaded.values()
+    ):
+        return pd.DataFrame(loaded)
+
+    return string
+
+
+# map of encoding type to decoder
+_DECODERS = {
+    _ARRAY_ENCODING: decode_array,
+    _DATAFRAME_ENCODING: decode_dataframe,
+}
+
+
+def get_bson_dict(
+    dictionary: dict,
+    blob_store: Optional[BlobStore] = None,
+    compression: Optional[str] = None,
+) -> dict:
+    """Recursively converts values inside a dictionary to bson encodable items. Numpy
+    arrays and pandas dataframes are encoded as documents tagged with their encoding
+    type and files with their json representation.
+
+    Args:
+        dictionary (dict): Dictionary to load.
+        blob_store (Optional[BlobStore]): Blob store for large binary payloads. If
+            not provided, all payloads are kept in the document.
+        compression (Optional[str]): Compression codec for binary payloads, one of
+            zlib, zstd or lz4. If None, payloads are stored uncompressed. The codec
+            is recorded in the encoded values, so loading does not require it.
+
+    Returns
+        dict
+    """
+
+    def convert_value(value):
+        if isinstance(value, (np.ndarray,)):
+            return encode_array(value, blob_store=blob_store, compression=compression)
+
+        if isinstance(value, (pd.DataFrame,)):
+            return encode_dataframe(
+                value, blob_store=blob_store, compression=compression
+            )
+
         # create file rep
-        dictionary = {
-            key: value.jsonable_dict() if isinstance(value, (File,)) else value
-            for key, value in dictionary.items()
-        }
+        if isinstance(value, (File,)):
+            return value.jsonable_dict()
 
-        dictionary = {
-            key: convert_values(value) if isinstance(value, (dict,)) else value
-            for key, value in dictionary.items()
-        }
-        return dictionary
+        if isinstance(value, (dict,)):
+            return {key: convert_value(item) for key, item in value.items()}
 
-    return convert_values(dictionary)
+        return value
 
+    return convert_value(dictionary)
 
-def load_db_dict(dictionary: dict):
+
+def load_db_dict(
+    dictionary: dict,
+    legacy_dataframes: Optional[bool] = None,
+    blob_store: Optional[BlobStore] = None,
+):
     """Loads representation of mongodb dictionary with appropriate python classes.
-    Numpy arrays are loaded from binary objects and pandas dataframes from json blobs.
+    Values are decoded in a single pass by dispatching on their encoding tag, so the
+    cost of loading is proportional to the number of encoded values. Files are
+    identified by their file_type_string. Values referencing payloads in blob storage
+    are returned as DeferredValues, which are loaded on access.
 
     Args:
         dictionary (dict): Dictionary to load.
+        legacy_dataframes (Optional[bool]): Whether to check strings beginning with
+            "{" for dataframes stored as untagged json by earlier versions. If None,
+            the legacy_dataframes setting of the blob store's results database is
+            used, and strings are left unchanged without a blob store.
+        blob_store (Optional[BlobStore]): Blob store for loading deferred values. If
+            not provided, the injected results database service is used.
 
     """
 
-    def check_and_convert_json_str(string: str):
-        try:
+    if legacy_dataframes is None:
+        legacy_dataframes = blob_store is not None and blob_store.legacy_dataframes
 
-            loaded_ = json.loads(string)
-            return pd.DataFrame(loaded_)
+    def convert_value(value):
+        if isinstance(value, (dict,)):
+            return convert_dict(value)
 
-        except json.JSONDecodeError:
-            return string
+        # numpy arrays stored in legacy binary format
+        if isinstance(value, (bytes,)):
+            return load_legacy_array(value)
 
-    def convert_values(dictionary):
-        if "file_type_string" in dictionary:
-            file_type = get_file_from_serializer_string(dictionary["file_type_string"])
-            return file_type(**dictionary)
+        if legacy_dataframes and isinstance(value, (str,)) and value.startswith("{"):
+            return load_legacy_dataframe(value)
 
-        # convert numpy arrays from binary format
-        dictionary = {
-            key: pickle.loads(value) if isinstance(value, (bytes,)) else value
-            for key, value in dictionary.items()
-        }
+        return value
 
-        # convert pandas array to json
-        dictionary = {
-            key: check_and_convert_json_str(value)
-            if isinstance(value, (str,))
-            else value
-            for key, value in dictionary.items()
-        }
+    def convert_dict(dictionary):
+        encoding = dictionary.get(_ENCODING_KEY)
+        if encoding is not None:
+            if _has_blobs(dictionary):
+                return DeferredValue(dictionary, blob_store=blob_store)
 
-        dictionary = {
-            key: convert_values(value) if isinstance(value, (dict,)) else value
-            for key, value in dictionary.items()
-        }
+            return _DECODERS[encoding](dictionary)
+
+        if "file_type_string" in dictionary:
+            file_type = get_file_from_serializer_string(dictionary["file_type_string"])
+            return file_type(**dictionary)
 
-        return dictionary
+        return {key: convert_value(value) for key, value in dictionary.items()}
 
-    return convert_values(dictionary)
+    return convert_dict(dictionary)
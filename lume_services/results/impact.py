@@ -5,6 +5,7 @@ from typing import Optional
 from pydantic import validator
 from lume_services.results.generic import Result, round_datetime_to_milliseconds
 from lume_services.files import HDF5File, ImageFile
+from lume_services.services.results import ResultIndex
 
 
 class ImpactResult(Result):
@@ -15,6 +16,11 @@ class ImpactResult(Result):
     pv_collection_isotime: datetime
     config: dict
 
+    # time windows of flows are queried on the collection time
+    secondary_indices = Result.secondary_indices + [
+        ResultIndex(fields=[("flow_id", 1), ("pv_collection_isotime", 1)])
+    ]
+
     _round_datetime_to_milliseconds = validator(
         "pv_collection_isotime", allow_reuse=True, always=True, pre=True
     )(round_datetime_to_milliseconds)
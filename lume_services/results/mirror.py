@@ -0,0 +1,205 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, Tuple
+from urllib.parse import quote
+
+import bson
+import pandas as pd
+from dependency_injector.wiring import Provide, inject
+
+from lume_services.config import Context
+from lume_services.results.generic import BlobStore
+from lume_services.results.utils import get_results_df_from_documents
+from lume_services.services.results import ResultsDBService
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResultsMirror:
+    """Local on-disk mirror of stored results, kept per flow. Documents are appended
+    to a file in their stored BSON encoding, and each sync only fetches documents
+    with a date_modified at or after the high-water mark of the previous sync.
+    DataFrames of mirrored results are built locally and extended in memory on
+    later syncs.
+
+    Stored results are not updated by the results database service, so mirrored
+    documents are never refreshed. Deleted results remain in the mirror, and results
+    stored with a date_modified before the mark, e.g. by hosts with skewed clocks,
+    are missed.
+
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): Directory holding the mirror files, e.g.
+                ~/.lume/results. Created if missing.
+
+        """
+        self._directory = os.path.expanduser(directory)
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+
+    def _get_paths(self, project_name: str, flow_id: str) -> Tuple[str, str]:
+        """Get the paths of the document and state files of a flow."""
+        directory = os.path.join(self._directory, quote(project_name, safe=""))
+        os.makedirs(directory, exist_ok=True)
+
+        filename = quote(flow_id, safe="")
+        return (
+            os.path.join(directory, f"{filename}.bson"),
+            os.path.join(directory, f"{filename}.json"),
+        )
+
+    def _load_state(self, path: str) -> dict:
+        if not os.path.exists(path):
+            return {"high_water_mark": None, "boundary_ids": []}
+
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_state(self, path: str, state: dict) -> None:
+        # replace atomically so an interrupted sync keeps the previous state
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(state, f)
+
+        os.replace(f"{path}.tmp", path)
+
+    @inject
+    def sync(
+        self,
+        project_name: str,
+        flow_id: str,
+        results_db_service: ResultsDBService = Provide[Context.results_db_service],
+    ) -> int:
+        """Fetch results of a flow stored since the last sync.
+
+        Args:
+            project_name (str): Name of the project collection
+            flow_id (str): Id of the flow
+            results_db_service (ResultsDBService): Results database service
+
+        Returns:
+            int: Number of fetched results
+
+        """
+        documents_path, state_path = self._get_paths(project_name, flow_id)
+        state = self._load_state(state_path)
+
+        query = {"flow_id": flow_id}
+        high_water_mark = state["high_water_mark"]
+        boundary_ids = set(state["boundary_ids"])
+
+        # documents at the mark are fetched again, as more may have been stored
+        # within the same millisecond
+        if high_water_mark is not None:
+            high_water_mark = datetime.fromisoformat(high_water_mark)
+            query["date_modified"] = {"$gte": high_water_mark}
+
+        fetched = []
+        try:
+            with open(documents_path, "ab") as f:
+                for document in results_db_service.find_iter(
+                    collection=project_name,
+                    query=query,
+                    sort=[("date_modified", 1)],
+                    raw=True,
+                ):
+                    document_id = str(document["_id"])
+                    if document_id in boundary_ids:
+                        continue
+
+                    date_modified = document["date_modified"]
+                    if high_water_mark is None or date_modified > high_water_mark:
+                        high_water_mark = date_modified
+                        boundary_ids = set()
+
+                    boundary_ids.add(document_id)
+
+                    f.write(document.raw)
+                    fetched.append(bson.decode(document.raw))
+
+        except BaseException:
+            # appended documents are fetched again by the next sync, so the frame is
+            # rebuilt from the deduplicated mirror file
+            self._frames.pop((project_name, flow_id), None)
+            raise
+
+        if fetched:
+            self._save_state(
+                state_path,
+                {
+                    "high_water_mark": high_water_mark.isoformat(),
+                    "boundary_ids": sorted(boundary_ids),
+                },
+            )
+
+            frame = self._frames.get((project_name, flow_id))
+            if frame is not None:
+                self._frames[(project_name, flow_id)] = pd.concat(
+                    [
+                        frame,
+                        get_results_df_from_documents(
+                            ((project_name, document) for document in fetched),
+                            blob_store=BlobStore(results_db_service, write=False),
+                        ),
+                    ],
+                    ignore_index=True,
+                )
+
+        logger.info(
+            "Mirrored %s results of flow %s in %s", len(fetched), flow_id, project_name
+        )
+
+        return len(fetched)
+
+    @inject
+    def get_results_df(
+        self,
+        project_name: str,
+        flow_id: str,
+        results_db_service: ResultsDBService = Provide[Context.results_db_service],
+    ) -> pd.DataFrame:
+        """Get a DataFrame of the mirrored results of a flow, formatted as by
+        Model.get_results_df. The DataFrame is built from the mirror files on first
+        access and kept in memory.
+
+        Args:
+            project_name (str): Name of the project collection
+            flow_id (str): Id of the flow
+            results_db_service (ResultsDBService): Results database service, used
+                only for loading payloads moved to blob storage
+
+        Returns:
+            pd.DataFrame: Mirrored results
+
+        """
+        frame = self._frames.get((project_name, flow_id))
+        if frame is not None:
+            return frame
+
+        documents_path, _ = self._get_paths(project_name, flow_id)
+
+        def iter_documents():
+            if not os.path.exists(documents_path):
+                return
+
+            # skip documents appended again by an interrupted sync
+            document_ids = set()
+            with open(documents_path, "rb") as f:
+                for document in bson.decode_file_iter(f):
+                    if document["_id"] in document_ids:
+                        continue
+
+                    document_ids.add(document["_id"])
+                    yield project_name, document
+
+        frame = get_results_df_from_documents(
+            iter_documents(),
+            blob_store=BlobStore(results_db_service, write=False),
+        )
+        self._frames[(project_name, flow_id)] = frame
+
+        return frame
@@ -1,13 +1,31 @@
-from .generic import Result
+from .generic import (
+    BlobStore,
+    DeferredValue,
+    Result,
+    get_bson_dict,
+    load_db_dict,
+    _ENCODING_KEY,
+)
 from .impact import ImpactResult
-from typing import Dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from array import array
 import logging
+import numpy as np
+import pandas as pd
 
+from dependency_injector.wiring import Provide, inject
+
+from lume_services.config import Context
+from lume_services.services.results import ResultsDBService
 from lume_services.utils import fingerprint_dict, get_callable_from_string
 
 logger = logging.getLogger(__name__)
 
+# typed buffers for numeric DataFrame columns and the value types they accept
+_TYPECODES = {float: "d", int: "q"}
+_BUFFER_TYPES = {"d": (float, int), "q": (int,)}
+
 # create map of type import path to type
 _ResultTypes = {
     f"{Result.__module__}:{Result.__name__}": Result,
@@ -58,5 +76,397 @@ def get_unique_hash(result_rep) -> str:
     unique_fields = result_type.__fields__["unique_on"].default
 
     return fingerprint_dict(
-        {index: result_rep["query"][index] for index in unique_fields}
+        {index: result_rep["query"][index] for index in unique_fields},
+        legacy=result_type.legacy_unique_hash,
     )
+
+
+class _ProjectionMiss(Exception):
+    """Raised when a projected document lacks a key of the attribute index, which
+    happens when the projection reaches into an encoded value.
+
+    """
+
+    def __init__(self, depth: int):
+        self.depth = depth
+
+
+def get_attribute_projection(attribute_index: list) -> dict:
+    """Convert an attribute index into a MongoDB projection. Leading keys form the
+    projected field path and a following list index is selected with $slice.
+    Remaining entries of the index are applied after loading. The unique hash is
+    always included, as a $slice alone would project all other fields.
+
+    Args:
+        attribute_index (list): Sequence of keys and list indices, with a stored
+            field name first
+
+    Returns:
+        dict: Projection
+
+    """
+    projection = {"unique_hash": True}
+
+    keys = []
+    for index in attribute_index:
+        if isinstance(index, (int,)):
+            projection[".".join(keys)] = {"$slice": [index, 1]}
+            return projection
+
+        keys.append(str(index))
+
+    projection[".".join(keys)] = True
+    return projection
+
+
+def _select_attribute(document: dict, attribute_index: list, blob_store: BlobStore):
+    """Select a value from a projected document. Projected keys and slices are
+    walked in the stored document, then the value is decoded and the remaining
+    entries of the index are applied.
+
+    """
+    value = document
+    sliced = False
+    depth = 0
+
+    for index in attribute_index:
+        if isinstance(value, (dict,)) and _ENCODING_KEY not in value:
+            if "file_type_string" in value:
+                break
+
+            if index not in value:
+                if sliced:
+                    raise KeyError(index)
+
+                raise _ProjectionMiss(depth)
+
+            value = value[index]
+
+        # first list index is applied by the $slice projection
+        elif isinstance(value, (list,)) and isinstance(index, (int,)) and not sliced:
+            if not len(value):
+                raise IndexError(f"Index {index} out of range")
+
+            value = value[0]
+            sliced = True
+
+        else:
+            break
+
+        depth += 1
+
+    value = load_db_dict({"value": value}, blob_store=blob_store)["value"]
+    if isinstance(value, (DeferredValue,)):
+        value = value.load()
+
+    for index in attribute_index[depth:]:
+        value = value[index]
+
+    return value
+
+
+def _select_from_result(result: Result, attribute_index: list) -> Any:
+    """Select a value from a loaded result. The result is returned if the first
+    attribute is unset.
+
+    """
+    attr_value = getattr(result, attribute_index[0], None)
+    if attr_value is None:
+        return result
+
+    for index in attribute_index[1:]:
+        attr_value = attr_value[index]
+
+    return attr_value
+
+
+@inject
+def load_result_attributes(
+    result_reps: List[dict],
+    attribute_index: list,
+    results_db_service: ResultsDBService = Provide[Context.results_db_service],
+) -> List[Any]:
+    """Load values of stored results selected by an attribute index without
+    constructing the results. The attribute index is pushed into the database query
+    as a projection, so only the selected part of each document is transferred.
+    Representations of a project querying on unique_hash are loaded with a single
+    query.
+
+    Args:
+        result_reps (List[dict]): Result representations, as created by
+            Result.unique_rep
+        attribute_index (list): Selection instructions, e.g. ["outputs", "output1"]
+            or ["outputs", "vehicle", "car", 0]
+        results_db_service (ResultsDBService): Results database service
+
+    Returns:
+        List[Any]: Selected values in the order of result_reps. If the first
+            attribute is not set for a result, the full result is returned.
+
+    """
+    values = [None] * len(result_reps)
+
+    projects = {}
+    for i, result_rep in enumerate(result_reps):
+        projects.setdefault(result_rep["project_name"], []).append(i)
+
+    for project_name, indices in projects.items():
+        blob_store = BlobStore(results_db_service, write=False)
+        compression = results_db_service.get_compression(project_name)
+
+        def fetch(indices, attribute_index):
+            """Fetch projected documents, querying on unique_hash in bulk."""
+            fields = get_attribute_projection(attribute_index)
+            documents = {}
+
+            by_hash = [
+                i for i in indices if list(result_reps[i]["query"]) == ["unique_hash"]
+            ]
+            if len(by_hash) > 1:
+                hashes = [result_reps[i]["query"]["unique_hash"] for i in by_hash]
+                res = results_db_service.find(
+                    collection=project_name,
+                    query={"unique_hash": {"$in": hashes}},
+                    fields=fields,
+                )
+                res = {document["unique_hash"]: document for document in res}
+
+                for i, unique_hash in zip(by_hash, hashes):
+                    if unique_hash not in res:
+                        raise ValueError(
+                            "Provided query returned no results. %s",
+                            result_reps[i]["query"],
+                        )
+
+                    documents[i] = res[unique_hash]
+
+            for i in indices:
+                if i in documents:
+                    continue
+
+                query = get_bson_dict(
+                    result_reps[i]["query"],
+                    blob_store=blob_store,
+                    compression=compression,
+                )
+                res = results_db_service.find(
+                    collection=project_name, query=query, fields=fields
+                )
+
+                if len(res) == 0:
+                    raise ValueError("Provided query returned no results. %s", query)
+
+                elif len(res) > 1:
+                    raise ValueError(
+                        "Provided query returned multiple results. %s", query
+                    )
+
+                documents[i] = res[0]
+
+            return documents
+
+        def load_result(i):
+            result_rep = result_reps[i]
+            result_type = get_result_from_string(result_rep["result_type_string"])
+            result = result_type.load_from_query(
+                project_name,
+                result_rep["query"],
+                results_db_service=results_db_service,
+            )
+            return _select_from_result(result, attribute_index)
+
+        # map the first attribute to the stored field name
+        stored_indices = {}
+        for i in indices:
+            result_type = get_result_from_string(result_reps[i]["result_type_string"])
+            field = result_type.__fields__.get(attribute_index[0])
+            if field is None or field.alias == "collection":
+                values[i] = load_result(i)
+
+            else:
+                stored_index = (field.alias, *attribute_index[1:])
+                stored_indices.setdefault(stored_index, []).append(i)
+
+        for stored_index, group in stored_indices.items():
+            stored_index = list(stored_index)
+            misses = {}
+
+            for i, document in fetch(group, stored_index).items():
+                try:
+                    values[i] = _select_attribute(document, stored_index, blob_store)
+
+                except _ProjectionMiss as miss:
+                    misses.setdefault(miss.depth, []).append(i)
+
+            for depth, missed in misses.items():
+                # unset field
+                if depth == 0:
+                    for i in missed:
+                        values[i] = load_result(i)
+
+                    continue
+
+                # projection reached into an encoded value, so load the value whole
+                for i, document in fetch(missed, stored_index[:depth]).items():
+                    try:
+                        values[i] = _select_attribute(
+                            document, stored_index, blob_store
+                        )
+
+                    except _ProjectionMiss as miss:
+                        raise KeyError(stored_index[miss.depth])
+
+    return values
+
+
+@inject
+def load_result_attribute(
+    result_rep: dict,
+    attribute_index: list,
+    results_db_service: ResultsDBService = Provide[Context.results_db_service],
+) -> Any:
+    """Load the value of a stored result selected by an attribute index without
+    constructing the result. See load_result_attributes.
+
+    Args:
+        result_rep (dict): Result representation, as created by Result.unique_rep
+        attribute_index (list): Selection instructions, e.g. ["outputs", "output1"]
+        results_db_service (ResultsDBService): Results database service
+
+    Returns:
+        Any: Selected value, or the full result if the first attribute is not set
+
+    """
+    return load_result_attributes(
+        [result_rep], attribute_index, results_db_service=results_db_service
+    )[0]
+
+
+def _load_leaf(value: Any, blob_store: Optional[BlobStore]) -> Any:
+    """Decode an encoded or legacy stored value, leaving plain values untouched."""
+    if isinstance(value, (dict, bytes)) or (
+        isinstance(value, (str,)) and value.startswith("{")
+    ):
+        value = load_db_dict({"value": value}, blob_store=blob_store)["value"]
+        if isinstance(value, (DeferredValue,)):
+            value = value.load()
+
+    return value
+
+
+class _ColumnBuilder:
+    """Columns of a results DataFrame filled row by row. Numeric columns are held in
+    typed buffers and fall back to lists once a value of another type is added.
+
+    """
+
+    def __init__(self, blob_store: Optional[BlobStore] = None):
+        self._blob_store = blob_store
+        self._columns = {}
+        self._n_rows = 0
+
+    def add(self, name: str, value: Any) -> None:
+        column = self._columns.get(name)
+        if column is None:
+            typecode = _TYPECODES.get(type(value)) if not self._n_rows else None
+            if typecode is not None:
+                column = self._columns[name] = array(typecode)
+
+            else:
+                column = self._columns[name] = [None] * self._n_rows
+
+        if type(column) is not list:
+            if type(value) in _BUFFER_TYPES[column.typecode]:
+                try:
+                    column.append(value)
+                    return
+
+                except OverflowError:
+                    pass
+
+            column = self._columns[name] = column.tolist()
+
+        # share repeated strings, e.g. flow ids, with the previous row
+        if type(value) is str and column and column[-1] == value:
+            value = column[-1]
+
+        column.append(value)
+
+    def add_fields(self, prefix: str, dictionary: dict) -> None:
+        """Add the values of a stored dictionary, naming nested fields by their
+        dotted path.
+
+        """
+        for key, value in dictionary.items():
+            if isinstance(value, (dict,)) and _ENCODING_KEY not in value:
+                self.add_fields(f"{prefix}{key}.", value)
+
+            else:
+                self.add(prefix + key, _load_leaf(value, self._blob_store))
+
+    def end_row(self) -> None:
+        """Fill columns missing from the current row."""
+        self._n_rows += 1
+
+        for name, column in self._columns.items():
+            if len(column) < self._n_rows:
+                if type(column) is not list:
+                    if column.typecode == "d":
+                        column.append(np.nan)
+                        continue
+
+                    column = self._columns[name] = column.tolist()
+
+                column.append(None)
+
+    def get_df(self) -> pd.DataFrame:
+        """Convert the columns, releasing each buffer once converted."""
+        data = {}
+        while self._columns:
+            name, column = self._columns.popitem()
+
+            if type(column) is list:
+                data[name] = pd.Series(column, dtype=None if column else object)
+
+            else:
+                data[name] = np.frombuffer(column, dtype=column.typecode)
+
+        return pd.DataFrame(dict(reversed(data.items())), copy=False)
+
+
+def get_results_df_from_documents(
+    documents: Iterable[Tuple[str, dict]], blob_store: Optional[BlobStore] = None
+) -> pd.DataFrame:
+    """Build a DataFrame of stored results column by column, without constructing
+    results. Nested fields are named by their dotted path, e.g. inputs.x, and
+    encoded values are decoded into their cells. Rows missing a column are filled
+    with None and column dtypes are inferred once all documents are read.
+
+    Args:
+        documents (Iterable[Tuple[str, dict]]): Pairs of project name and stored
+            result document, e.g. streamed from a cursor
+        blob_store (Optional[BlobStore]): Blob store for loading payloads moved to
+            blob storage
+
+    Returns:
+        pd.DataFrame: One row per document
+
+    """
+    columns = _ColumnBuilder(blob_store)
+
+    for project_name, document in documents:
+        columns.add("project_name", project_name)
+
+        for key, value in document.items():
+            if key == "_id":
+                columns.add("id", str(value))
+
+            elif isinstance(value, (dict,)) and _ENCODING_KEY not in value:
+                columns.add_fields(f"{key}.", value)
+
+            else:
+                columns.add(key, _load_leaf(value, blob_store))
+
+        columns.end_row()
+
+    return columns.get_df()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 from sqlalchemy import insert, select, desc
 import logging
 
@@ -319,6 +319,37 @@ class ModelDBService:
         else:
             raise FlowNotFoundError(query)
 
+    def get_model_flow_ids(self, model_id: int) -> Dict[str, List[str]]:
+        """Get the flows of all deployments of a model, joining deployments and
+        flows in a single query.
+
+        Args:
+            model_id (int): Id of the model
+
+        Returns:
+            Dict[str, List[str]]: Flow ids of the model grouped by project name
+
+        raises:
+            FlowNotFoundError: No flows are registered for the model
+        """
+
+        query = (
+            select(Flow)
+            .join(Deployment, Flow.deployment_id == Deployment.deployment_id)
+            .filter(Deployment.model_id == model_id)
+        )
+        result = self._model_db.select(query)
+
+        if len(result):
+            flow_ids = {}
+            for flow in result:
+                flow_ids.setdefault(flow.project_name, []).append(flow.flow_id)
+
+            return flow_ids
+
+        else:
+            raise FlowNotFoundError(query)
+
     @validate_kwargs_exist(FlowOfFlows)
     def get_flow_of_flows(self, **kwargs) -> Flow:
         """Get a flow from criteria
@@ -1,3 +1,4 @@
-from .db import ResultsDB, ResultsDBConfig
-from .service import ResultsDBService
+from .db import ResultsDB, ResultsDBConfig, ResultIndex, UpsertReport
+from .service import FindAcrossResults, ResultsDBService
 from .mongodb import MongodbResultsDB, MongodbResultsDBConfig
+from .profiling import QueryReport
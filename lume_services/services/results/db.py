@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 
 import logging
@@ -13,6 +14,45 @@ class ResultsDBConfig(BaseModel):
     ...
 
 
+class UpsertReport(BaseModel):
+    """Outcome of a bulk upsert. Items are identified by their position in the
+    submitted list.
+
+    Attr:
+        inserted (Dict[int, str]): Mapping of item index to id of the inserted document
+        matched (List[int]): Indices of items matching an existing document
+        failed (Dict[int, str]): Mapping of item index to error message
+
+    """
+
+    inserted: Dict[int, str] = {}
+    matched: List[int] = []
+    failed: Dict[int, str] = {}
+
+
+class ResultIndex(BaseModel):
+    """Secondary index of a results collection.
+
+    Attr:
+        fields (List[Tuple[str, int]]): List of (field, direction) pairs, with
+            direction 1 for ascending and -1 for descending
+        unique (bool): Whether indexed values must be unique
+        sparse (bool): Whether documents missing the indexed fields are skipped
+        partial_filter (Optional[dict]): Query selecting the indexed documents, e.g.
+            {"outputs.error": {"$exists": True}}
+
+    """
+
+    fields: List[Tuple[str, int]]
+    unique: bool = False
+    sparse: bool = False
+    partial_filter: Optional[dict] = None
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{field}_{direction}" for field, direction in self.fields)
+
+
 class ResultsDB(ABC):
     """Implementation of the database."""
 
@@ -44,6 +84,56 @@ class ResultsDB(ABC):
 
         """
 
+    @abstractmethod
+    def upsert_one(
+        self, item: dict, key: str = "unique_hash", **kwargs
+    ) -> Tuple[Any, bool]:
+        """Insert a document unless a document with the same key value exists.
+
+        Args:
+            item (dict): Dictionary representation of item
+            key (str): Field identifying the document
+
+        Returns:
+            Tuple[Any, bool]: Id of the inserted or existing document and whether the
+                document was inserted
+
+        """
+
+    @abstractmethod
+    def upsert_many(
+        self, items: List[dict], key: str = "unique_hash", **kwargs
+    ) -> UpsertReport:
+        """Insert many documents, skipping documents for which a document with the
+        same key value exists. Failure of an item does not stop the others.
+
+        Args:
+            items (List[dict]): List of dictionary representations of items
+            key (str): Field identifying documents
+
+        Returns:
+            UpsertReport: Inserted, matched and failed items
+
+        """
+
+    @abstractmethod
+    def insert_bucketed(
+        self, items: List[dict], bucket_seconds: int, bucket_size: int, **kwargs
+    ) -> List[str]:
+        """Insert many documents packed into bucket documents per flow and time
+        window. Bucketed documents are returned by find and find_iter as individual
+        documents.
+
+        Args:
+            items (List[dict]): List of dictionary representations of items
+            bucket_seconds (int): Width of the time window of a bucket in seconds
+            bucket_size (int): Maximum number of items per bucket
+
+        Returns:
+            List[str]: List of inserted ids
+
+        """
+
     @abstractmethod
     def find(self, *, query: dict, fields: List[str] = None, **kwargs) -> List[dict]:
         """Find a document based on a query.
@@ -58,6 +148,72 @@ class ResultsDB(ABC):
 
         """
 
+    @abstractmethod
+    def find_iter(
+        self,
+        *,
+        query: dict,
+        fields: List[str] = None,
+        batch_size: int = 1000,
+        sort: List[Tuple[str, int]] = None,
+        limit: int = 0,
+        **kwargs,
+    ) -> Iterator[dict]:
+        """Iterate over documents matching a query. Documents are fetched from the
+        database in batches, so memory use is bounded by the batch size rather than
+        the number of matching documents.
+
+        Args:
+            query (dict): fields to query on
+            fields (List[str]): List of fields to return if any
+            batch_size (int): Number of documents fetched per round trip
+            sort (List[Tuple[str, int]]): List of (field, direction) pairs for sorting
+            limit (int): Maximum number of documents to return. 0 for no limit.
+            **kwargs (dict): DB implementation specific fields
+
+        Returns:
+            Iterator[dict]: Iterator over dict reps of found items.
+
+        """
+
+    @abstractmethod
+    def find_time_range(
+        self,
+        *,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        time_field: str = "date_modified",
+        query: dict = None,
+        fields: List[str] = None,
+        **kwargs,
+    ) -> List[dict]:
+        """Find documents with a time field within a time range.
+
+        Args:
+            start (Optional[datetime]): Start of the range, inclusive
+            end (Optional[datetime]): End of the range, exclusive
+            time_field (str): Dotted name of the time field
+            query (dict): Additional query conditions
+            fields (List[str]): List of fields to return if any
+
+        Returns:
+            List[dict]: List of dict reps of found items.
+
+        """
+
+    @abstractmethod
+    def aggregate(self, *, pipeline: List[dict], **kwargs) -> List[dict]:
+        """Run an aggregation pipeline in the database.
+
+        Args:
+            pipeline (List[dict]): Aggregation stages
+            **kwargs (dict): DB implementation specific fields
+
+        Returns:
+            List[dict]: Documents output by the pipeline
+
+        """
+
     @abstractmethod
     def find_all(self, **kwargs) -> List[dict]:
         """Find all documents for a collection
@@ -67,5 +223,114 @@ class ResultsDB(ABC):
         """
 
     @abstractmethod
-    def configure(self, **kwargs) -> None:
-        """Configure the results db service."""
+    def insert_blob(self, key: str, data: bytes, **kwargs) -> str:
+        """Insert a binary payload into content-addressed blob storage. Payloads that
+        are already stored under the key are not written again.
+
+        Args:
+            key (str): Content hash of the payload
+            data (bytes): Payload to store
+
+        Returns:
+            str: Key of the stored payload
+
+        """
+
+    @abstractmethod
+    def find_blob(self, key: str, **kwargs) -> bytes:
+        """Load a binary payload from content-addressed blob storage.
+
+        Args:
+            key (str): Content hash of the payload
+
+        Returns:
+            bytes: Stored payload
+
+        """
+
+    @property
+    def blob_threshold(self) -> Optional[int]:
+        """Size in bytes above which binary payloads are moved to blob storage. None
+        if payloads are always stored in their documents.
+
+        """
+        return None
+
+    @property
+    def legacy_dataframes(self) -> bool:
+        """Whether strings of stored results are checked for DataFrames stored as
+        untagged json by earlier versions.
+
+        """
+        return False
+
+    def get_compression(self, collection: str) -> Optional[str]:
+        """Get the codec used for compressing binary payloads of results stored in a
+        collection.
+
+        Args:
+            collection (str): Collection name
+
+        Returns:
+            Optional[str]: Name of the compression codec or None if payloads are
+                stored uncompressed.
+
+        """
+        return None
+
+    @abstractmethod
+    def create_index(self, *, index: List[Tuple[str, int]], **kwargs) -> None:
+        """Create a secondary index. Existing indices are left unchanged.
+
+        Args:
+            index (List[Tuple[str, int]]): List of (field, direction) pairs
+
+        """
+
+    def find_summaries(self, collection: str, flow_ids: List[str]) -> List[dict]:
+        """Load the materialized summaries of flows. Results databases not
+        maintaining summaries return no summaries.
+
+        Args:
+            collection (str): Collection name
+            flow_ids (List[str]): Ids of the flows
+
+        Returns:
+            List[dict]: One row per summarized flow
+
+        """
+        return []
+
+    def get_query_profiles(self, collection: Optional[str] = None) -> List[dict]:
+        """Load profiles of recorded query shapes. Results databases not profiling
+        queries return no profiles.
+
+        Args:
+            collection (Optional[str]): Name of the queried collection. If None,
+                profiles of all collections are loaded.
+
+        Returns:
+            List[dict]: Query profiles, as accumulated by
+                lume_services.services.results.profiling.QueryProfiler
+
+        """
+        return []
+
+    def rebuild_summaries(self, collection: str) -> None:
+        """Recompute the materialized summaries of a collection from the stored
+        results.
+
+        Args:
+            collection (str): Collection name
+
+        """
+
+    @abstractmethod
+    def configure(self, **kwargs) -> Optional[Dict[str, List[ResultIndex]]]:
+        """Configure the results db service.
+
+        Returns:
+            Optional[Dict[str, List[ResultIndex]]]: Mapping of collection to declared
+                secondary indices missing after configuration, if supported
+
+        """
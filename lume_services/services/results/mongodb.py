@@ -1,8 +1,23 @@
+import calendar
 import os
+import threading
+import time
+from datetime import datetime
 from pydantic import SecretStr, Field
-from typing import List, Optional, Dict
-
-from pymongo import DESCENDING, MongoClient
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bson.codec_options import CodecOptions
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from pymongo import ASCENDING, DESCENDING, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import (
+    BulkWriteError,
+    CollectionInvalid,
+    DuplicateKeyError,
+    OperationFailure,
+)
+from gridfs import GridFS
+from gridfs.errors import FileExists, NoFile
 from pydantic import BaseModel
 
 from contextvars import ContextVar
@@ -11,7 +26,10 @@ from contextlib import contextmanager
 from lume_services.services.results.db import (
     ResultsDBConfig,
     ResultsDB,
+    ResultIndex,
+    UpsertReport,
 )
+from lume_services.services.results.profiling import QueryProfiler, get_plan_summary
 
 
 import logging
@@ -20,6 +38,165 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _get_field_value(document: dict, field: str) -> Any:
+    """Get the value of a dotted field of a document, or None if missing."""
+    value = document
+    for key in field.split("."):
+        if not isinstance(value, (dict,)) or key not in value:
+            return None
+
+        value = value[key]
+
+    return value
+
+
+# fields of bucketed results stored as arrays, with inputs and outputs stored as one
+# array per key
+_BUCKET_FIELDS = ("inputs", "outputs")
+
+# query operators selecting an array if any element is selected, so that conditions
+# on bucketed fields select a superset of the buckets holding matching results
+_ELEMENT_OPERATORS = {"$eq", "$gt", "$gte", "$lt", "$lte", "$in"}
+
+
+def _get_bucket_collection(collection: str) -> str:
+    return f"{collection}.buckets"
+
+
+def _index_matches(index: ResultIndex, index_info: dict) -> bool:
+    """Check whether an index of the same name, fields and options is present in
+    the index information of a collection.
+
+    """
+    info = index_info.get(index.name)
+    if info is None:
+        return False
+
+    return (
+        [(field, int(direction)) for field, direction in info["key"]]
+        == [(field, int(direction)) for field, direction in index.fields]
+        and info.get("unique", False) == index.unique
+        and info.get("sparse", False) == index.sparse
+        and info.get("partialFilterExpression") == index.partial_filter
+    )
+
+
+def _get_bucket_prefilter(query: dict) -> dict:
+    """Get the conditions of a query that can be applied to bucket documents before
+    unpacking. Selected buckets may hold results not matching the query.
+
+    """
+    prefilter = {}
+    for field, condition in (query or {}).items():
+        if field.startswith("$") or field == "_id":
+            continue
+
+        if isinstance(condition, (dict,)):
+            if not condition or not set(condition).issubset(_ELEMENT_OPERATORS):
+                continue
+
+        elif isinstance(condition, (list,)):
+            continue
+
+        # bucket time ranges are indexed, unlike the date_modified arrays
+        if field == "date_modified" and isinstance(condition, (dict,)):
+            for operator, value in condition.items():
+                if operator in ("$gt", "$gte", "$eq"):
+                    prefilter.setdefault("end", {})[
+                        "$gte" if operator == "$eq" else operator
+                    ] = value
+
+                if operator in ("$lt", "$lte", "$eq"):
+                    prefilter.setdefault("start", {})[
+                        "$lte" if operator == "$eq" else operator
+                    ] = value
+
+            continue
+
+        prefilter[field] = condition
+
+    return prefilter
+
+
+def _get_unpack_pipeline(query: dict) -> List[dict]:
+    """Get aggregation stages unpacking bucket documents into one document per
+    result and applying the query to the unpacked documents.
+
+    """
+    project = {
+        "_id": {"$concat": [{"$toString": "$_id"}, ":", {"$toString": "$_index"}]},
+        "flow_id": True,
+        "result_type_string": True,
+        "unique_hash": {"$arrayElemAt": ["$unique_hash", "$_index"]},
+        "date_modified": True,
+    }
+    for field in _BUCKET_FIELDS:
+        project[field] = {
+            "$arrayToObject": {
+                "$map": {
+                    "input": {"$objectToArray": f"${field}"},
+                    "as": "column",
+                    "in": {
+                        "k": "$$column.k",
+                        "v": {"$arrayElemAt": ["$$column.v", "$_index"]},
+                    },
+                }
+            }
+        }
+
+    return [
+        {"$match": _get_bucket_prefilter(query)},
+        {"$unwind": {"path": "$date_modified", "includeArrayIndex": "_index"}},
+        {"$project": project},
+        {"$match": query or {}},
+    ]
+
+
+def _get_union_pipeline(collection: str, pipeline: List[dict]) -> List[dict]:
+    """Get an aggregation pipeline passing the documents of a collection along with
+    the unpacked documents of its bucket collection to the given stages. A leading
+    $match stage is applied to both before the union.
+
+    """
+    stages = list(pipeline)
+    head = []
+    query = None
+    if stages and "$match" in stages[0]:
+        head = [stages.pop(0)]
+        query = head[0]["$match"]
+
+    union = {
+        "$unionWith": {
+            "coll": _get_bucket_collection(collection),
+            "pipeline": _get_unpack_pipeline(query),
+        }
+    }
+
+    return head + [union] + stages
+
+
+def _get_aggregation_projection(fields) -> dict:
+    """Convert a find projection, given as list of fields or as mapping, to a
+    $project stage specification.
+
+    """
+    if not isinstance(fields, (dict,)):
+        return {field: True for field in fields}
+
+    projection = {}
+    for field, value in fields.items():
+        if isinstance(value, (dict,)) and "$slice" in value:
+            bounds = value["$slice"]
+            if not isinstance(bounds, (list,)):
+                bounds = [bounds]
+
+            value = {"$slice": [f"${field}", *bounds]}
+
+        projection[field] = value
+
+    return projection
+
+
 class MongodbResultsDBConfig(ResultsDBConfig):
     """Configuration for connecting to Mongodb using the PyMongo driver.
 
@@ -31,6 +208,25 @@ class MongodbResultsDBConfig(ResultsDBConfig):
         port (int): Host port of mongodb service endpoint.
         authMechanism (str): Auth mechanism supported by PyMongo driver. See https://pymongo.readthedocs.io/en/stable/api/pymongo/database.html#pymongo.auth.MECHANISMS.
         options (dict): Dictionary of additional connection options for MongoClient. https://pymongo.readthedocs.io/en/stable/api/pymongo/mongo_client.html#pymongo.mongo_client.MongoClient
+        pooled (bool): If True, a single long-lived MongoClient is shared by all operations in the process. If False, a client is created and closed for each scoped operation.
+        maxPoolSize (int): Maximum number of connections held by the client connection pool.
+        minPoolSize (int): Minimum number of connections the client keeps open. Used for warm-up of pooled clients.
+        blob_threshold (Optional[int]): Size in bytes above which binary payloads of results are moved to content-addressed blob storage. If None, payloads are stored in their documents.
+        blob_bucket (str): Name of the GridFS bucket used for blob storage.
+        bucket_check_interval (Optional[float]): Time in seconds after which collections without bucket documents are checked again for bucket collections created by other processes. If None, collections are checked once per process.
+        compression (Dict[str, str]): Mapping of collection name to the codec used for compressing binary payloads of results stored in the collection. Supported codecs are zlib, zstd and lz4. Payloads of collections not listed are stored uncompressed.
+        legacy_dataframes (bool): If True, strings of loaded results are checked for DataFrames stored as untagged json by versions before tagged DataFrame encoding. Enable only for databases holding such results, as strings holding json objects of objects are loaded as DataFrames.
+        write_behind (bool): If True, the results database service writes inserts in batches from a background thread. See ResultsDBService.
+        write_batch_size (int): Maximum number of inserts per batch in write-behind mode.
+        write_flush_interval (float): Time in seconds a write-behind batch waits for further inserts.
+        summaries (Dict[str, List[str]]): Mapping of collection name to dotted scalar fields, e.g. ["outputs.energy"], summarized per flow_id. Summaries of the listed collections are updated on every insert.
+        summary_collection (str): Name of the collection holding the summaries.
+        timeseries (Dict[str, str]): Mapping of collection name to the granularity, seconds, minutes or hours, of a MongoDB time-series collection created for the collection on first write, with date_modified as time field and flow_id as meta field. Existing collections are not converted. Time-series collections do not support unique indices, so results are deduplicated with a query before insert.
+        result_types (Dict[str, List[str]]): Mapping of collection name to import paths of the result types stored in the collection, e.g. {"impact": ["lume_services.results.ImpactResult"]}. The unique index and the secondary indices declared by the result types are created when the environment is configured, and missing indices are logged.
+        profile (bool): If True, shapes and latencies of find queries are recorded, and a sample of queries is explained for index recommendations.
+        profile_sample_rate (float): Fraction of profiled queries explained. Explained queries are executed a second time.
+        profile_flush_interval (float): Time in seconds between writes of the profiles recorded by the process to the profile collection.
+        profile_collection (str): Name of the collection holding the query profiles.
 
     """  # noqa
 
@@ -45,6 +241,25 @@ class MongodbResultsDBConfig(ResultsDBConfig):
     # Literal["DEFAULT", 'GSSAPI', 'MONGODB-AWS', 'MONGODB-CR', 'MONGODB-X509',
     # 'PLAIN', 'SCRAM-SHA-1', 'SCRAM-SHA-256'] = "DEFAULT"
     options: dict = Field({}, exclude=True)
+    pooled: bool = Field(False, exclude=True)
+    maxPoolSize: int = 100
+    minPoolSize: int = 0
+    blob_threshold: Optional[int] = Field(None, exclude=True)
+    blob_bucket: str = Field("blobs", exclude=True)
+    bucket_check_interval: Optional[float] = Field(None, exclude=True)
+    compression: Dict[str, str] = Field({}, exclude=True)
+    legacy_dataframes: bool = Field(False, exclude=True)
+    write_behind: bool = Field(False, exclude=True)
+    write_batch_size: int = Field(100, exclude=True)
+    write_flush_interval: float = Field(0.0, exclude=True)
+    summaries: Dict[str, List[str]] = Field({}, exclude=True)
+    summary_collection: str = Field("result_summaries", exclude=True)
+    timeseries: Dict[str, str] = Field({}, exclude=True)
+    result_types: Dict[str, List[str]] = Field({}, exclude=True)
+    profile: bool = Field(False, exclude=True)
+    profile_sample_rate: float = Field(0.01, exclude=True)
+    profile_flush_interval: float = Field(60.0, exclude=True)
+    profile_collection: str = Field("query_profiles", exclude=True)
 
     class Config:
         allow_population_by_field_name = True
@@ -55,6 +270,10 @@ class MongodbCollection(BaseModel):
     name: str
     # index info
     indices: dict
+    # whether results are also stored in bucket documents
+    bucketed: bool = False
+    # monotonic time of the last check for a bucket collection
+    bucketed_checked: float = Field(default_factory=time.monotonic)
 
 
 class MongodbResultsDB(ResultsDB):
@@ -66,41 +285,67 @@ class MongodbResultsDB(ResultsDB):
         # track pid to make multiprocessing safe
         self._pid = os.getpid()
         self._client = ContextVar("client", default=None)
-        self._collections = ContextVar("collections", default={})
 
-    def _connect(self) -> MongoClient:
-        """Establish connection and set _client."""
+        # collection and index metadata, loaded lazily per collection
+        self._collections = {}
+
+        # time-series collections created or found by this process
+        self._timeseries_collections = set()
+
+        # process-wide client used in pooled mode
+        self._pooled_client = None
+        self._pooled_client_lock = threading.Lock()
+
+        # query shapes and latencies recorded in profile mode
+        self._profiler = None
+        if db_config.profile:
+            self._profiler = QueryProfiler(db_config.profile_sample_rate)
+
+    def _create_client(self) -> MongoClient:
+        """Create a new MongoClient from the configuration."""
 
-        client = MongoClient(
+        return MongoClient(
             **self.config.dict(exclude_none=True, by_alias=True),
             password=self.config.password.get_secret_value(),
-            **self.config.options
+            **self.config.options,
         )
 
+    def _connect(self) -> MongoClient:
+        """Establish connection and set _client."""
+
+        if self.config.pooled:
+            return self._get_pooled_client()
+
+        client = self._create_client()
         self._client.set(client)
-        db = client[self.config.database]
 
-        collections = {}
+        return client
 
-        for collection_name in db.list_collection_names():
-            collection = db[collection_name]
-            index_info = collection.index_information()
-            collections[collection_name] = MongodbCollection(
-                database=self.config.database, name=collection_name, indices=index_info
-            )
+    def _get_pooled_client(self) -> MongoClient:
+        """Get the process-wide pooled client, creating it on first use."""
 
-        self._collections.set(collections)
+        with self._pooled_client_lock:
+            if self._pooled_client is None:
+                logger.debug("Creating pooled MongoClient.")
+                self._pooled_client = self._create_client()
 
-        return client
+        return self._pooled_client
 
     def _check_mp(self) -> None:
-        """Check for multiprocessing. If PID is different that object PID, create new
-        engine connection.
+        """Check for multiprocessing. If PID is different that object PID, drop the
+        clients inherited from the parent process so that a new connection is created
+        on the next operation.
 
         """
 
         if os.getpid() != self._pid:
-            self._connect()
+            self._pid = os.getpid()
+
+            # MongoClient is not fork-safe, so the parent's clients are dropped
+            # without closing
+            self._pooled_client = None
+            self._pooled_client_lock = threading.Lock()
+            self._client.set(None)
 
     @property
     def _currect_connection(self) -> MongoClient:
@@ -114,20 +359,39 @@ class MongodbResultsDB(ResultsDB):
         if client is not None:
             client.close()
         self._client.set(None)
-        self._collections.set(None)
 
     def disconnect(self):
         """Disconnect mongodb connection."""
         self._disconnect()
 
+    def close(self):
+        """Close the pooled client and any client held by the current context. A new
+        pooled client will be created on the next operation. Recorded query profiles
+        are written before closing.
+
+        """
+        self.flush_query_profiles()
+
+        with self._pooled_client_lock:
+            if self._pooled_client is not None:
+                self._pooled_client.close()
+                self._pooled_client = None
+
+        self._disconnect()
+
     @contextmanager
     def client(self) -> MongoClient:
         """Context manager for mongoclient. Will check for multiprocessing and restart
-        accordingly.
+        accordingly. In pooled mode, the process-wide client is yielded and left open
+        on exit.
 
         """
         self._check_mp()
 
+        if self.config.pooled:
+            yield self._get_pooled_client()
+            return
+
         # get connection
         client = self._client.get()
 
@@ -149,6 +413,146 @@ class MongodbResultsDB(ResultsDB):
                     self._disconnect()
                     self._client.set(None)
 
+    def get_collection(
+        self, collection: str, refresh: bool = False
+    ) -> MongodbCollection:
+        """Get collection and index metadata. Metadata is loaded from the database on
+        first access and cached until indices are changed by configure.
+
+        Args:
+            collection (str): Name of collection
+            refresh (bool): Whether to reload the metadata, e.g. to find indices
+                built by other processes
+
+        Returns:
+            MongodbCollection: Collection metadata
+
+        """
+        collection_metadata = self._collections.get(collection)
+
+        if collection_metadata is None or refresh:
+            with self.client() as client:
+                db = client[self.config.database]
+                index_info = db[collection].index_information()
+                bucketed = bool(
+                    db.list_collection_names(
+                        filter={"name": _get_bucket_collection(collection)}
+                    )
+                )
+
+            collection_metadata = MongodbCollection(
+                database=self.config.database,
+                name=collection,
+                indices=index_info,
+                bucketed=bucketed,
+            )
+            self._collections[collection] = collection_metadata
+
+        return collection_metadata
+
+    def _is_bucketed(self, collection: str) -> bool:
+        """Whether results of a collection are also stored in bucket documents.
+        If a bucket check interval is configured, collections without buckets are
+        checked again once the interval has passed, so bucket collections created by
+        other processes are found.
+
+        """
+        collection_metadata = self.get_collection(collection)
+        if collection_metadata.bucketed:
+            return True
+
+        interval = self.config.bucket_check_interval
+        if interval is None:
+            return False
+
+        now = time.monotonic()
+        if now - collection_metadata.bucketed_checked >= interval:
+            with self.client() as client:
+                db = client[self.config.database]
+                collection_metadata.bucketed = bool(
+                    db.list_collection_names(
+                        filter={"name": _get_bucket_collection(collection)}
+                    )
+                )
+
+            collection_metadata.bucketed_checked = now
+
+        return collection_metadata.bucketed
+
+    def _create_timeseries_collection(self, db, collection: str) -> None:
+        """Create the collection as time-series collection on first write, if
+        configured. Existing collections are left unchanged.
+
+        """
+        granularity = self.config.timeseries.get(collection)
+        if granularity is None or collection in self._timeseries_collections:
+            return
+
+        try:
+            db.create_collection(
+                collection,
+                timeseries={
+                    "timeField": "date_modified",
+                    "metaField": "flow_id",
+                    "granularity": granularity,
+                },
+            )
+
+        # created by another process
+        except CollectionInvalid:
+            pass
+
+        self._timeseries_collections.add(collection)
+
+    def _insert_new(
+        self, db_collection, items: List[dict], key: str
+    ) -> Tuple[Dict[int, Any], List[dict]]:
+        """Insert items unless a document with the same key value exists, for
+        collections not supporting upserts. Unlike upserts, concurrent inserts of
+        the same item may both be written.
+
+        Returns:
+            Tuple[Dict[int, Any], List[dict]]: Mapping of item index to id of the
+                inserted document, and write errors
+
+        """
+        stored = {
+            document[key]
+            for document in db_collection.find(
+                {key: {"$in": [item[key] for item in items]}},
+                projection={key: True},
+            )
+        }
+
+        new = {}
+        for index, item in enumerate(items):
+            if item[key] not in stored:
+                stored.add(item[key])
+                new[index] = dict(item)
+
+        if not new:
+            return {}, []
+
+        indices = list(new)
+        try:
+            db_collection.insert_many(list(new.values()), ordered=False)
+            errors = []
+
+        except BulkWriteError as err:
+            errors = [
+                {**error, "index": indices[error["index"]]}
+                for error in err.details["writeErrors"]
+            ]
+
+        failed = {error["index"] for error in errors}
+        upserted = {
+            index: document["_id"]
+            for index, document in new.items()
+            if index not in failed
+        }
+
+        return upserted, errors
+
     def insert_one(self, collection: str, **kwargs) -> str:
         """Insert one document into the database.
 
@@ -163,6 +567,7 @@ class MongodbResultsDB(ResultsDB):
         # conver to bson
         with self.client() as client:
             db = client[self.config.database]
+            self._create_timeseries_collection(db, collection)
             db_collection = db[collection]
             inserted_id = db_collection.insert_one(kwargs).inserted_id
 
@@ -173,6 +578,8 @@ class MongodbResultsDB(ResultsDB):
                     collection,
                 )
 
+            self._update_summaries(db, collection, [kwargs])
+
         return inserted_id
 
     def insert_many(self, collection: str, items: List[dict]) -> List[str]:
@@ -190,13 +597,443 @@ class MongodbResultsDB(ResultsDB):
         # make items bsonable
         with self.client() as client:
             db = client[self.config.database]
+            self._create_timeseries_collection(db, collection)
             db_collection = db[collection]
             inserted_ids = db_collection.insert_many(items).inserted_ids
 
+            self._update_summaries(db, collection, items)
+
         return [inserted_id.str for inserted_id in inserted_ids]
 
+    def upsert_one(self, item: dict, key: str = "unique_hash") -> Tuple[Any, bool]:
+        """Insert a document unless a document with the same key value exists. The
+        document id is assigned before the write, so a single round trip determines
+        whether the document was inserted.
+
+        Args:
+            item (dict): Representation of document, with the name of the collection
+                for saving the document under the collection key
+            key (str): Field identifying the document
+
+        Returns:
+            Tuple[Any, bool]: Id of the inserted or existing document and whether the
+                document was inserted
+
+        """
+        document = {
+            field: value for field, value in item.items() if field != "collection"
+        }
+        document.setdefault("_id", ObjectId())
+
+        with self.client() as client:
+            db = client[self.config.database]
+            self._create_timeseries_collection(db, item["collection"])
+            db_collection = db[item["collection"]]
+
+            if item["collection"] in self.config.timeseries:
+                existing = db_collection.find_one(
+                    {key: document[key]}, projection={"_id": True}
+                )
+                if existing is None:
+                    db_collection.insert_one(document)
+
+            else:
+                try:
+                    existing = db_collection.find_one_and_update(
+                        {key: document[key]},
+                        {"$setOnInsert": document},
+                        projection={"_id": True},
+                        upsert=True,
+                        return_document=ReturnDocument.BEFORE,
+                    )
+
+                # concurrent upsert of the same document
+                except DuplicateKeyError:
+                    existing = db_collection.find_one(
+                        {key: document[key]}, projection={"_id": True}
+                    )
+
+            if existing is None:
+                self._update_summaries(db, item["collection"], [document])
+
+        if existing is None:
+            return document["_id"], True
+
+        return existing["_id"], False
+
+    def upsert_many(
+        self, collection: str, items: List[dict], key: str = "unique_hash"
+    ) -> UpsertReport:
+        """Insert many documents with a single unordered bulk write, skipping
+        documents for which a document with the same key value exists. Failed writes
+        do not stop the remaining writes. Items for time-series collections are
+        checked with one query and the new items are inserted.
+
+        Args:
+            collection (str): Name of collection for saving documents
+            items (List[dict]): List of dictionary reps of documents to save to database
+            key (str): Field identifying documents
+
+        Returns:
+            UpsertReport: Inserted, matched and failed items
+
+        """
+        if not len(items):
+            return UpsertReport()
+
+        with self.client() as client:
+            db = client[self.config.database]
+            self._create_timeseries_collection(db, collection)
+
+            if collection in self.config.timeseries:
+                upserted, errors = self._insert_new(db[collection], items, key)
+
+            else:
+                operations = [
+                    UpdateOne({key: item[key]}, {"$setOnInsert": item}, upsert=True)
+                    for item in items
+                ]
+
+                try:
+                    details = db[collection].bulk_write(operations, ordered=False)
+                    upserted = details.upserted_ids
+                    errors = []
+
+                except BulkWriteError as err:
+                    upserted = {
+                        upsert["index"]: upsert["_id"]
+                        for upsert in err.details["upserted"]
+                    }
+                    errors = err.details["writeErrors"]
+
+            self._update_summaries(
+                db,
+                collection,
+                [{**items[index], "_id": _id} for index, _id in upserted.items()],
+            )
+
+        failed = {}
+        for error in errors:
+            # concurrent upsert of the same document
+            if error["code"] == 11000:
+                continue
+
+            failed[error["index"]] = error["errmsg"]
+
+        return UpsertReport(
+            inserted={index: str(_id) for index, _id in upserted.items()},
+            matched=[
+                index
+                for index in range(len(items))
+                if index not in upserted and index not in failed
+            ],
+            failed=failed,
+        )
+
+    def insert_bucketed(
+        self,
+        collection: str,
+        items: List[dict],
+        bucket_seconds: int,
+        bucket_size: int = 1000,
+    ) -> List[str]:
+        """Insert many documents packed into bucket documents, stored in a separate
+        collection. A bucket holds the items of a flow and result type with the same
+        inputs and outputs keys and a date_modified within the same time window, and
+        stores each field as an array. Items are appended to open buckets with one
+        update per bucket, and a new bucket is started once a bucket is full.
+
+        Args:
+            collection (str): Name of collection for saving documents
+            items (List[dict]): List of dictionary reps of documents to save to database
+            bucket_seconds (int): Width of the time window of a bucket in seconds
+            bucket_size (int): Maximum number of items per bucket
+
+        Returns:
+            List[str]: Ids of the inserted documents, formed from the bucket id and the
+                position of the document in the bucket
+
+        """
+        groups = {}
+        for index, item in enumerate(items):
+            extra_fields = set(item) - {
+                "_id",
+                "flow_id",
+                "result_type_string",
+                "unique_hash",
+                "date_modified",
+                *_BUCKET_FIELDS,
+            }
+            if extra_fields:
+                raise ValueError(
+                    f"Unable to store fields {sorted(extra_fields)} in buckets"
+                )
+
+            timestamp = calendar.timegm(item["date_modified"].utctimetuple())
+            columns = tuple(
+                f"{field}.{key}"
+                for field in _BUCKET_FIELDS
+                for key in sorted(item[field])
+            )
+            groups.setdefault(
+                (
+                    item["flow_id"],
+                    item["result_type_string"],
+                    datetime.utcfromtimestamp(timestamp - timestamp % bucket_seconds),
+                    columns,
+                ),
+                [],
+            ).append(index)
+
+        inserted_ids = [None] * len(items)
+        with self.client() as client:
+            db = client[self.config.database]
+            bucket_collection = db[_get_bucket_collection(collection)]
+
+            collection_metadata = self.get_collection(collection)
+            if not collection_metadata.bucketed:
+                bucket_collection.create_index(
+                    [
+                        ("flow_id", ASCENDING),
+                        ("bucket_start", ASCENDING),
+                        ("count", ASCENDING),
+                    ]
+                )
+                bucket_collection.create_index(
+                    [("flow_id", ASCENDING), ("start", ASCENDING)]
+                )
+                # results are loaded by unique hash, e.g. by Result.unique_rep
+                bucket_collection.create_index([("unique_hash", ASCENDING)])
+                collection_metadata.bucketed = True
+
+            for group, indices in groups.items():
+                flow_id, result_type_string, bucket_start, columns = group
+                for start in range(0, len(indices), bucket_size):
+                    chunk = indices[start : start + bucket_size]
+                    date_modified = [items[index]["date_modified"] for index in chunk]
+
+                    unique_hash = [items[index].get("unique_hash") for index in chunk]
+                    push = {
+                        "unique_hash": {"$each": unique_hash},
+                        "date_modified": {"$each": date_modified},
+                    }
+                    for column in columns:
+                        field, key = column.split(".", 1)
+                        push[column] = {
+                            "$each": [items[index][field][key] for index in chunk]
+                        }
+
+                    bucket = bucket_collection.find_one_and_update(
+                        {
+                            "flow_id": flow_id,
+                            "result_type_string": result_type_string,
+                            "bucket_start": bucket_start,
+                            "columns": list(columns),
+                            "count": {"$lte": bucket_size - len(chunk)},
+                        },
+                        {
+                            "$push": push,
+                            "$inc": {"count": len(chunk)},
+                            "$min": {"start": min(date_modified)},
+                            "$max": {"end": max(date_modified)},
+                        },
+                        projection={"count": True},
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER,
+                    )
+
+                    # the chunk is appended at the end of the bucket arrays
+                    offset = bucket["count"] - len(chunk)
+                    for position, index in enumerate(chunk):
+                        inserted_ids[index] = f"{bucket['_id']}:{offset + position}"
+
+            self._update_summaries(
+                db,
+                collection,
+                [
+                    {**item, "_id": inserted_id}
+                    for item, inserted_id in zip(items, inserted_ids)
+                ],
+            )
+
+        return inserted_ids
+
+    def _update_summaries(self, db, collection: str, documents: List[dict]) -> None:
+        """Fold inserted documents into the summaries of their flows, with one upsert
+        per flow. Failed updates are logged rather than raised, as the documents are
+        already stored. Summaries can then be restored with rebuild_summaries.
+
+        """
+        fields = self.config.summaries.get(collection)
+        if fields is None or not documents:
+            return
+
+        updates = {}
+        for document in documents:
+            update = updates.setdefault(
+                document.get("flow_id"),
+                {"$inc": {"count": 0}, "$min": {}, "$max": {}},
+            )
+            update["$inc"]["count"] += 1
+
+            # embedded documents compare field by field, so the latest result is
+            # kept with a single $max
+            if document.get("date_modified") is not None:
+                latest = update["$max"].get("latest")
+                if latest is None or (document["date_modified"], document["_id"]) > (
+                    latest["date_modified"],
+                    latest["id"],
+                ):
+                    update["$max"]["latest"] = {
+                        "date_modified": document["date_modified"],
+                        "id": document["_id"],
+                    }
+
+            for field in fields:
+                value = _get_field_value(document, field)
+                if not isinstance(value, (int, float)) or isinstance(value, (bool,)):
+                    continue
+
+                update["$inc"][f"sum.{field}"] = (
+                    update["$inc"].get(f"sum.{field}", 0) + value
+                )
+                update["$inc"][f"n.{field}"] = update["$inc"].get(f"n.{field}", 0) + 1
+                update["$min"][f"min.{field}"] = min(
+                    update["$min"].get(f"min.{field}", value), value
+                )
+                update["$max"][f"max.{field}"] = max(
+                    update["$max"].get(f"max.{field}", value), value
+                )
+
+        operations = [
+            UpdateOne(
+                {"_id": {"collection": collection, "flow_id": flow_id}},
+                {operator: spec for operator, spec in update.items() if spec},
+                upsert=True,
+            )
+            for flow_id, update in updates.items()
+        ]
+
+        try:
+            db[self.config.summary_collection].bulk_write(operations, ordered=False)
+
+        except Exception:
+            logger.exception("Unable to update result summaries of %s", collection)
+
+    def find_summaries(self, collection: str, flow_ids: List[str]) -> List[dict]:
+        """Load the summaries of flows.
+
+        Args:
+            collection (str): Name of the collection holding the results
+            flow_ids (List[str]): Ids of the flows
+
+        Returns:
+            List[dict]: One row per summarized flow holding the flow_id, the count,
+                the date_modified and id of the latest result and the min, max, mean
+                and count of each summarized field named as field.stat.
+
+        """
+        fields = self.config.summaries.get(collection, [])
+
+        with self.client() as client:
+            db = client[self.config.database]
+            summaries = db[self.config.summary_collection].find(
+                {
+                    "_id": {
+                        "$in": [
+                            {"collection": collection, "flow_id": flow_id}
+                            for flow_id in flow_ids
+                        ]
+                    }
+                }
+            )
+
+            rows = []
+            for summary in summaries:
+                latest = summary.get("latest", {})
+                row = {
+                    "flow_id": summary["_id"]["flow_id"],
+                    "count": summary["count"],
+                    "latest_date_modified": latest.get("date_modified"),
+                    "latest_id": str(latest["id"]) if "id" in latest else None,
+                }
+
+                for field in fields:
+                    n = _get_field_value(summary.get("n", {}), field)
+                    if not n:
+                        continue
+
+                    row[f"{field}.min"] = _get_field_value(summary["min"], field)
+                    row[f"{field}.max"] = _get_field_value(summary["max"], field)
+                    row[f"{field}.mean"] = _get_field_value(summary["sum"], field) / n
+                    row[f"{field}.count"] = n
+
+                rows.append(row)
+
+        return rows
+
+    def rebuild_summaries(self, collection: str) -> None:
+        """Recompute the summaries of all flows of a collection from the stored
+        results, e.g. after enabling summaries for a collection holding results.
+
+        Args:
+            collection (str): Name of the collection holding the results
+
+        """
+        fields = self.config.summaries.get(collection, [])
+
+        group = {
+            "_id": "$flow_id",
+            "count": {"$sum": 1},
+            "latest": {"$max": {"date_modified": "$date_modified", "id": "$_id"}},
+        }
+        project = {
+            "_id": {"collection": {"$literal": collection}, "flow_id": "$_id"},
+            "count": True,
+            "latest": True,
+        }
+        for i, field in enumerate(fields):
+            number = {"$cond": [{"$isNumber": f"${field}"}, f"${field}", None]}
+            group[f"_{i}_min"] = {"$min": number}
+            group[f"_{i}_max"] = {"$max": number}
+            group[f"_{i}_sum"] = {"$sum": number}
+            group[f"_{i}_n"] = {"$sum": {"$cond": [{"$isNumber": f"${field}"}, 1, 0]}}
+
+            for stat in ["min", "max", "sum", "n"]:
+                project[f"{stat}.{field}"] = f"$_{i}_{stat}"
+
+        self.aggregate(
+            collection,
+            [
+                {"$group": group},
+                {"$project": project},
+                {
+                    "$merge": {
+                        "into": self.config.summary_collection,
+                        "whenMatched": "replace",
+                    }
+                },
+            ],
+        )
+
+    def _get_db_collection(self, db, collection: str, raw: bool = False):
+        """Get a pymongo collection. Raw collections return documents as
+        RawBSONDocuments, which are decoded on access.
+
+        """
+        if raw:
+            return db.get_collection(
+                collection, codec_options=CodecOptions(document_class=RawBSONDocument)
+            )
+
+        return db[collection]
+
     def find(
-        self, collection: str, query: dict = None, fields: List[str] = None
+        self,
+        collection: str,
+        query: dict = None,
+        fields: List[str] = None,
+        raw: bool = False,
     ) -> List[dict]:
         """Find a document based on a query.
 
@@ -204,26 +1041,409 @@ class MongodbResultsDB(ResultsDB):
             collection (str): Document type to query
             query (dict): Query in dictionary form mapping fields to values
             fields (List[str]): List of fields for filtering result
+            raw (bool): Whether to return undecoded RawBSONDocuments
 
         Returns:
             List[dict]: List of of saved document ids.
 
         """
 
+        if self._is_bucketed(collection):
+            return list(
+                self._find_with_buckets(collection, query=query, fields=fields, raw=raw)
+            )
+
         with self.client() as client:
             db = client[self.config.database]
+            db_collection = self._get_db_collection(db, collection, raw=raw)
             if fields is None:
-                results = db[collection].find(query)
+                results = db_collection.find(query)
 
             else:
-                results = db[collection].find(query, projection=fields)
+                results = db_collection.find(query, projection=fields)
 
-            results = list(results)
+            results = list(self._iter_profiled(db, collection, query, results))
 
         # convert types to python
 
         return results
 
+    def find_iter(
+        self,
+        collection: str,
+        query: dict = None,
+        fields: List[str] = None,
+        batch_size: int = 1000,
+        sort: List[Tuple[str, int]] = None,
+        limit: int = 0,
+        raw: bool = False,
+    ) -> Iterator[dict]:
+        """Iterate over documents matching a query using a server-side cursor. The
+        client is held open until the iterator is exhausted or closed.
+
+        Args:
+            collection (str): Document type to query
+            query (dict): Query in dictionary form mapping fields to values
+            fields (List[str]): List of fields for filtering result
+            batch_size (int): Number of documents fetched per round trip
+            sort (List[Tuple[str, int]]): List of (field, direction) pairs for sorting
+            limit (int): Maximum number of documents to return. 0 for no limit.
+            raw (bool): Whether to yield undecoded RawBSONDocuments
+
+        Yields:
+            dict: Found documents
+
+        """
+
+        if self._is_bucketed(collection):
+            yield from self._find_with_buckets(
+                collection,
+                query=query,
+                fields=fields,
+                batch_size=batch_size,
+                sort=sort,
+                limit=limit,
+                raw=raw,
+            )
+            return
+
+        with self.client() as client:
+            db = client[self.config.database]
+            cursor = self._get_db_collection(db, collection, raw=raw).find(
+                query, projection=fields, batch_size=batch_size, limit=limit
+            )
+
+            if sort is not None:
+                cursor = cursor.sort(sort)
+
+            try:
+                yield from self._iter_profiled(
+                    db, collection, query, cursor, sort=sort, limit=limit
+                )
+
+            finally:
+                cursor.close()
+
+    def create_index(self, collection: str, index: List[Tuple[str, int]]) -> None:
+        """Create a secondary index unless present in the collection metadata.
+
+        Args:
+            collection (str): Name of collection
+            index (List[Tuple[str, int]]): List of (field, direction) pairs
+
+        """
+        collection_metadata = self.get_collection(collection)
+        name = "_".join(f"{field}_{direction}" for field, direction in index)
+        if name in collection_metadata.indices:
+            return
+
+        with self.client() as client:
+            db = client[self.config.database]
+            self._create_timeseries_collection(db, collection)
+            db[collection].create_index(index)
+            collection_metadata.indices = db[collection].index_information()
+
+    def find_time_range(
+        self,
+        collection: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        time_field: str = "date_modified",
+        query: dict = None,
+        fields: List[str] = None,
+        sort: List[Tuple[str, int]] = None,
+        limit: int = 0,
+        raw: bool = False,
+    ) -> List[dict]:
+        """Find documents with a time field within a time range, sorted by time.
+        Queries for flows select the time range from a compound index on flow_id and
+        the time field, declared in the secondary indices of result types and
+        created on configure.
+
+        Args:
+            collection (str): Document type to query
+            start (Optional[datetime]): Start of the range, inclusive. If None, the
+                range is open.
+            end (Optional[datetime]): End of the range, exclusive. If None, the range
+                is open.
+            time_field (str): Dotted name of the time field
+            query (dict): Additional query conditions, e.g. on flow_id
+            fields (List[str]): List of fields for filtering result
+            sort (List[Tuple[str, int]]): List of (field, direction) pairs for sorting.
+                Ascending time if not provided.
+            limit (int): Maximum number of documents to return. 0 for no limit.
+            raw (bool): Whether to return undecoded RawBSONDocuments
+
+        Returns:
+            List[dict]: Found documents
+
+        """
+        time_range = {}
+        if start is not None:
+            time_range["$gte"] = start
+
+        if end is not None:
+            time_range["$lt"] = end
+
+        query = dict(query or {})
+        if time_range:
+            if time_field in query:
+                query = {"$and": [query, {time_field: time_range}]}
+
+            else:
+                query[time_field] = time_range
+
+        return list(
+            self.find_iter(
+                collection,
+                query=query,
+                fields=fields,
+                sort=sort if sort is not None else [(time_field, ASCENDING)],
+                limit=limit,
+                raw=raw,
+            )
+        )
+
+    def _find_with_buckets(
+        self,
+        collection: str,
+        query: dict = None,
+        fields: List[str] = None,
+        batch_size: int = 1000,
+        sort: List[Tuple[str, int]] = None,
+        limit: int = 0,
+        raw: bool = False,
+    ) -> Iterator[dict]:
+        """Iterate over documents matching a query in a collection and its bucket
+        collection. Buckets are unpacked in the database and the query is applied to
+        the unpacked documents.
+
+        """
+        pipeline = _get_union_pipeline(collection, [{"$match": query or {}}])
+
+        if sort is not None:
+            pipeline.append({"$sort": dict(sort)})
+
+        if limit:
+            pipeline.append({"$limit": limit})
+
+        if fields is not None:
+            pipeline.append({"$project": _get_aggregation_projection(fields)})
+
+        with self.client() as client:
+            db = client[self.config.database]
+            cursor = self._get_db_collection(db, collection, raw=raw).aggregate(
+                pipeline, batchSize=batch_size, allowDiskUse=sort is not None
+            )
+
+            try:
+                yield from self._iter_profiled(
+                    db, collection, query, cursor, sort=sort, limit=limit
+                )
+
+            finally:
+                cursor.close()
+
+    def _iter_profiled(
+        self,
+        db,
+        collection: str,
+        query: Optional[dict],
+        cursor,
+        sort: List[Tuple[str, int]] = None,
+        limit: int = 0,
+    ) -> Iterator[dict]:
+        """Iterate over a cursor. In profile mode, the time spent fetching documents
+        is recorded once the cursor is exhausted, and sampled queries are explained.
+        Queries of bucketed collections are explained on the result documents only.
+
+        """
+        if self._profiler is None:
+            yield from cursor
+            return
+
+        elapsed = 0.0
+        documents = iter(cursor)
+        while True:
+            start = time.perf_counter()
+            try:
+                document = next(documents)
+
+            except StopIteration:
+                break
+
+            finally:
+                elapsed += time.perf_counter() - start
+
+            yield document
+
+        if self._profiler.record(collection, query, sort, elapsed * 1e3):
+            explain_cursor = db[collection].find(query, limit=limit)
+            if sort is not None:
+                explain_cursor = explain_cursor.sort(sort)
+
+            try:
+                plan = get_plan_summary(explain_cursor.explain())
+                self._profiler.record_plan(collection, query, sort, plan)
+
+            except OperationFailure:
+                logger.exception("Unable to explain query of %s", collection)
+
+        elapsed_since_flush = datetime.utcnow() - self._profiler.last_flush
+        if elapsed_since_flush.total_seconds() >= self.config.profile_flush_interval:
+            self.flush_query_profiles()
+
+    def flush_query_profiles(self) -> None:
+        """Write the query profiles recorded by the process to the profile
+        collection, adding to the profiles recorded by other processes.
+
+        """
+        if self._profiler is None:
+            return
+
+        profiles = self._profiler.pop()
+        if not profiles:
+            return
+
+        now = datetime.utcnow()
+        operations = []
+        for shape_id, profile in profiles.items():
+            update = {
+                "$setOnInsert": {
+                    field: profile[field] for field in ["collection", "query", "sort"]
+                },
+                "$inc": {
+                    field: profile[field]
+                    for field in [
+                        "count",
+                        "total_ms",
+                        "explained",
+                        "collscans",
+                        "in_memory_sorts",
+                        "docs_examined",
+                        "returned",
+                    ]
+                },
+                "$max": {"max_ms": profile["max_ms"]},
+                "$set": {"last_seen": now},
+            }
+
+            if profile["indices"] is not None:
+                update["$set"]["indices"] = profile["indices"]
+
+            operations.append(UpdateOne({"_id": shape_id}, update, upsert=True))
+
+        with self.client() as client:
+            db = client[self.config.database]
+            db[self.config.profile_collection].bulk_write(operations, ordered=False)
+
+    def get_query_profiles(self, collection: Optional[str] = None) -> List[dict]:
+        """Load the query profiles recorded by all processes, after writing those of
+        the current process.
+
+        Args:
+            collection (Optional[str]): Name of the queried collection. If None,
+                profiles of all collections are loaded.
+
+        Returns:
+            List[dict]: Query profiles
+
+        """
+        self.flush_query_profiles()
+
+        query = {} if collection is None else {"collection": collection}
+        with self.client() as client:
+            db = client[self.config.database]
+            return list(db[self.config.profile_collection].find(query))
+
+    def aggregate(
+        self, collection: str, pipeline: List[dict], allow_disk_use: bool = False
+    ) -> List[dict]:
+        """Run an aggregation pipeline on a collection. Results stored in bucket
+        documents are unpacked and passed to the pipeline like other results, with a
+        leading $match stage applied before unpacking.
+
+        Args:
+            collection (str): Document type to aggregate
+            pipeline (List[dict]): Aggregation stages
+            allow_disk_use (bool): Whether stages may write temporary files when
+                exceeding the server memory limit
+
+        Returns:
+            List[dict]: Documents output by the pipeline
+
+        """
+        if self._is_bucketed(collection):
+            pipeline = _get_union_pipeline(collection, pipeline)
+
+        with self.client() as client:
+            db = client[self.config.database]
+            return list(
+                self._get_db_collection(db, collection).aggregate(
+                    pipeline, allowDiskUse=allow_disk_use
+                )
+            )
+
+    def insert_blob(self, key: str, data: bytes) -> str:
+        """Insert a binary payload into the GridFS blob bucket. Payloads that are
+        already stored under the key are not written again.
+
+        Args:
+            key (str): Content hash of the payload
+            data (bytes): Payload to store
+
+        Returns:
+            str: Key of the stored payload
+
+        """
+        with self.client() as client:
+            db = client[self.config.database]
+            fs = GridFS(db, collection=self.config.blob_bucket)
+
+            if not fs.exists(key):
+                try:
+                    fs.put(data, _id=key)
+
+                # stored concurrently by another writer
+                except FileExists:
+                    pass
+
+        return key
+
+    def find_blob(self, key: str) -> bytes:
+        """Load a binary payload from the GridFS blob bucket.
+
+        Args:
+            key (str): Content hash of the payload
+
+        Returns:
+            bytes: Stored payload
+
+        Raises:
+            ValueError: No payload is stored under the key.
+
+        """
+        with self.client() as client:
+            db = client[self.config.database]
+            fs = GridFS(db, collection=self.config.blob_bucket)
+
+            try:
+                return fs.get(key).read()
+
+            except NoFile:
+                raise ValueError(f"No blob stored with key {key}")
+
+    @property
+    def blob_threshold(self) -> Optional[int]:
+        return self.config.blob_threshold
+
+    @property
+    def legacy_dataframes(self) -> bool:
+        return self.config.legacy_dataframes
+
+    def get_compression(self, collection: str) -> Optional[str]:
+        return self.config.compression.get(collection)
+
     def find_all(self, collection: str) -> List[dict]:
         """Find all documents for a collection
 
@@ -236,31 +1456,123 @@ class MongodbResultsDB(ResultsDB):
         """
         return self.find(collection=collection)
 
-    def configure(self, collections: Dict[str, List[str]]) -> None:
-        """Configure the results database from collections and their indices.
+    def configure(
+        self,
+        collections: Dict[str, List[str]],
+        indices: Optional[Dict[str, List[ResultIndex]]] = None,
+    ) -> Dict[str, List[ResultIndex]]:
+        """Configure the results database from collections and their indices. In
+        pooled mode, the client connection pool is warmed up before configuration.
+        Indices are built in the background and existing indices are left unchanged,
+        so configure may be called by every process writing to a collection. Cached
+        metadata of configured collections is replaced with the updated index
+        information.
 
         Args:
             collections (Dict[str, List[str]]): Dictionary mapping collection to
-                index rep.
+                unique index rep.
+            indices (Optional[Dict[str, List[ResultIndex]]]): Dictionary mapping
+                collection to secondary indices.
 
-        """
+        Returns:
+            Dict[str, List[ResultIndex]]: Mapping of collection to secondary indices
+                missing after configuration, e.g. because an existing index of the
+                same name has different options. Missing indices are logged.
 
-        collection_indices = {}
+        """
+        indices = indices or {}
+        missing = {}
 
         with self.client() as client:
+            if self.config.pooled:
+                # round trip establishes the pooled connection and authentication
+                client.admin.command("ping")
+
             db = client[self.config.database]
 
-            for collection_name, index in collections.items():
+            for collection_name in {**collections, **indices}:
+                # invalidate cached metadata before changing indices
+                self._collections.pop(collection_name, None)
 
-                formatted_index = [(idx, DESCENDING) for idx in index]
-                db[collection_name].create_index(formatted_index, unique=True)
+                self._create_timeseries_collection(db, collection_name)
+
+                # time-series collections do not support unique indices
+                index = collections.get(collection_name)
+                if index:
+                    formatted_index = [(idx, DESCENDING) for idx in index]
+                    db[collection_name].create_index(
+                        formatted_index,
+                        unique=collection_name not in self.config.timeseries,
+                        background=True,
+                    )
 
                 index_info = db[collection_name].index_information()
+                for result_index in indices.get(collection_name, []):
+                    if _index_matches(result_index, index_info):
+                        continue
+
+                    options = {"unique": result_index.unique}
+                    if result_index.sparse:
+                        options["sparse"] = True
+                    if result_index.partial_filter is not None:
+                        options["partialFilterExpression"] = result_index.partial_filter
+
+                    try:
+                        db[collection_name].create_index(
+                            result_index.fields, background=True, **options
+                        )
+                    except OperationFailure as e:
+                        logger.warning(
+                            "Unable to create index %s of %s: %s",
+                            result_index.name,
+                            collection_name,
+                            e,
+                        )
 
-                collection_indices[collection_name] = MongodbCollection(
+                index_info = db[collection_name].index_information()
+                bucketed = bool(
+                    db.list_collection_names(
+                        filter={"name": _get_bucket_collection(collection_name)}
+                    )
+                )
+
+                self._collections[collection_name] = MongodbCollection(
                     database=self.config.database,
                     name=collection_name,
                     indices=index_info,
+                    bucketed=bucketed,
                 )
 
-        self._collections.set(collection_indices)
+                missing_indices = self.get_missing_indices(
+                    collection_name, indices.get(collection_name, [])
+                )
+                if missing_indices:
+                    logger.warning(
+                        "Indices %s missing in collection %s",
+                        [result_index.name for result_index in missing_indices],
+                        collection_name,
+                    )
+                    missing[collection_name] = missing_indices
+
+        return missing
+
+    def get_missing_indices(
+        self, collection: str, indices: List[ResultIndex]
+    ) -> List[ResultIndex]:
+        """Get the indices missing in the collection metadata. Indices of the same
+        name with different fields or options are counted as missing.
+
+        Args:
+            collection (str): Name of collection
+            indices (List[ResultIndex]): Indices expected in the collection
+
+        Returns:
+            List[ResultIndex]: Expected indices missing in the collection
+
+        """
+        collection_metadata = self.get_collection(collection)
+        return [
+            index
+            for index in indices
+            if not _index_matches(index, collection_metadata.indices)
+        ]
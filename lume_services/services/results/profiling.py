@@ -0,0 +1,342 @@
+import hashlib
+import json
+import random
+import threading
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Tuple
+
+from lume_services.services.results.db import ResultIndex
+
+# operators selecting single values, placed before sort fields in recommended indices
+_EQUALITY_OPERATORS = {"$eq", "$in"}
+
+
+class QueryReport(BaseModel):
+    """Profile of a query shape with an index recommendation.
+
+    Attr:
+        collection (str): Name of the queried collection
+        query (str): JSON representation of the query shape, with values replaced
+            by 1
+        sort (List[Tuple[str, int]]): Sort of the query
+        count (int): Number of recorded queries
+        mean_ms (float): Mean latency in ms
+        max_ms (float): Maximum latency in ms
+        explained (int): Number of sampled queries explained
+        collscans (int): Number of explained queries scanning the collection
+        in_memory_sorts (int): Number of explained queries sorting in memory
+        docs_examined_per_returned (Optional[float]): Ratio of documents examined to
+            documents returned by explained queries
+        indices (List[str]): Indices used by the last explained query
+        recommended_index (Optional[ResultIndex]): Index recommended for queries
+            scanning the collection or sorting in memory
+
+    """
+
+    collection: str
+    query: str
+    sort: List[Tuple[str, int]] = []
+    count: int
+    mean_ms: float
+    max_ms: float
+    explained: int = 0
+    collscans: int = 0
+    in_memory_sorts: int = 0
+    docs_examined_per_returned: Optional[float]
+    indices: List[str] = []
+    recommended_index: Optional[ResultIndex]
+
+
+def get_query_shape(query: Optional[dict]) -> dict:
+    """Get the shape of a query, keeping fields and operators and replacing values
+    by 1. Queries differing only in values share a shape.
+
+    Args:
+        query (Optional[dict]): Query in dictionary form
+
+    Returns:
+        dict: Query shape
+
+    """
+
+    def get_shape(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: get_shape(item) for key, item in value.items()}
+
+        # subqueries of $and, $or and $nor
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            return [get_shape(item) for item in value]
+
+        return 1
+
+    return get_shape(query or {})
+
+
+def get_shape_id(
+    collection: str, shape: dict, sort: Optional[List[Tuple[str, int]]]
+) -> str:
+    """Get an id of a query shape and sort in a collection."""
+    rep = json.dumps([collection, shape, sort or []], sort_keys=True)
+    return hashlib.sha1(rep.encode("utf-8")).hexdigest()
+
+
+def get_plan_summary(explain: dict) -> dict:
+    """Summarize the winning plan and execution statistics of a find explain
+    output.
+
+    Args:
+        explain (dict): Output of explain with executionStats verbosity
+
+    Returns:
+        dict: Whether the plan scans the collection and sorts in memory, the names
+            of used indices and the numbers of examined and returned documents
+
+    """
+    stages = []
+    indices = []
+
+    def walk(stage: dict) -> None:
+        stages.append(stage.get("stage"))
+        if "indexName" in stage:
+            indices.append(stage["indexName"])
+
+        # slot based execution plans hold the stage tree in queryPlan
+        children = [stage.get("inputStage"), stage.get("queryPlan")]
+        for child in children + stage.get("inputStages", []):
+            if child:
+                walk(child)
+
+    walk(explain.get("queryPlanner", {}).get("winningPlan", {}))
+    stats = explain.get("executionStats", {})
+
+    return {
+        "collscan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages,
+        "indices": indices,
+        "docs_examined": stats.get("totalDocsExamined", 0),
+        "returned": stats.get("nReturned", 0),
+    }
+
+
+def recommend_index(
+    shape: dict, sort: Optional[List[Tuple[str, int]]] = None
+) -> Optional[ResultIndex]:
+    """Recommend a compound index for a query shape, with fields matched by
+    equality first, followed by sort fields and fields matched by ranges. Conditions
+    combined with $or and $nor are not considered.
+
+    Args:
+        shape (dict): Query shape
+        sort (Optional[List[Tuple[str, int]]]): Sort of the query
+
+    Returns:
+        Optional[ResultIndex]: Recommended index, or None if the query has no
+            indexable fields
+
+    """
+    conditions = []
+
+    def collect(query: dict) -> None:
+        for field, condition in query.items():
+            if field == "$and":
+                for subquery in condition:
+                    collect(subquery)
+
+            elif not field.startswith("$") and field != "_id":
+                conditions.append((field, condition))
+
+    collect(shape)
+
+    equality = []
+    ranges = []
+    for field, condition in conditions:
+        is_operator = isinstance(condition, dict) and any(
+            key.startswith("$") for key in condition
+        )
+        if is_operator and not set(condition) <= _EQUALITY_OPERATORS:
+            ranges.append(field)
+
+        elif field not in equality:
+            equality.append(field)
+
+    fields = [(field, 1) for field in equality]
+    fields += [
+        (field, int(direction))
+        for field, direction in sort or []
+        if field not in equality
+    ]
+    fields += [
+        (field, 1)
+        for field in ranges
+        if field not in equality and field not in dict(fields)
+    ]
+
+    if not fields:
+        return None
+
+    return ResultIndex(fields=fields)
+
+
+class QueryProfiler:
+    """Accumulates the latencies and sampled plan summaries of query shapes in
+    memory until they are popped, e.g. for writing to a database.
+
+    """
+
+    def __init__(self, sample_rate: float):
+        """
+        Args:
+            sample_rate (float): Fraction of queries selected for explain
+
+        """
+        self._sample_rate = sample_rate
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self.last_flush = datetime.utcnow()
+
+    def record(
+        self,
+        collection: str,
+        query: Optional[dict],
+        sort: Optional[List[Tuple[str, int]]],
+        elapsed_ms: float,
+    ) -> bool:
+        """Record the latency of a query.
+
+        Args:
+            collection (str): Name of the queried collection
+            query (Optional[dict]): Query in dictionary form
+            sort (Optional[List[Tuple[str, int]]]): Sort of the query
+            elapsed_ms (float): Latency of the query in ms
+
+        Returns:
+            bool: Whether the query is sampled for explain
+
+        """
+        shape = get_query_shape(query)
+        shape_id = get_shape_id(collection, shape, sort)
+        with self._lock:
+            profile = self._get_profile(shape_id, collection, shape, sort)
+            profile["count"] += 1
+            profile["total_ms"] += elapsed_ms
+            profile["max_ms"] = max(profile["max_ms"], elapsed_ms)
+
+        return random.random() < self._sample_rate
+
+    def record_plan(
+        self,
+        collection: str,
+        query: Optional[dict],
+        sort: Optional[List[Tuple[str, int]]],
+        plan: dict,
+    ) -> None:
+        """Record the plan summary of an explained query.
+
+        Args:
+            collection (str): Name of the queried collection
+            query (Optional[dict]): Query in dictionary form
+            sort (Optional[List[Tuple[str, int]]]): Sort of the query
+            plan (dict): Plan summary returned by get_plan_summary
+
+        """
+        shape = get_query_shape(query)
+        shape_id = get_shape_id(collection, shape, sort)
+        with self._lock:
+            profile = self._get_profile(shape_id, collection, shape, sort)
+            profile["explained"] += 1
+            profile["collscans"] += int(plan["collscan"])
+            profile["in_memory_sorts"] += int(plan["in_memory_sort"])
+            profile["docs_examined"] += plan["docs_examined"]
+            profile["returned"] += plan["returned"]
+            profile["indices"] = plan["indices"]
+
+    def pop(self) -> Dict[str, dict]:
+        """Get and reset the accumulated profiles.
+
+        Returns:
+            Dict[str, dict]: Mapping of shape id to profile
+
+        """
+        with self._lock:
+            profiles, self._profiles = self._profiles, {}
+            self.last_flush = datetime.utcnow()
+
+        return profiles
+
+    def _get_profile(
+        self,
+        shape_id: str,
+        collection: str,
+        shape: dict,
+        sort: Optional[List[Tuple[str, int]]],
+    ) -> dict:
+        profile = self._profiles.get(shape_id)
+        if profile is None:
+            profile = {
+                "collection": collection,
+                "query": json.dumps(shape, sort_keys=True),
+                "sort": [list(item) for item in sort or []],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "explained": 0,
+                "collscans": 0,
+                "in_memory_sorts": 0,
+                "docs_examined": 0,
+                "returned": 0,
+                "indices": None,
+            }
+            self._profiles[shape_id] = profile
+
+        return profile
+
+
+def get_index_report(profiles: List[dict]) -> List[QueryReport]:
+    """Build reports of profiled query shapes, sorted by total latency. Indices are
+    recommended for shapes with explained queries scanning the collection or sorting
+    in memory.
+
+    Args:
+        profiles (List[dict]): Profiles of query shapes as accumulated by
+            QueryProfiler
+
+    Returns:
+        List[QueryReport]: Reports of the query shapes
+
+    """
+    reports = []
+    for profile in sorted(profiles, key=lambda profile: -profile["total_ms"]):
+        sort = [tuple(item) for item in profile["sort"]]
+        indices = profile.get("indices") or []
+
+        recommended_index = None
+        if profile["collscans"] or profile["in_memory_sorts"]:
+            recommended_index = recommend_index(json.loads(profile["query"]), sort)
+            if recommended_index is not None and recommended_index.name in indices:
+                recommended_index = None
+
+        docs_examined_per_returned = None
+        if profile["explained"]:
+            docs_examined_per_returned = profile["docs_examined"] / max(
+                profile["returned"], 1
+            )
+
+        reports.append(
+            QueryReport(
+                collection=profile["collection"],
+                query=profile["query"],
+                sort=sort,
+                count=profile["count"],
+                mean_ms=profile["total_ms"] / max(profile["count"], 1),
+                max_ms=profile["max_ms"],
+                explained=profile["explained"],
+                collscans=profile["collscans"],
+                in_memory_sorts=profile["in_memory_sorts"],
+                docs_examined_per_returned=docs_examined_per_returned,
+                indices=indices,
+                recommended_index=recommended_index,
+            )
+        )
+
+    return reports
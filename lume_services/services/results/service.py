@@ -1,25 +1,407 @@
-from .db import ResultsDB
+from .db import ResultIndex, ResultsDB, UpsertReport
+from .profiling import QueryReport, get_index_report
 
-from typing import List
+from bson.objectid import ObjectId
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import atexit
 import logging
+import numpy as np
+import os
+import queue
+import threading
+import time
 
-from lume_services.utils import get_jsonable_dict
+from lume_services.utils import get_callable_from_string, get_jsonable_dict
 
 logger = logging.getLogger(__name__)
 
+# aggregation accumulators of the summary statistics available to helpers
+_STAT_OPERATORS = {
+    "mean": "$avg",
+    "min": "$min",
+    "max": "$max",
+    "std": "$stdDevPop",
+    "sum": "$sum",
+}
+
+# order of value types when sorting in memory, following the MongoDB comparison
+# order
+_BSON_TYPE_ORDER = {
+    type(None): 1,
+    int: 2,
+    float: 2,
+    np.integer: 2,
+    np.floating: 2,
+    str: 3,
+    dict: 4,
+    list: 5,
+    bytes: 6,
+    ObjectId: 7,
+    bool: 8,
+    np.bool_: 8,
+    datetime: 9,
+}
+
+# interval in seconds between checks of the write-behind thread while waiting
+_WRITE_BEHIND_POLL_INTERVAL = 1.0
+
+
+def _resolve(
+    future: Future, result: Any = None, exception: Optional[BaseException] = None
+) -> None:
+    """Set the result or exception of a future unless it was cancelled or already
+    resolved.
+
+    """
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+
+        else:
+            future.set_result(result)
+
+    except InvalidStateError:
+        pass
+
+
+class _WriteBehindBuffer:
+    """Buffer of pending result inserts written by a background thread. Inserts
+    queued while a batch is written are coalesced into the next batch, which is
+    written with one bulk upsert per collection. Items must carry a unique_hash.
+
+    """
+
+    def __init__(self, results_db: ResultsDB, batch_size: int, flush_interval: float):
+        """
+        Args:
+            results_db (ResultsDB): Results database used for writing batches
+            batch_size (int): Maximum number of items written per batch
+            flush_interval (float): Time in seconds to wait for further items after
+                the first item of a batch is queued. If 0, a batch is written as soon
+                as the queue is drained.
+
+        """
+        self._results_db = results_db
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def submit(self, item: dict) -> Future:
+        """Queue an item for insert.
+
+        Args:
+            item (dict): Dictionary representation of item
+
+        Returns:
+            Future: Future resolving to the id of the inserted document once the
+                item is written. If a document with the same unique hash was already
+                stored, the future raises DuplicateKeyError as inserts without
+                write-behind do.
+
+        Raises:
+            ValueError: If the item has no collection or unique_hash
+
+        """
+        for key in ["collection", "unique_hash"]:
+            if key not in item:
+                raise ValueError(f"Item queued for write-behind has no {key}")
+
+        future = Future()
+        self._start()
+        self._queue.put((item, future))
+        return future
+
+    def wait(self, future: Future, timeout: Optional[float] = None) -> Any:
+        """Wait for the result of a queued item or flush marker.
+
+        Args:
+            future (Future): Future returned by submit
+            timeout (Optional[float]): Maximum time in seconds to wait
+
+        Raises:
+            RuntimeError: If the writer thread stopped before resolving the future
+            TimeoutError: If the future is not resolved within the timeout
+
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            interval = _WRITE_BEHIND_POLL_INTERVAL
+            if deadline is not None:
+                interval = max(min(interval, deadline - time.monotonic()), 0)
+
+            try:
+                return future.result(interval)
+
+            except FutureTimeoutError:
+                thread = self._thread
+                if not future.done() and (thread is None or not thread.is_alive()):
+                    raise RuntimeError("Write-behind thread stopped")
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until all items queued before the call are written.
+
+        Args:
+            timeout (Optional[float]): Maximum time in seconds to wait
+
+        """
+        if self._thread is None or os.getpid() != self._pid:
+            return
+
+        # items pending in a stopped thread were failed on exit
+        if not self._thread.is_alive():
+            return
+
+        marker = Future()
+        self._queue.put((None, marker))
+        self.wait(marker, timeout)
+
+    def _start(self) -> None:
+        """Start the writer thread on first use. Threads do not survive a fork, so
+        the buffer is reset in child processes.
+
+        """
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._pid = os.getpid()
+                self._queue = queue.Queue()
+                self._thread = None
+
+            if self._thread is None:
+                atexit.register(self.flush)
+
+            # threads stopped by unexpected errors are restarted
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="results-write-behind", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        batch = []
+        try:
+            while True:
+                batch = self._get_batch()
+
+                # failed batches fail their items, the thread keeps running
+                try:
+                    self._write(batch)
+
+                except Exception as err:
+                    logger.exception("Unable to write batch")
+                    for _, future in batch:
+                        _resolve(future, exception=err)
+
+        finally:
+            # fail pending items if the thread exits
+            err = RuntimeError("Write-behind thread stopped")
+            for _, future in batch:
+                _resolve(future, exception=err)
+
+            while True:
+                try:
+                    _, future = self._queue.get_nowait()
+
+                except queue.Empty:
+                    break
+
+                _resolve(future, exception=err)
+
+    def _get_batch(self) -> List[Tuple[Optional[dict], Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._flush_interval
+
+        # flush markers end the batch
+        while len(batch) < self._batch_size and batch[-1][0] is not None:
+            timeout = deadline - time.monotonic()
+
+            try:
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+
+                else:
+                    batch.append(self._queue.get_nowait())
+
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _write(self, batch: List[Tuple[Optional[dict], Future]]) -> None:
+        collections = {}
+        for item, future in batch:
+            if item is not None:
+                item = dict(item)
+                collection = item.pop("collection")
+                collections.setdefault(collection, []).append((item, future))
+
+        for collection, entries in collections.items():
+            try:
+                report = self._results_db.upsert_many(
+                    collection=collection, items=[item for item, _ in entries]
+                )
+
+            except Exception as err:
+                logger.error("Unable to write batch to %s: %s", collection, err)
+                for _, future in entries:
+                    _resolve(future, exception=err)
+
+                continue
+
+            for i, (item, future) in enumerate(entries):
+                if i in report.failed:
+                    _resolve(future, exception=ValueError(report.failed[i]))
+                    continue
+
+                inserted_id = report.inserted.get(i)
+                if inserted_id is None:
+                    _resolve(
+                        future,
+                        exception=DuplicateKeyError(
+                            f"Document with unique_hash {item['unique_hash']} "
+                            f"already stored in {collection}",
+                            11000,
+                        ),
+                    )
+                    continue
+
+                # bulk upserts report ids as strings, inserts return ObjectIds
+                if "_id" in item:
+                    inserted_id = item["_id"]
+
+                elif ObjectId.is_valid(inserted_id):
+                    inserted_id = ObjectId(inserted_id)
+
+                _resolve(future, inserted_id)
+
+        # release flush markers once preceding items are written
+        for item, future in batch:
+            if item is None:
+                _resolve(future)
+
+
+class FindAcrossResults(BaseModel):
+    """Documents found by a query across collections.
+
+    Attr:
+        documents (List[Any]): Found documents, in the order of the queried
+            collections or in the requested sort order
+        collections (List[str]): Collection of each document
+        latency (Dict[str, float]): Mapping of collection name to query time in
+            seconds
+
+    """
+
+    documents: List[Any] = []
+    collections: List[str] = []
+    latency: Dict[str, float] = {}
+
+
+def _get_sort_value(document: dict, field: str) -> tuple:
+    """Get the value of a dotted field for sorting. Values of different types are
+    ordered by type as in MongoDB, with missing and null values first.
+
+    """
+    value = document
+    for key in field.split("."):
+        try:
+            value = value[key]
+
+        except (KeyError, TypeError):
+            return (_BSON_TYPE_ORDER[type(None)], None)
+
+    # bool subclasses int, so types are matched exactly first
+    order = _BSON_TYPE_ORDER.get(type(value))
+    if order is None:
+        order = next(
+            (
+                order
+                for value_type, order in _BSON_TYPE_ORDER.items()
+                if isinstance(value, value_type)
+            ),
+            None,
+        )
+
+    # values without a natural order are compared by representation, unknown types
+    # sort last
+    if order is None or isinstance(value, (dict, list)):
+        return (order or max(_BSON_TYPE_ORDER.values()) + 1, str(value))
+
+    return (order, value)
+
+
+def _get_stat_accumulators(
+    fields: List[str], stats: List[str]
+) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """Build accumulators of summary statistics over dotted fields. Output names of
+    aggregation stages may not contain dots, so accumulators are named by position
+    and a mapping to the dotted names, e.g. outputs.y.mean, is returned.
+
+    """
+    accumulators = {"count": {"$sum": 1}}
+    names = {}
+    for i, field in enumerate(fields):
+        for stat in stats:
+            if stat not in _STAT_OPERATORS:
+                raise ValueError(f"Unsupported statistic {stat}")
+
+            name = f"_{i}_{stat}"
+            accumulators[name] = {_STAT_OPERATORS[stat]: f"${field}"}
+            names[name] = f"{field}.{stat}"
+
+    return accumulators, names
+
+
+def _rename_stats(document: dict, names: Dict[str, str]) -> dict:
+    return {names.get(key, key): value for key, value in document.items()}
+
 
 class ResultsDBService:
     """Results database for use with NoSQL database service"""
 
-    def __init__(self, results_db: ResultsDB):
+    def __init__(
+        self,
+        results_db: ResultsDB,
+        write_behind: bool = False,
+        write_batch_size: int = 100,
+        write_flush_interval: float = 0.0,
+    ):
         """Initialize Results DB Service interface
         Args:
             results_db (DBService): DB Connection service
+            write_behind (bool): If True, inserts are queued and written in batches
+                by a background thread. insert_one still returns only once the item
+                is written, so concurrent inserts share a round trip.
+            write_batch_size (int): Maximum number of items per batch in write-behind
+                mode
+            write_flush_interval (float): Time in seconds a batch waits for further
+                items in write-behind mode
         """
         self._results_db = results_db
 
+        self._write_buffer = None
+        if write_behind:
+            self._write_buffer = _WriteBehindBuffer(
+                results_db, write_batch_size, write_flush_interval
+            )
+
     def insert_one(self, item: dict, **kwargs) -> str:
-        """Store model data.
+        """Store model data. In write-behind mode, the item is written with the next
+        batch and the call returns once the batch is written. Items matching the
+        unique hash of a stored item are not written again and raise
+        DuplicateKeyError in both modes.
+
         Args:
             model_type (str): Must correspond to models listed in model_docs enum
                 provided during construction.
@@ -27,10 +409,51 @@ class ResultsDBService:
                 minimal data required by model.
         Returns:
             bool: Success of storage operation
+
+        Raises:
+            DuplicateKeyError: If an item with the same unique hash is stored
         """
+        if self._write_buffer is not None and not kwargs:
+            return self._write_buffer.wait(self._write_buffer.submit(item))
 
         return self._results_db.insert_one(**item, **kwargs)
 
+    def submit_one(self, item: dict) -> Future:
+        """Queue an item for insert without waiting for the write. Without
+        write-behind mode, the item is written immediately.
+
+        Args:
+            item (dict): Dictionary representation of item
+
+        Returns:
+            Future: Future resolving to the id of the inserted document once written,
+                or raising DuplicateKeyError if an item with the same unique hash is
+                stored
+
+        """
+        if self._write_buffer is not None:
+            return self._write_buffer.submit(item)
+
+        future = Future()
+        try:
+            future.set_result(self._results_db.insert_one(**item))
+
+        except Exception as err:
+            future.set_exception(err)
+
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until all items queued for insert are written. Acts as a
+        durability barrier in write-behind mode and returns immediately otherwise.
+
+        Args:
+            timeout (Optional[float]): Maximum time in seconds to wait
+
+        """
+        if self._write_buffer is not None:
+            self._write_buffer.flush(timeout)
+
     def insert_many(self, items: List[dict], **kwargs) -> List[str]:
         """Insert many documents into the database.
 
@@ -43,6 +466,68 @@ class ResultsDBService:
         """
         return self._results_db.insert_many(items, **kwargs)
 
+    def upsert_one(self, item: dict, **kwargs) -> Tuple[Any, bool]:
+        """Insert a document unless a document with the same unique hash exists. The
+        existing document is reported instead of raising on the unique index.
+
+        Args:
+            item (dict): Dictionary representation of item
+            **kwargs (dict): DB implementation specific fields
+
+        Returns:
+            Tuple[Any, bool]: Id of the inserted or existing document and whether the
+                document was inserted
+
+        """
+        return self._results_db.upsert_one(item, **kwargs)
+
+    def upsert_many(self, items: List[dict], **kwargs) -> UpsertReport:
+        """Insert many documents in a single unordered batch, skipping documents for
+        which a document with the same unique hash exists.
+
+        Args:
+            items (List[dict]): List of dictionary representations of items
+            **kwargs (dict): DB implementation specific fields
+
+        Returns:
+            UpsertReport: Inserted, matched and failed items
+
+        """
+        return self._results_db.upsert_many(items=items, **kwargs)
+
+    def insert_bucketed(
+        self,
+        items: List[dict],
+        bucket_seconds: int,
+        bucket_size: int = 1000,
+        **kwargs,
+    ) -> List[str]:
+        """Insert many documents packed into bucket documents per flow and time
+        window, with the values of each field stored as an array. Bucketing avoids a
+        document and index entries per item for high-rate scalar results. Bucketed
+        documents are not deduplicated, and are returned by find and find_iter as
+        individual documents.
+
+        Args:
+            items (List[dict]): List of dictionary representations of items
+            bucket_seconds (int): Width of the time window of a bucket in seconds
+            bucket_size (int): Maximum number of items per bucket
+            **kwargs (dict): DB implementation specific fields
+
+        Returns:
+            List[str]: List of inserted ids
+
+        """
+        if bucket_seconds < 1 or bucket_size < 1:
+            raise ValueError("bucket_seconds and bucket_size must be positive")
+
+        return self._results_db.insert_bucketed(
+            items=items,
+            bucket_seconds=bucket_seconds,
+            bucket_size=bucket_size,
+            **kwargs,
+        )
+
     def find(self, *, query: dict, fields: List[str] = None, **kwargs) -> List[dict]:
         """Find a document based on a query.
 
@@ -58,6 +543,527 @@ class ResultsDBService:
         query = get_jsonable_dict(query)
         return self._results_db.find(query=query, fields=fields, **kwargs)
 
+    def find_iter(
+        self, *, query: dict, fields: List[str] = None, **kwargs
+    ) -> Iterator[dict]:
+        """Iterate over documents matching a query. Documents are fetched in batches
+        so that large result sets can be scanned with bounded memory.
+
+        Args:
+            query (dict): fields to query on
+            fields (List[str]): List of fields to return if any
+            **kwargs (dict): DB implementation specific fields, e.g. batch_size, sort
+                and limit
+
+        Returns:
+            Iterator[dict]: Iterator over dict reps of found items.
+
+        Raises:
+            ValueError: If batch_size is not positive
+
+        """
+        # iterators are generators, so arguments are checked before the first read
+        batch_size = kwargs.get("batch_size")
+        if batch_size is not None and batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+        query = get_jsonable_dict(query)
+        return self._results_db.find_iter(query=query, fields=fields, **kwargs)
+
+    def find_time_range(
+        self,
+        *,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        time_field: str = "date_modified",
+        query: dict = None,
+        fields: List[str] = None,
+        **kwargs,
+    ) -> List[dict]:
+        """Find documents with a time field within a time range, e.g. the results of
+        a flow stored during the last shift. Documents are sorted by time unless
+        another sort is passed.
+
+        Args:
+            start (Optional[datetime]): Start of the range, inclusive. If None, the
+                range is open.
+            end (Optional[datetime]): End of the range, exclusive. If None, the range
+                is open.
+            time_field (str): Dotted name of the time field, e.g. date_modified or
+                pv_collection_isotime
+            query (dict): Additional query conditions, e.g. on flow_id
+            fields (List[str]): List of fields to return if any
+            **kwargs (dict): DB implementation specific fields, e.g. collection, sort
+                and limit
+
+        Returns:
+            List[dict]: List of dict reps of found items.
+
+        """
+        query = get_jsonable_dict(query or {})
+        return self._results_db.find_time_range(
+            start=start,
+            end=end,
+            time_field=time_field,
+            query=query,
+            fields=fields,
+            **kwargs,
+        )
+
+    def find_across(
+        self,
+        collections: List[str],
+        *,
+        query: dict = None,
+        fields: List[str] = None,
+        sort: List[Tuple[str, int]] = None,
+        limit: int = 0,
+        max_workers: int = 8,
+        **kwargs,
+    ) -> FindAcrossResults:
+        """Run a query on several collections concurrently and merge the results.
+        Without a sort, documents keep the order of the collections and of each
+        collection's cursor. Sort and limit are applied to each collection and again
+        to the merged documents.
+
+        Args:
+            collections (List[str]): Names of the collections to query
+            query (dict): fields to query on
+            fields (List[str]): List of fields to return if any
+            sort (List[Tuple[str, int]]): List of (field, direction) pairs for sorting
+            limit (int): Maximum number of documents to return. 0 for no limit.
+            max_workers (int): Maximum number of collections queried at once
+            **kwargs (dict): DB implementation specific fields
+
+        Returns:
+            FindAcrossResults: Merged documents with per-collection latency
+
+        """
+        query = get_jsonable_dict(query or {})
+        collections = list(dict.fromkeys(collections))
+
+        def find_collection(collection):
+            start = time.perf_counter()
+            documents = list(
+                self._results_db.find_iter(
+                    collection=collection,
+                    query=query,
+                    fields=fields,
+                    sort=sort,
+                    limit=limit,
+                    **kwargs,
+                )
+            )
+            return documents, time.perf_counter() - start
+
+        results = FindAcrossResults()
+        if not collections:
+            return results
+
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(collections))
+        ) as executor:
+            found = list(executor.map(find_collection, collections))
+
+        merged = []
+        for collection, (documents, latency) in zip(collections, found):
+            results.latency[collection] = latency
+            merged += [(collection, document) for document in documents]
+
+        # stable sorts applied from the last key to the first
+        if sort is not None:
+            for field, direction in reversed(sort):
+                merged.sort(
+                    key=lambda item: _get_sort_value(item[1], field),
+                    reverse=direction < 0,
+                )
+
+        if limit:
+            merged = merged[:limit]
+
+        results.collections = [collection for collection, _ in merged]
+        results.documents = [document for _, document in merged]
+
+        return results
+
+    def aggregate(self, *, pipeline: List[dict], **kwargs) -> List[dict]:
+        """Run an aggregation pipeline in the database.
+
+        Args:
+            pipeline (List[dict]): Aggregation stages formatted using pymongo
+                convention
+            **kwargs (dict): DB implementation specific fields
+
+        Returns:
+            List[dict]: Documents output by the pipeline
+
+        """
+        return self._results_db.aggregate(pipeline=pipeline, **kwargs)
+
+    def group_stats(
+        self,
+        collection: str,
+        group_by: Union[str, List[str]],
+        fields: List[str],
+        query: dict = None,
+        stats: List[str] = ["mean", "min", "max", "std"],
+    ) -> List[dict]:
+        """Compute summary statistics of scalar fields per group of results.
+
+        Args:
+            collection (str): Collection name
+            group_by (Union[str, List[str]]): Dotted fields to group by, e.g.
+                "flow_id" or ["inputs.x", "inputs.y"]
+            fields (List[str]): Dotted scalar fields to summarize, e.g. ["outputs.z"]
+            query (dict): Query selecting results
+            stats (List[str]): Statistics to compute. Supported statistics are mean,
+                min, max, std and sum.
+
+        Returns:
+            List[dict]: One row per group, sorted by group, holding the group values,
+                the count and each statistic named as field.stat,
+                e.g. outputs.z.mean.
+
+        """
+        if isinstance(group_by, (str,)):
+            group_by = [group_by]
+
+        accumulators, names = _get_stat_accumulators(fields, stats)
+        pipeline = [
+            {"$match": get_jsonable_dict(query or {})},
+            {
+                "$group": {
+                    "_id": {f"_{i}": f"${field}" for i, field in enumerate(group_by)},
+                    **accumulators,
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ]
+
+        rows = []
+        for document in self.aggregate(collection=collection, pipeline=pipeline):
+            group = document.pop("_id")
+            rows.append(
+                {
+                    **{field: group.get(f"_{i}") for i, field in enumerate(group_by)},
+                    **_rename_stats(document, names),
+                }
+            )
+
+        return rows
+
+    def histogram(
+        self,
+        collection: str,
+        field: str,
+        bins: int = 10,
+        boundaries: Optional[List[float]] = None,
+        fields: Optional[List[str]] = None,
+        query: dict = None,
+        stats: List[str] = ["mean"],
+    ) -> List[dict]:
+        """Count results in bins of a scalar field, optionally with statistics of
+        further fields per bin, e.g. the mean output per input bin.
+
+        Args:
+            collection (str): Collection name
+            field (str): Dotted scalar field to bin, e.g. "inputs.x"
+            bins (int): Number of equal width bins spanning the range of the field.
+                Ignored if boundaries are provided.
+            boundaries (Optional[List[float]]): Increasing bin edges. Results outside
+                the edges are not counted.
+            fields (Optional[List[str]]): Dotted scalar fields to summarize per bin
+            query (dict): Query selecting results
+            stats (List[str]): Statistics of fields to compute per bin
+
+        Returns:
+            List[dict]: One row per non-empty bin holding the bin edges as min and
+                max, the count and each statistic named as field.stat.
+
+        """
+        query = get_jsonable_dict(query or {})
+
+        if boundaries is None:
+            extent = self.aggregate(
+                collection=collection,
+                pipeline=[
+                    {"$match": {**query, field: {"$type": "number"}}},
+                    {
+                        "$group": {
+                            "_id": None,
+                            "min": {"$min": f"${field}"},
+                            "max": {"$max": f"${field}"},
+                        }
+                    },
+                ],
+            )
+            if not extent or extent[0]["min"] is None:
+                return []
+
+            boundaries = np.linspace(extent[0]["min"], extent[0]["max"], bins + 1)
+            # upper edges are exclusive, so extend the last edge past the maximum
+            boundaries[-1] = np.nextafter(boundaries[-1], np.inf)
+            boundaries = np.unique(boundaries).tolist()
+
+        accumulators, names = _get_stat_accumulators(fields or [], stats)
+        pipeline = [
+            {
+                "$match": {
+                    **query,
+                    field: {"$gte": boundaries[0], "$lt": boundaries[-1]},
+                }
+            },
+            {
+                "$bucket": {
+                    "groupBy": f"${field}",
+                    "boundaries": boundaries,
+                    "output": accumulators,
+                }
+            },
+        ]
+
+        rows = []
+        for document in self.aggregate(collection=collection, pipeline=pipeline):
+            lower = document.pop("_id")
+            rows.append(
+                {
+                    "min": lower,
+                    "max": boundaries[boundaries.index(lower) + 1],
+                    **_rename_stats(document, names),
+                }
+            )
+
+        return rows
+
+    def sample(
+        self,
+        collection: str,
+        size: int,
+        query: dict = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
+        """Draw a random sample of results in the database, e.g. for plotting large
+        result sets.
+
+        Args:
+            collection (str): Collection name
+            size (int): Number of results to sample
+            query (dict): Query selecting results
+            fields (Optional[List[str]]): Dotted fields to return. All fields are
+                returned if not provided.
+
+        Returns:
+            List[dict]: Sampled documents
+
+        """
+        pipeline = [
+            {"$match": get_jsonable_dict(query or {})},
+            {"$sample": {"size": size}},
+        ]
+        if fields is not None:
+            pipeline.append({"$project": {field: True for field in fields}})
+
+        return self.aggregate(collection=collection, pipeline=pipeline)
+
+    def time_buckets(
+        self,
+        collection: str,
+        unit: str = "hour",
+        bin_size: int = 1,
+        fields: Optional[List[str]] = None,
+        query: dict = None,
+        stats: List[str] = ["mean", "min", "max"],
+    ) -> List[dict]:
+        """Summarize results in time buckets of date_modified.
+
+        Args:
+            collection (str): Collection name
+            unit (str): Time unit of buckets, e.g. minute, hour, day or week
+            bin_size (int): Number of units per bucket
+            fields (Optional[List[str]]): Dotted scalar fields to summarize per
+                bucket
+            query (dict): Query selecting results
+            stats (List[str]): Statistics of fields to compute per bucket
+
+        Returns:
+            List[dict]: One row per non-empty bucket, sorted by time, holding the
+                bucket start as date_modified, the count and each statistic named as
+                field.stat.
+
+        """
+        accumulators, names = _get_stat_accumulators(fields or [], stats)
+        pipeline = [
+            {"$match": get_jsonable_dict(query or {})},
+            {
+                "$group": {
+                    "_id": {
+                        "$dateTrunc": {
+                            "date": "$date_modified",
+                            "unit": unit,
+                            "binSize": bin_size,
+                        }
+                    },
+                    **accumulators,
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ]
+
+        return [
+            {"date_modified": document.pop("_id"), **_rename_stats(document, names)}
+            for document in self.aggregate(collection=collection, pipeline=pipeline)
+        ]
+
+    def insert_blob(self, key: str, data: bytes, **kwargs) -> str:
+        """Insert a binary payload into content-addressed blob storage.
+
+        Args:
+            key (str): Content hash of the payload
+            data (bytes): Payload to store
+
+        Returns:
+            str: Key of the stored payload
+
+        """
+        return self._results_db.insert_blob(key, data, **kwargs)
+
+    def find_blob(self, key: str, **kwargs) -> bytes:
+        """Load a binary payload from content-addressed blob storage.
+
+        Args:
+            key (str): Content hash of the payload
+
+        Returns:
+            bytes: Stored payload
+
+        """
+        return self._results_db.find_blob(key, **kwargs)
+
+    @property
+    def blob_threshold(self) -> Optional[int]:
+        """Size in bytes above which binary payloads are moved to blob storage."""
+        return self._results_db.blob_threshold
+
+    @property
+    def legacy_dataframes(self) -> bool:
+        """Whether strings of stored results are checked for DataFrames stored as
+        untagged json by earlier versions.
+
+        """
+        return self._results_db.legacy_dataframes
+
+    def get_compression(self, collection: str) -> Optional[str]:
+        """Get the codec used for compressing binary payloads of results stored in a
+        collection.
+
+        Args:
+            collection (str): Collection name
+
+        Returns:
+            Optional[str]: Name of the compression codec or None if payloads are
+                stored uncompressed.
+
+        """
+        return self._results_db.get_compression(collection)
+
+    def configure(self, **kwargs) -> Optional[Dict[str, List[ResultIndex]]]:
+        """Create the indices of collections. Existing indices are left unchanged.
+
+        Args:
+            **kwargs (dict): DB implementation specific fields, e.g. collections and
+                indices
+
+        Returns:
+            Optional[Dict[str, List[ResultIndex]]]: Mapping of collection to declared
+                secondary indices missing after configuration, if supported
+
+        """
+        return self._results_db.configure(**kwargs)
+
+    def configure_result_types(
+        self, result_types: Dict[str, List[str]]
+    ) -> Optional[Dict[str, List[ResultIndex]]]:
+        """Create the unique index on unique_hash and the secondary indices declared
+        by result types in their project collections, e.g. on startup. Existing
+        indices are left unchanged.
+
+        Args:
+            result_types (Dict[str, List[str]]): Mapping of collection name to import
+                paths of the result types stored in the collection, e.g.
+                {"impact": ["lume_services.results.ImpactResult"]}
+
+        Returns:
+            Optional[Dict[str, List[ResultIndex]]]: Mapping of collection to declared
+                secondary indices missing after configuration, if supported
+
+        """
+        indices = {}
+        for collection, result_type_strings in result_types.items():
+            collection_indices = indices.setdefault(collection, [])
+            for result_type_string in result_type_strings:
+                result_type = get_callable_from_string(result_type_string)
+                for result_index in result_type.get_secondary_indices():
+                    if result_index not in collection_indices:
+                        collection_indices.append(result_index)
+
+        return self.configure(
+            collections={collection: ["unique_hash"] for collection in result_types},
+            indices=indices,
+        )
+
+    def create_index(self, *, index: List[Tuple[str, int]], **kwargs) -> None:
+        """Create a secondary index, e.g. on a field queried by dashboards. Existing
+        indices are left unchanged.
+
+        Args:
+            index (List[Tuple[str, int]]): List of (field, direction) pairs, with
+                direction 1 for ascending and -1 for descending
+            **kwargs (dict): DB implementation specific fields, e.g. collection
+
+        """
+        self._results_db.create_index(index=index, **kwargs)
+
+    def get_index_report(self, collection: Optional[str] = None) -> List[QueryReport]:
+        """Report latencies and sampled plans of profiled query shapes, sorted by
+        total latency, with indices recommended for shapes scanning the collection or
+        sorting in memory. Requires a results database profiling queries.
+
+        Args:
+            collection (Optional[str]): Name of the queried collection. If None,
+                shapes of all collections are reported.
+
+        Returns:
+            List[QueryReport]: Reports of the query shapes
+
+        """
+        return get_index_report(self._results_db.get_query_profiles(collection))
+
+    def find_summaries(self, collection: str, flow_ids: List[str]) -> List[dict]:
+        """Load the materialized summaries of flows, maintained on insert for
+        collections configured for summaries.
+
+        Args:
+            collection (str): Collection name
+            flow_ids (List[str]): Ids of the flows
+
+        Returns:
+            List[dict]: One row per summarized flow holding the flow_id, the count,
+                the date_modified and id of the latest result and statistics of the
+                summarized fields named as field.stat.
+
+        """
+        return self._results_db.find_summaries(collection, flow_ids)
+
+    def rebuild_summaries(self, collection: str) -> None:
+        """Recompute the materialized summaries of a collection from the stored
+        results, e.g. after enabling summaries for an existing collection.
+
+        Args:
+            collection (str): Collection name
+
+        """
+        self._results_db.rebuild_summaries(collection)
+
     def find_all(self, **kwargs) -> List[dict]:
         """Find all documents for a collection
 
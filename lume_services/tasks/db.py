@@ -1,5 +1,5 @@
 import logging
-from typing import Optional, Any
+from typing import Optional, Any, List, Union
 from dependency_injector.wiring import Provide, inject
 
 from lume_services.config import Context
@@ -8,6 +8,7 @@ from prefect.engine.results import PrefectResult
 from prefect import Task, Parameter
 
 from lume_services.results import get_result_from_string
+from lume_services.results.utils import load_result_attributes
 from lume_services.utils import fingerprint_dict
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,11 @@ class SaveDBResult(Task):
     the Prefect Context. Alternatively, for development purposes, `flow_id` can be
     passed directly.
 
+    If the results database service is configured for write-behind
+    (`LUME_RESULTS_DB__WRITE_BEHIND=true`), inserts of concurrently running tasks,
+    e.g. mapped tasks, are batched. The task returns the unique representation only
+    once the result has been written.
+
     This task is defined as a subclass of the Prefect [Task](https://docs-v1.prefect.io/api/latest/core/task.html#task-2)
     object and accepts all Task arguments during initialization.
 
@@ -207,6 +213,7 @@ class SaveDBResult(Task):
 
         """
 
+        # blocks until the result is written in write-behind mode
         result.insert(results_db_service=results_db_service)
         return result.unique_rep()
 
@@ -223,6 +230,9 @@ class LoadDBResult(Task):
     example, selecting the first `toyota` from a dictionary of form: `{"outputs":
     {"vehicle": {"car":  ["toyota", "mini"], "boat": ["sail", "motor"]}}}`would be
     accomplished by passing `attribute_index=["outputs", "vehicle", "car", 0]`.
+    The selection is applied by the database as a projection, so only the selected
+    value is transferred and no Result is constructed. A list of result
+    representations can be passed to load values of many results in one batch.
 
     This task is defined as a subclass of the Prefect [Task](https://docs-v1.prefect.io/api/latest/core/task.html#task-2)
     object and accepts all Task arguments during initialization.
@@ -387,16 +397,16 @@ class LoadDBResult(Task):
 
     def run(
         self,
-        result_rep: dict,
+        result_rep: Union[dict, List[dict]],
         attribute_index: Optional[list],
         results_db_service: ResultsDB = Provide[Context.results_db_service],
     ) -> Any:
         """Load a result from the database using a lume_services.Result represention.
 
         Args:
-            result_rep (Union[dict, str]): Result representation containing
-                result_type_string and query for selection. If string passed,
-                will perform json loads to get dictionary.
+            result_rep (Union[dict, List[dict]]): Result representation containing
+                result_type_string and query for selection. If a list is passed,
+                values are loaded for each representation.
             attribute_index (Optional[list]): Selection instructions from query.
                 For example, selecting the first `toyota` from a dictionary of form:
                 `{"vehicle": {"car":  ["toyota", "mini"], "boat": ["sail", "motor"]}}`
@@ -406,23 +416,28 @@ class LoadDBResult(Task):
 
         Returns:
             Any: Returns selection of value from result if attibute_index is passed,
-                otherwise returns Result object.
+                otherwise returns Result object. Returns a list if a list of
+                representations is passed.
 
         """
-        result_type = get_result_from_string(result_rep["result_type_string"])
-        result = result_type.load_from_query(
-            result_rep["project_name"],
-            result_rep["query"],
-            results_db_service=results_db_service,
-        )
-
-        # select first attribute
-        attr_value = getattr(result, attribute_index[0], None)
-        if attr_value is None:
-            return result
+        result_reps = result_rep if isinstance(result_rep, (list,)) else [result_rep]
 
-        else:
-            for index in attribute_index[1:]:
-                attr_value = attr_value[index]
+        if attribute_index:
+            values = load_result_attributes(
+                result_reps, attribute_index, results_db_service=results_db_service
+            )
 
-            return attr_value
+        else:
+            values = [
+                get_result_from_string(rep["result_type_string"]).load_from_query(
+                    rep["project_name"],
+                    rep["query"],
+                    results_db_service=results_db_service,
+                )
+                for rep in result_reps
+            ]
+
+        if isinstance(result_rep, (list,)):
+            return values
+
+        return values[0]
@@ -1,4 +1,6 @@
 import os
+import h5py
+import numpy as np
 from PIL import Image
 from impact import Impact
 from lume_services.tests.files import (
@@ -8,6 +10,7 @@ from lume_services.tests.files import (
     SAMPLE_TEXT_FILE,
 )
 from lume_services.files import TextFile, ImageFile, YAMLFile, HDF5File
+from lume_services.files.serializers import HDF5ValueSerializer
 
 
 class TestTextFile:
@@ -112,3 +115,32 @@ class TestHDF5File:
 
         # load existing
         assert os.path.isfile(filepath)
+
+
+class TestHDF5ValueSerializer:
+    def test_read_write_values(self, tmp_path):
+        filepath = f"{tmp_path}/tmp_file.h5"
+        serializer = HDF5ValueSerializer(
+            {
+                "norm_emit_x": "output/stats/norm_emit_x",
+                "last_z": "output/stats/z[-1]",
+                "isotime": "@pv_collection_isotime",
+                "charge": "output@charge[1]",
+            }
+        )
+
+        with h5py.File(filepath, "w") as f:
+            f.create_dataset("output/stats/z", data=np.zeros(3))
+            f["output"].attrs["charge"] = np.zeros(2)
+
+        values = {
+            "norm_emit_x": 1e-6,
+            "last_z": 2.0,
+            "isotime": "2022-01-01T00:00:00",
+            "charge": 1e-12,
+        }
+        serializer.serialize(filepath, values)
+        assert serializer.deserialize(filepath) == values
+
+        with h5py.File(filepath, "r") as f:
+            assert list(f["output/stats/z"]) == [0.0, 0.0, 2.0]
@@ -1,7 +1,11 @@
 import pytest
 import logging
 from urllib.request import urlretrieve
+import pandas as pd
 from lume_services.environment.solver import Source
+from lume_services.flows.flow import Flow
+from lume_services.models.model import Deployment, Model
+from lume_services.results import Result
 
 from lume_services.environment.solver import _GITHUB_TARBALL_TEMPLATE
 
@@ -262,3 +266,94 @@ class TestModelDB:
     def test_get_flow_bad_sig(self, model_db_service, flow_id):
         with pytest.raises(ValueError):
             model_db_service.get_flow(flow_identifier=flow_id)
+
+    def test_get_model_flow_ids(self, model_db_service, model_id, flow_id):
+        flow_ids = model_db_service.get_model_flow_ids(model_id)
+
+        assert flow_ids == {self.project: [flow_id]}
+
+
+class TestModelResultsDataFrame:
+    project_name = "chunks"
+    flow_id = "test_flow_chunks"
+    n_results = 5
+
+    @pytest.fixture(scope="class")
+    def model(self):
+        # built without the model database, results are read by the flow's ids
+        flow = Flow.construct(
+            name="chunks", flow_id=self.flow_id, project_name=self.project_name
+        )
+        return Model.construct(deployment=Deployment.construct(flow=flow))
+
+    @pytest.fixture(scope="class", autouse=True)
+    def results(self, results_db_service):
+        results = [
+            Result(
+                project_name=self.project_name,
+                flow_id=self.flow_id,
+                inputs={"input1": float(i)},
+                outputs={"output1": float(i * i)},
+            )
+            for i in range(self.n_results)
+        ]
+        for result in results:
+            result.insert(results_db_service=results_db_service)
+
+        return results
+
+    @pytest.mark.parametrize(
+        "chunksize,lengths",
+        [(1, [1, 1, 1, 1, 1]), (2, [2, 2, 1]), (5, [5]), (10, [5])],
+    )
+    def test_chunk_boundaries(self, model, results_db_service, chunksize, lengths):
+        chunks = list(
+            model.iter_results_df(
+                chunksize=chunksize, results_db_service=results_db_service
+            )
+        )
+        assert [len(chunk) for chunk in chunks] == lengths
+
+        df = pd.concat(chunks, ignore_index=True)
+        assert sorted(df["inputs.input1"]) == [float(i) for i in range(self.n_results)]
+
+    def test_empty_results(self, model, results_db_service):
+        chunks = model.iter_results_df(
+            query={"inputs.input1": {"$gt": 100.0}},
+            results_db_service=results_db_service,
+        )
+        assert list(chunks) == []
+
+    def test_invalid_chunksize(self, model, results_db_service):
+        with pytest.raises(ValueError):
+            model.iter_results_df(chunksize=0, results_db_service=results_db_service)
+
+    def test_cursor_closed_on_early_close(self, model):
+        class Documents:
+            def __init__(self, documents):
+                self._documents = iter(documents)
+                self.closed = False
+
+            def __iter__(self):
+                return self
+
+            def __next__(self):
+                return next(self._documents)
+
+            def close(self):
+                self.closed = True
+
+        documents = Documents(
+            [(self.project_name, {"inputs": {"x": float(i)}}) for i in range(5)]
+        )
+        chunks = model._iter_chunks(documents, 2, blob_store=None)
+        assert len(next(chunks)) == 2
+        assert not documents.closed
+
+        chunks.close()
+        assert documents.closed
+
+        # exhausted iteration closes the documents as well
+        documents = Documents([(self.project_name, {"inputs": {"x": 1.0}})])
+        assert [len(chunk) for chunk in model._iter_chunks(documents, 2, None)] == [1]
+        assert documents.closed
@@ -1,20 +1,73 @@
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pickle
 import pytest
 import numpy as np
 import pandas as pd
 from PIL import Image
 from pydantic import ValidationError
 from pymongo.errors import DuplicateKeyError
+from bson import Binary
+from bson.objectid import ObjectId
+import bson
 
 from lume_services.results import (
+    HDF5Extractor,
     Result,
     ImpactResult,
+    LazyResult,
+    ResultsMirror,
     get_result_from_string,
 )
-from lume_services.results.generic import load_db_dict, get_bson_dict
+from lume_services.results.generic import (
+    load_db_dict,
+    get_bson_dict,
+    encode_dataframe,
+    DeferredValue,
+)
+from lume_services.results.utils import (
+    get_attribute_projection,
+    get_results_df_from_documents,
+    load_result_attribute,
+    load_result_attributes,
+)
 from lume_services.files import HDF5File, ImageFile
 from lume_services.tests.files import SAMPLE_IMPACT_ARCHIVE, SAMPLE_IMAGE_FILE
-from lume_services.services.results import MongodbResultsDBConfig, MongodbResultsDB
+from lume_services.services.results import (
+    MongodbResultsDBConfig,
+    MongodbResultsDB,
+    ResultIndex,
+    ResultsDBService,
+)
+from lume_services.services.results.profiling import (
+    get_plan_summary,
+    get_query_shape,
+    recommend_index,
+)
+
+
+class BucketedResult(Result):
+    bucket_seconds = 60
+    bucket_size = 4
+
+
+class IndexedResult(Result):
+    secondary_indices = Result.secondary_indices + [
+        ResultIndex(fields=[("inputs.input1", 1)], sparse=True)
+    ]
+
+
+class ExtractingImpactResult(ImpactResult):
+    extractors = [
+        HDF5Extractor(
+            "archive",
+            {
+                "software": "@software",
+                "rfdata4_end": "input/fieldmaps/rfdata4/data[-1]",
+            },
+        )
+    ]
 
 
 @pytest.fixture(scope="module", autouse=True)
@@ -128,6 +181,169 @@ class TestBSON:
         assert isinstance(db_dict["outputs"]["output2"], pd.DataFrame)
 
 
+class TestArrayEncoding:
+    @pytest.mark.parametrize(
+        "array",
+        [
+            np.arange(10, dtype=np.int32),
+            np.random.random((3, 4)),
+            np.asfortranarray(np.random.random((3, 4))),
+            np.ones((2, 2), dtype=">f4"),
+        ],
+    )
+    def test_array_round_trip(self, array):
+        encoded = get_bson_dict({"array": array})
+        assert not isinstance(encoded["array"], bytes)
+
+        loaded = load_db_dict(encoded)["array"]
+        assert loaded.dtype == array.dtype
+        assert np.array_equal(loaded, array)
+
+    def test_structured_array_round_trip(self):
+        dtype = np.dtype(
+            [
+                ("x", "<f8"),
+                ("flag", "?"),
+                ("position", [("u", "<i4"), ("v", "<i4")]),
+                ("samples", "<f4", (2,)),
+            ]
+        )
+        array = np.zeros(3, dtype=dtype)
+        array["x"] = [1.0, 2.0, 3.0]
+        array["position"]["v"] = [4, 5, 6]
+        array["samples"] = [[0.5, 1.5]] * 3
+
+        # tuples of the dtype description are stored as lists
+        encoded = bson.decode(bson.encode(get_bson_dict({"array": array})))
+        loaded = load_db_dict(encoded)["array"]
+        assert loaded.dtype == dtype
+        assert np.array_equal(loaded, array)
+
+    def test_object_array_round_trip(self):
+        array = np.empty((2, 2), dtype=object)
+        array[:] = [
+            [datetime(2022, 1, 1, 12, 30), Decimal("1.10")],
+            ["label", None],
+        ]
+
+        encoded = get_bson_dict({"array": array})
+        assert "data" not in encoded["array"]
+
+        loaded = load_db_dict(bson.decode(bson.encode(encoded)))["array"]
+        assert loaded.dtype == array.dtype
+        assert loaded.shape == array.shape
+        assert loaded.tolist() == array.tolist()
+
+    def test_unencodable_object_array_fails(self):
+        with pytest.raises(ValueError):
+            get_bson_dict({"array": np.array([object()], dtype=object)})
+
+    def test_load_legacy_pickled_array(self):
+        array = np.array([1, 2, 3, 4, 5])
+        loaded = load_db_dict({"array": Binary(pickle.dumps(array, protocol=2))})
+        assert np.array_equal(loaded["array"], array)
+
+    def test_load_unsafe_pickle_fails(self):
+        with pytest.raises(pickle.UnpicklingError):
+            load_db_dict({"value": pickle.dumps(ValueError("unsafe"), protocol=2)})
+
+
+class TestCompression:
+    @pytest.mark.parametrize("compression", ["zlib", "zstd", "lz4"])
+    def test_compressed_round_trip(self, compression):
+        pytest.importorskip(
+            {"zlib": "zlib", "zstd": "zstandard", "lz4": "lz4.frame"}[compression]
+        )
+        array = np.sin(np.linspace(0, 10, 10000))
+        df = pd.DataFrame({"x": np.arange(1000), "y": np.zeros(1000)})
+
+        encoded = get_bson_dict({"array": array, "df": df}, compression=compression)
+        assert encoded["array"]["compression"] == compression
+        assert len(encoded["array"]["data"]) < array.nbytes
+
+        loaded = load_db_dict(encoded)
+        assert np.array_equal(loaded["array"], array)
+        pd.testing.assert_frame_equal(loaded["df"], df, check_index_type=False)
+
+    def test_incompressible_stored_raw(self):
+        array = np.frombuffer(np.random.bytes(1000), dtype=np.uint8)
+        encoded = get_bson_dict({"array": array}, compression="zlib")
+        assert "compression" not in encoded["array"]
+
+    def test_unsupported_codec(self):
+        with pytest.raises(ValueError):
+            get_bson_dict({"array": np.zeros(100)}, compression="unknown")
+
+
+class TestDataFrameEncoding:
+    def test_dataframe_round_trip(self):
+        df = pd.DataFrame({"x": [0, 1, 2], "y": [1.0, 2.0, 3.0]})
+        encoded = get_bson_dict({"df": df})
+        assert isinstance(encoded["df"], dict)
+
+        loaded = load_db_dict(encoded)["df"]
+        assert isinstance(loaded, pd.DataFrame)
+        assert np.array_equal(loaded["y"].to_numpy(), df["y"].to_numpy())
+
+    def test_dataframe_dtypes_preserved(self):
+        df = pd.DataFrame(
+            {
+                "x": np.arange(3, dtype=np.int32),
+                "y": np.array([1.0, 2.0, 3.0], dtype=np.float32),
+                "label": ["a", "b", "c"],
+                "category": pd.Categorical(["u", "v", "u"]),
+                "time": pd.date_range("2022-01-01", periods=3),
+            }
+        )
+        loaded = load_db_dict(get_bson_dict({"df": df}))["df"]
+        pd.testing.assert_frame_equal(loaded, df, check_index_type=False)
+
+    def test_timezone_aware_round_trip(self):
+        time = pd.date_range("2022-01-01 12:00", periods=3, tz="America/New_York")
+        df = pd.DataFrame({"time": time, "x": [1.0, 2.0, 3.0]}, index=time)
+
+        # encoded through bson, which stores datetimes without timezone
+        encoded = bson.decode(bson.encode(get_bson_dict({"df": df})))
+        loaded = load_db_dict(encoded)["df"]
+        pd.testing.assert_frame_equal(loaded, df, check_freq=False)
+        assert loaded["time"].iloc[0].hour == 12
+
+    def test_unsupported_dtype_stored_as_json(self):
+        df = pd.DataFrame({"period": pd.period_range("2022-01", periods=3, freq="M")})
+        encoded = bson.decode(bson.encode(get_bson_dict({"df": df})))
+        assert encoded["df"]["format"] == "json"
+
+        loaded = load_db_dict(encoded)["df"]
+        assert loaded["period"].tolist() == ["2022-01", "2022-02", "2022-03"]
+
+    def test_load_json_encoded_dataframe(self):
+        df = pd.DataFrame({"x": [0, 1, 2], "y": [1, 2, 3]})
+        loaded = load_db_dict({"df": encode_dataframe(df, format="json")})
+        assert isinstance(loaded["df"], pd.DataFrame)
+
+    def test_load_legacy_dataframe(self):
+        df = pd.DataFrame({"x": [0, 1, 2], "y": [1, 2, 3]})
+        loaded = load_db_dict({"df": df.to_json()}, legacy_dataframes=True)
+        assert isinstance(loaded["df"], pd.DataFrame)
+
+        # only converted on opt-in
+        assert load_db_dict({"df": df.to_json()})["df"] == df.to_json()
+
+    @pytest.mark.parametrize(
+        "string", ["my_file.txt", "[1, 2, 3]", '{"key": 1}', '{"a": {"b": 1}}']
+    )
+    def test_strings_not_converted(self, string):
+        assert load_db_dict({"value": string})["value"] == string
+
+        result = Result(
+            project_name="generic",
+            flow_id="test_flow_strings",
+            inputs={"value": string},
+            outputs={"value": string},
+        )
+        assert result.outputs["value"] == string
+
+
 @pytest.mark.parametrize(
     ("string", "result_class_target"),
     [
@@ -181,6 +397,41 @@ class TestImpactResult:
         image = impact_result.plot_file.read(file_service=file_service)
         assert isinstance(image, (Image.Image,))
 
+    def test_extract_archive_values(
+        self, impact_result, results_db_service, file_service
+    ):
+        result = ExtractingImpactResult(
+            project_name="extracted",
+            flow_id="test_flow_extracted",
+            inputs=impact_result.inputs,
+            outputs=impact_result.outputs,
+            archive=impact_result.archive,
+            pv_collection_isotime=impact_result.pv_collection_isotime,
+            config=impact_result.config,
+        )
+        result.insert(results_db_service=results_db_service, file_service=file_service)
+        assert result.extracted["software"] == "lume-impact"
+        assert isinstance(result.extracted["rfdata4_end"], float)
+
+        documents = results_db_service.find(
+            collection="extracted",
+            query={"extracted.software": "lume-impact"},
+            fields=["extracted"],
+        )
+        assert documents[0]["extracted"] == result.extracted
+
+        ExtractingImpactResult.configure(
+            "extracted", results_db_service=results_db_service
+        )
+        indices = results_db_service._results_db.get_collection("extracted").indices
+        assert indices["extracted.software_1"]["sparse"]
+
+        # only scalars are extracted
+        with pytest.raises(ValueError):
+            HDF5Extractor("archive", {"data": "input/fieldmaps/rfdata4/data"})(
+                result, file_service
+            )
+
 
 class TestMongodbResultsDBConfig:
     def test_construction(self):
@@ -206,6 +457,163 @@ class TestMongodbResultsDB:
     def test_mongo_results_db_init(self, lume_services_settings):
         MongodbResultsDB(lume_services_settings.results_db)
 
+    def test_pooled_client_reuse(
+        self,
+        mongodb_host,
+        mongodb_port,
+        mongodb_user,
+        mongodb_password,
+        mongodb_database,
+    ):
+        config = MongodbResultsDBConfig(
+            host=mongodb_host,
+            port=mongodb_port,
+            username=mongodb_user,
+            password=mongodb_password,
+            database=mongodb_database,
+            pooled=True,
+        )
+        results_db = MongodbResultsDB(config)
+        results_db.configure({})
+
+        with results_db.client() as client:
+            pooled_client = client
+
+        with results_db.client() as client:
+            assert client is pooled_client
+
+        results_db.close()
+
+        with results_db.client() as client:
+            assert client is not pooled_client
+
+        results_db.close()
+
+    def test_collection_metadata_cache(self, mongodb_results_db):
+        mongodb_results_db.configure({"metadata": ["unique_hash"]})
+        collection = mongodb_results_db.get_collection("metadata")
+        assert "unique_hash_-1" in collection.indices
+
+        # cached until indices change
+        assert mongodb_results_db.get_collection("metadata") is collection
+
+        mongodb_results_db.configure({"metadata": ["flow_id"]})
+        collection = mongodb_results_db.get_collection("metadata")
+        assert "flow_id_-1" in collection.indices
+
+    def test_secondary_indices(self, mongodb_results_db):
+        indices = [
+            ResultIndex(fields=[("flow_id", 1), ("date_modified", -1)]),
+            ResultIndex(fields=[("inputs.input1", 1)], sparse=True),
+            ResultIndex(
+                fields=[("outputs.output1", 1)],
+                partial_filter={"outputs.output1": {"$exists": True}},
+            ),
+        ]
+        missing = mongodb_results_db.configure(
+            {"secondary": ["unique_hash"]}, indices={"secondary": indices}
+        )
+        assert missing == {}
+
+        collection = mongodb_results_db.get_collection("secondary")
+        assert all(index.name in collection.indices for index in indices)
+        assert collection.indices["inputs.input1_1"]["sparse"]
+
+        # configuration is idempotent
+        missing = mongodb_results_db.configure(
+            {"secondary": ["unique_hash"]}, indices={"secondary": indices}
+        )
+        assert missing == {}
+
+        # index of the same name with different options is reported as missing
+        conflicting = ResultIndex(fields=[("inputs.input1", 1)], unique=True)
+        missing = mongodb_results_db.configure({}, indices={"secondary": [conflicting]})
+        assert missing == {"secondary": [conflicting]}
+        assert mongodb_results_db.get_missing_indices(
+            "secondary", indices + [conflicting]
+        ) == [conflicting]
+
+
+class TestQueryProfiling:
+    def test_query_shape(self):
+        shape = get_query_shape(
+            {
+                "flow_id": "test_flow",
+                "inputs.input1": {"$in": [1.0, 2.0]},
+                "$or": [{"outputs.output1": {"$gt": 1.0}}, {"outputs.output2": 1.0}],
+            }
+        )
+        assert shape == {
+            "flow_id": 1,
+            "inputs.input1": {"$in": 1},
+            "$or": [{"outputs.output1": {"$gt": 1}}, {"outputs.output2": 1}],
+        }
+
+    def test_recommend_index(self):
+        shape = get_query_shape(
+            {
+                "date_modified": {"$gte": datetime(2022, 1, 1)},
+                "$and": [{"flow_id": "test_flow"}, {"inputs.input1": {"$in": [1.0]}}],
+            }
+        )
+        index = recommend_index(shape, sort=[("outputs.output1", -1)])
+        assert index.fields == [
+            ("flow_id", 1),
+            ("inputs.input1", 1),
+            ("outputs.output1", -1),
+            ("date_modified", 1),
+        ]
+
+        assert recommend_index({"_id": 1}) is None
+
+    def test_plan_summary(self):
+        plan = get_plan_summary(
+            {
+                "queryPlanner": {
+                    "winningPlan": {
+                        "queryPlan": {
+                            "stage": "SORT",
+                            "inputStage": {
+                                "stage": "FETCH",
+                                "inputStage": {
+                                    "stage": "IXSCAN",
+                                    "indexName": "flow_id_1",
+                                },
+                            },
+                        }
+                    }
+                },
+                "executionStats": {"totalDocsExamined": 10, "nReturned": 2},
+            }
+        )
+        assert not plan["collscan"]
+        assert plan["in_memory_sort"]
+        assert plan["indices"] == ["flow_id_1"]
+        assert plan["docs_examined"] == 10
+
+
+class TestResultsDataFrame:
+    def test_columns_from_documents(self, generic_result):
+        documents = [
+            ("generic", generic_result.get_db_dict()),
+            ("generic", {"flow_id": "other", "inputs": {"input1": 3.0}}),
+        ]
+        df = get_results_df_from_documents(documents)
+
+        assert len(df) == 2
+        assert df["inputs.input1"].dtype == np.float64
+        assert df["inputs.input1"][1] == 3.0
+        assert np.array_equal(df["inputs.input2"][0], generic_result.inputs["input2"])
+        assert df["inputs.input2"][1] is None
+        assert list(df["project_name"]) == ["generic", "generic"]
+
+    def test_nested_names_do_not_collide(self):
+        df = get_results_df_from_documents(
+            [("generic", {"inputs": {"x": 1.0}, "outputs": {"x": 2.0}})]
+        )
+        assert df["inputs.x"][0] == 1.0
+        assert df["outputs.x"][0] == 2.0
+
 
 class TestResultsDBService:
     @pytest.mark.skip("Indices not created at present.")
@@ -256,6 +664,532 @@ class TestResultsDBService:
         res = results_db_service.find_all(collection=generic_result.project_name)
         assert isinstance(res, list)
 
+    def test_find_iter(self, generic_result, results_db_service):
+        res = results_db_service.find_iter(
+            collection=generic_result.project_name,
+            query={"flow_id": generic_result.flow_id},
+            batch_size=1,
+            sort=[("date_modified", -1)],
+        )
+        assert not isinstance(res, list)
+
+        results = list(res)
+        assert len(results)
+        assert all(item["flow_id"] == generic_result.flow_id for item in results)
+
+        with pytest.raises(ValueError):
+            results_db_service.find_iter(
+                collection=generic_result.project_name,
+                query={"flow_id": generic_result.flow_id},
+                batch_size=0,
+            )
+
+    def test_find_across(self, results_db_service):
+        results = [
+            Result(
+                project_name=project_name,
+                flow_id="test_flow_find_across",
+                inputs={"input1": float(i)},
+                outputs={"output1": float(i)},
+            )
+            for i, project_name in enumerate(["across1", "across2", "across1"])
+        ]
+        Result.insert_many(results, results_db_service=results_db_service)
+
+        found = results_db_service.find_across(
+            ["across1", "across2", "across3"],
+            query={"flow_id": "test_flow_find_across"},
+        )
+        assert found.collections == ["across1", "across1", "across2"]
+        assert set(found.latency) == {"across1", "across2", "across3"}
+
+        found = results_db_service.find_across(
+            ["across1", "across2"],
+            query={"flow_id": "test_flow_find_across"},
+            sort=[("inputs.input1", -1)],
+            limit=2,
+        )
+        assert [document["inputs"]["input1"] for document in found.documents] == [
+            2.0,
+            1.0,
+        ]
+        assert found.collections == ["across1", "across2"]
+
+    def test_find_across_mixed_sort(self, results_db_service):
+        values = [datetime(2022, 1, 1), 2.0, None, "a", 1]
+        results_db_service.insert_one(
+            {"collection": "across_mixed", "flow_id": "test_flow_find_across_mixed"}
+        )
+        for value in values:
+            results_db_service.insert_one(
+                {
+                    "collection": "across_mixed",
+                    "flow_id": "test_flow_find_across_mixed",
+                    "value": value,
+                }
+            )
+
+        found = results_db_service.find_across(
+            ["across_mixed"],
+            query={"flow_id": "test_flow_find_across_mixed"},
+            sort=[("value", 1)],
+        )
+        assert [document.get("value") for document in found.documents] == [
+            None,
+            None,
+            1,
+            2.0,
+            "a",
+            datetime(2022, 1, 1),
+        ]
+
+    @pytest.fixture(scope="class")
+    def aggregation_results(self, results_db_service):
+        results = [
+            Result(
+                project_name="aggregation",
+                flow_id=f"test_flow_aggregation{i % 2}",
+                inputs={"input1": float(i)},
+                outputs={"output1": float(2 * i)},
+            )
+            for i in range(10)
+        ]
+        Result.insert_many(results, results_db_service=results_db_service)
+        return results
+
+    def test_group_stats(self, aggregation_results, results_db_service):
+        rows = results_db_service.group_stats(
+            "aggregation", "flow_id", ["outputs.output1"]
+        )
+        assert [row["flow_id"] for row in rows] == [
+            "test_flow_aggregation0",
+            "test_flow_aggregation1",
+        ]
+        assert rows[0]["count"] == 5
+        assert rows[0]["outputs.output1.mean"] == 8.0
+        assert rows[1]["outputs.output1.max"] == 18.0
+
+    def test_histogram(self, aggregation_results, results_db_service):
+        rows = results_db_service.histogram(
+            "aggregation", "inputs.input1", bins=3, fields=["outputs.output1"]
+        )
+        assert [row["count"] for row in rows] == [3, 3, 4]
+        assert rows[0]["outputs.output1.mean"] == 2.0
+
+        rows = results_db_service.histogram(
+            "aggregation", "inputs.input1", boundaries=[0, 5, 8]
+        )
+        assert [(row["min"], row["max"], row["count"]) for row in rows] == [
+            (0, 5, 5),
+            (5, 8, 3),
+        ]
+
+    def test_sample(self, aggregation_results, results_db_service):
+        rows = results_db_service.sample("aggregation", 3, fields=["inputs.input1"])
+        assert len(rows) == 3
+        assert "outputs" not in rows[0]
+
+    def test_time_buckets(self, aggregation_results, results_db_service):
+        rows = results_db_service.time_buckets(
+            "aggregation", unit="year", fields=["outputs.output1"]
+        )
+        assert sum(row["count"] for row in rows) == 10
+        assert "outputs.output1.mean" in rows[0]
+
+    def test_write_behind(self, mongodb_results_db):
+        results_db_service = ResultsDBService(
+            mongodb_results_db, write_behind=True, write_batch_size=10
+        )
+        Result.configure("write_behind", results_db_service=results_db_service)
+        results = [
+            Result(
+                project_name="write_behind",
+                flow_id="test_flow_write_behind",
+                inputs={"input1": float(i)},
+                outputs={"output1": float(i)},
+            )
+            for i in range(25)
+        ]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            inserted_ids = list(
+                executor.map(
+                    lambda result: result.insert(results_db_service=results_db_service),
+                    results,
+                )
+            )
+        assert all(inserted_id is not None for inserted_id in inserted_ids)
+
+        # duplicates raise as without write-behind
+        futures = [
+            results_db_service.submit_one(result.get_db_dict()) for result in results
+        ]
+        results_db_service.flush()
+        assert all(future.done() for future in futures)
+        assert all(
+            isinstance(future.exception(), DuplicateKeyError) for future in futures
+        )
+
+        with pytest.raises(DuplicateKeyError):
+            results_db_service.insert_one(results[0].get_db_dict())
+
+        with pytest.raises(DuplicateKeyError):
+            ResultsDBService(mongodb_results_db).insert_one(results[0].get_db_dict())
+
+        res = results_db_service.find(
+            collection="write_behind", query={"flow_id": "test_flow_write_behind"}
+        )
+        assert len(res) == 25
+
+    def test_write_behind_failures(self, mongodb_results_db):
+        results_db_service = ResultsDBService(mongodb_results_db, write_behind=True)
+        result = Result(
+            project_name="write_behind",
+            flow_id="test_flow_write_behind_failures",
+            inputs={"input1": 1.0},
+            outputs={"output1": 1.0},
+        )
+
+        with pytest.raises(ValueError):
+            results_db_service.submit_one({"unique_hash": result.unique_hash})
+
+        # a failed batch fails its items and the writer keeps running
+        write_buffer = results_db_service._write_buffer
+        write = write_buffer._write
+
+        def fail_once(batch):
+            write_buffer._write = write
+            raise RuntimeError("Failed batch")
+
+        write_buffer._write = fail_once
+        with pytest.raises(RuntimeError):
+            results_db_service.insert_one(result.get_db_dict())
+
+        inserted_id = results_db_service.insert_one(result.get_db_dict())
+        assert isinstance(inserted_id, ObjectId)
+
+    def test_upsert_existing(self, generic_result, results_db_service):
+        existing = results_db_service.find(
+            collection=generic_result.project_name,
+            query={"unique_hash": generic_result.unique_hash},
+        )
+
+        inserted_id, inserted = results_db_service.upsert_one(
+            generic_result.get_db_dict()
+        )
+        assert not inserted
+        assert inserted_id == existing[0]["_id"]
+
+    def test_summaries(
+        self,
+        mongodb_host,
+        mongodb_port,
+        mongodb_user,
+        mongodb_password,
+        mongodb_database,
+    ):
+        config = MongodbResultsDBConfig(
+            host=mongodb_host,
+            port=mongodb_port,
+            username=mongodb_user,
+            password=mongodb_password,
+            database=mongodb_database,
+            summaries={"summaries": ["outputs.output1"]},
+        )
+        results_db_service = ResultsDBService(MongodbResultsDB(config))
+        results = [
+            Result(
+                project_name="summaries",
+                flow_id="test_flow_summaries",
+                inputs={"input1": float(i)},
+                outputs={"output1": float(i)},
+            )
+            for i in range(5)
+        ]
+
+        Result.insert_many(results[1:], results_db_service=results_db_service)
+        results[0].insert(results_db_service=results_db_service)
+
+        # duplicates are not counted
+        results[1].insert(results_db_service=results_db_service, upsert=True)
+
+        summaries = results_db_service.find_summaries(
+            "summaries", ["test_flow_summaries"]
+        )
+        assert len(summaries) == 1
+        assert summaries[0]["count"] == 5
+        assert summaries[0]["outputs.output1.min"] == 0.0
+        assert summaries[0]["outputs.output1.max"] == 4.0
+        assert summaries[0]["outputs.output1.mean"] == 2.0
+
+        latest = next(
+            results_db_service.find_iter(
+                collection="summaries",
+                query={"flow_id": "test_flow_summaries"},
+                sort=[("date_modified", -1), ("_id", -1)],
+                limit=1,
+            )
+        )
+        assert summaries[0]["latest_id"] == str(latest["_id"])
+
+    def test_find_time_range(self, results_db_service):
+        start = datetime(2022, 1, 1)
+        results = [
+            Result(
+                project_name="time_range",
+                flow_id=f"test_flow_time_range{i % 2}",
+                date_modified=start + timedelta(hours=i),
+                inputs={"input1": float(i)},
+                outputs={"output1": float(i)},
+            )
+            for i in range(10)
+        ]
+        Result.insert_many(results, results_db_service=results_db_service)
+
+        documents = results_db_service.find_time_range(
+            collection="time_range",
+            start=start + timedelta(hours=2),
+            end=start + timedelta(hours=6),
+            query={"flow_id": "test_flow_time_range0"},
+        )
+        assert [document["inputs"]["input1"] for document in documents] == [2.0, 4.0]
+
+        documents = results_db_service.find_time_range(
+            collection="time_range", start=start + timedelta(hours=8)
+        )
+        assert [document["inputs"]["input1"] for document in documents] == [8.0, 9.0]
+
+        # indices are created on configure rather than on queries
+        indices = results_db_service._results_db.get_collection("time_range").indices
+        assert "flow_id_1_date_modified_1" not in indices
+
+        Result.configure("time_range", results_db_service=results_db_service)
+        indices = results_db_service._results_db.get_collection("time_range").indices
+        assert "flow_id_1_date_modified_1" in indices
+
+    def test_timeseries_collection(
+        self,
+        mongodb_host,
+        mongodb_port,
+        mongodb_user,
+        mongodb_password,
+        mongodb_database,
+    ):
+        config = MongodbResultsDBConfig(
+            host=mongodb_host,
+            port=mongodb_port,
+            username=mongodb_user,
+            password=mongodb_password,
+            database=mongodb_database,
+            timeseries={"timeseries": "seconds"},
+        )
+        results_db_service = ResultsDBService(MongodbResultsDB(config))
+        results = [
+            Result(
+                project_name="timeseries",
+                flow_id="test_flow_timeseries",
+                inputs={"input1": float(i)},
+                outputs={"output1": float(i)},
+            )
+            for i in range(5)
+        ]
+
+        report = Result.insert_many(results, results_db_service=results_db_service)
+        assert len(report.inserted) == 5
+
+        # deduplicated without unique index
+        report = Result.insert_many(results, results_db_service=results_db_service)
+        assert report.matched == list(range(5))
+
+        inserted_id = results[0].insert(
+            results_db_service=results_db_service, upsert=True
+        )
+
+        documents = results_db_service.find(
+            collection="timeseries", query={"flow_id": "test_flow_timeseries"}
+        )
+        assert len(documents) == 5
+        assert inserted_id in [document["_id"] for document in documents]
+
+    def test_index_report(
+        self,
+        mongodb_host,
+        mongodb_port,
+        mongodb_user,
+        mongodb_password,
+        mongodb_database,
+    ):
+        config = MongodbResultsDBConfig(
+            host=mongodb_host,
+            port=mongodb_port,
+            username=mongodb_user,
+            password=mongodb_password,
+            database=mongodb_database,
+            profile=True,
+            profile_sample_rate=1.0,
+        )
+        results_db_service = ResultsDBService(MongodbResultsDB(config))
+        for i in range(5):
+            results_db_service.insert_one(
+                Result(
+                    project_name="profiled",
+                    flow_id="test_flow_profiled",
+                    inputs={"input1": float(i)},
+                    outputs={"output1": float(i)},
+                ).get_db_dict()
+            )
+
+        for threshold in [1.0, 2.0]:
+            results_db_service.find(
+                collection="profiled", query={"outputs.output1": {"$gt": threshold}}
+            )
+
+        reports = results_db_service.get_index_report(collection="profiled")
+        assert len(reports) == 1
+        assert reports[0].count == 2
+        assert reports[0].explained == 2
+        assert reports[0].collscans == 2
+        assert reports[0].recommended_index.fields == [("outputs.output1", 1)]
+
+    def test_result_configure(self, results_db_service):
+        assert IndexedResult.configure("indexed", results_db_service) == []
+
+        indices = results_db_service._results_db.get_collection("indexed").indices
+        assert indices["unique_hash_-1"]["unique"]
+        assert all(index.name in indices for index in IndexedResult.secondary_indices)
+
+    def test_configure_result_types(self, results_db_service):
+        missing = results_db_service.configure_result_types(
+            {
+                "indexed_types": [
+                    "lume_services.results.generic.Result",
+                    f"{IndexedResult.__module__}.IndexedResult",
+                ]
+            }
+        )
+        assert not missing
+
+        indices = results_db_service._results_db.get_collection("indexed_types").indices
+        assert indices["unique_hash_-1"]["unique"]
+        assert all(index.name in indices for index in IndexedResult.secondary_indices)
+
+    def test_bucketed_results(self, results_db_service):
+        start = datetime(2022, 1, 1)
+        results = [
+            BucketedResult(
+                project_name="bucketed",
+                flow_id="test_flow_bucketed",
+                date_modified=start + timedelta(seconds=10 * i),
+                inputs={"input1": float(i)},
+                outputs={"output1": float(i * i)},
+            )
+            for i in range(10)
+        ]
+
+        inserted_id = results[0].insert(results_db_service=results_db_service)
+        report = BucketedResult.insert_many(
+            results[1:], results_db_service=results_db_service
+        )
+        assert len(report.inserted) == 9
+
+        # two windows of six results and four results per bucket
+        buckets = results_db_service.find(
+            collection="bucketed.buckets", query={"flow_id": "test_flow_bucketed"}
+        )
+        assert sorted(bucket["count"] for bucket in buckets) == [2, 4, 4]
+
+        documents = results_db_service.find(
+            collection="bucketed",
+            query={"flow_id": "test_flow_bucketed", "outputs.output1": {"$gt": 10}},
+        )
+        assert sorted(document["inputs"]["input1"] for document in documents) == [
+            float(i) for i in range(4, 10)
+        ]
+
+        documents = list(
+            results_db_service.find_iter(
+                collection="bucketed",
+                query={"flow_id": "test_flow_bucketed"},
+                sort=[("date_modified", 1)],
+                limit=1,
+            )
+        )
+        assert documents[0]["_id"] == inserted_id
+
+        result = BucketedResult(project_name="bucketed", **documents[0])
+        assert result.inputs == results[0].inputs
+        assert result.unique_hash == results[0].unique_hash
+
+        # bucketed results are loaded by unique hash
+        unique_rep = results[5].unique_rep()
+        result = BucketedResult.load_from_query(
+            unique_rep["project_name"],
+            unique_rep["query"],
+            results_db_service=results_db_service,
+        )
+        assert result.inputs == results[5].inputs
+        assert result.unique_hash == results[5].unique_hash
+
+        values = load_result_attributes(
+            [results[i].unique_rep() for i in [7, 2]],
+            ["outputs", "output1"],
+            results_db_service=results_db_service,
+        )
+        assert values == [49.0, 4.0]
+
+        # aggregations receive the unpacked results
+        rows = results_db_service.group_stats(
+            "bucketed",
+            "flow_id",
+            ["outputs.output1"],
+            query={"flow_id": "test_flow_bucketed"},
+            stats=["max"],
+        )
+        assert rows[0]["count"] == 10
+        assert rows[0]["outputs.output1.max"] == 81.0
+
+    def test_buckets_of_other_processes(
+        self,
+        mongodb_results_db,
+        mongodb_host,
+        mongodb_port,
+        mongodb_user,
+        mongodb_password,
+        mongodb_database,
+    ):
+        config = MongodbResultsDBConfig(
+            host=mongodb_host,
+            port=mongodb_port,
+            username=mongodb_user,
+            password=mongodb_password,
+            database=mongodb_database,
+            bucket_check_interval=30.0,
+        )
+        results_db = MongodbResultsDB(config)
+        results_db_service = ResultsDBService(results_db)
+        unchecked_service = ResultsDBService(mongodb_results_db)
+        query = {"flow_id": "test_flow_bucketed_other"}
+        assert not results_db_service.find(collection="bucketed_other", query=query)
+        assert not unchecked_service.find(collection="bucketed_other", query=query)
+
+        other_service = ResultsDBService(MongodbResultsDB(mongodb_results_db.config))
+        BucketedResult(
+            project_name="bucketed_other",
+            flow_id="test_flow_bucketed_other",
+            inputs={"input1": 1.0},
+            outputs={"output1": 1.0},
+        ).insert(results_db_service=other_service)
+
+        # buckets are found once the check interval has passed
+        collection = results_db.get_collection("bucketed_other")
+        collection.bucketed_checked -= 60
+        documents = results_db_service.find(collection="bucketed_other", query=query)
+        assert len(documents) == 1
+
+        # collections are checked once per process without a check interval
+        mongodb_results_db.get_collection("bucketed_other").bucketed_checked -= 60
+        assert not unchecked_service.find(collection="bucketed_other", query=query)
+
 
 class TestResultsInsertMethods:
     @pytest.fixture(scope="class", autouse=True)
@@ -315,6 +1249,24 @@ class TestResultsInsertMethods:
 
         check_generic_result_equal(generic_result2, new_generic_obj)
 
+    @pytest.mark.usefixtures("generic_result_insert_by_method")
+    def test_load_lazy_result(self, generic_result2, results_db_service):
+        lazy_result = Result.load_from_query(
+            generic_result2.project_name,
+            {"unique_hash": generic_result2.unique_hash},
+            results_db_service=results_db_service,
+            lazy=True,
+        )
+        assert isinstance(lazy_result, LazyResult)
+        assert lazy_result.unique_hash == generic_result2.unique_hash
+        assert isinstance(
+            dict.__getitem__(lazy_result.outputs, "output2"), DeferredValue
+        )
+
+        check_generic_result_equal(generic_result2, lazy_result)
+        assert lazy_result.unique_rep() == generic_result2.unique_rep()
+        check_generic_result_equal(generic_result2, lazy_result.load())
+
     @pytest.fixture(scope="class")
     def impact_result_insert_by_method(self, impact_result2, results_db_service):
         impact_result2.insert(results_db_service=results_db_service)
@@ -331,3 +1283,199 @@ class TestResultsInsertMethods:
             results_db_service=results_db_service,
         )
         check_impact_result_equal(impact_result2, new_impact_obj)
+
+    def test_insert_many(self, results_db_service):
+        results = [
+            Result(
+                project_name=project_name,
+                flow_id="test_flow_insert_many",
+                inputs={"input1": float(i), "input2": np.arange(i)},
+                outputs={"output1": float(i)},
+            )
+            for i, project_name in enumerate(["generic", "generic", "insert_many"])
+        ]
+
+        report = Result.insert_many(results, results_db_service=results_db_service)
+        assert sorted(report.inserted) == [0, 1, 2]
+        assert not report.matched
+        assert not report.failed
+
+        report = Result.insert_many(results, results_db_service=results_db_service)
+        assert not report.inserted
+        assert report.matched == [0, 1, 2]
+
+    def test_insert_upsert(self, generic_result, results_db_service):
+        inserted_id = generic_result.insert(
+            results_db_service=results_db_service, upsert=True
+        )
+        assert inserted_id is not None
+
+
+class TestBlobStorage:
+    @pytest.fixture(scope="class")
+    def blob_results_db_service(
+        self,
+        mongodb_host,
+        mongodb_port,
+        mongodb_user,
+        mongodb_password,
+        mongodb_database,
+    ):
+        config = MongodbResultsDBConfig(
+            host=mongodb_host,
+            port=mongodb_port,
+            username=mongodb_user,
+            password=mongodb_password,
+            database=mongodb_database,
+            blob_threshold=1000,
+        )
+        return ResultsDBService(MongodbResultsDB(config))
+
+    @pytest.fixture(scope="class")
+    def blob_result(self, blob_results_db_service):
+        array = np.random.random(1000)
+        result = Result(
+            project_name="blobs_test",
+            flow_id="test_flow_id",
+            inputs={"input1": 2.0, "input2": array},
+            outputs={"output1": array, "output2": np.array([1, 2, 3])},
+        )
+        result.insert(results_db_service=blob_results_db_service)
+        return result
+
+    def test_blob_deduplication(self, blob_result, blob_results_db_service):
+        doc = blob_results_db_service.find(
+            collection=blob_result.project_name,
+            query={"unique_hash": blob_result.unique_hash},
+        )[0]
+
+        # identical payloads reference the same blob
+        input_ref = doc["inputs"]["input2"]["data"]
+        assert input_ref["key"] == doc["outputs"]["output1"]["data"]["key"]
+
+        # small payloads stay in the document
+        assert isinstance(doc["outputs"]["output2"]["data"], bytes)
+
+    def test_blob_lazy_load(self, blob_result, blob_results_db_service):
+        loaded = Result.load_from_query(
+            blob_result.project_name,
+            {"unique_hash": blob_result.unique_hash},
+            results_db_service=blob_results_db_service,
+        )
+        assert isinstance(dict.__getitem__(loaded.inputs, "input2"), DeferredValue)
+        assert np.array_equal(loaded.inputs["input2"], blob_result.inputs["input2"])
+
+
+class TestAttributeProjection:
+    @pytest.mark.parametrize(
+        ("attribute_index", "projection"),
+        [
+            (["outputs", "output1"], {"outputs.output1": True}),
+            (["outputs", "vehicle", 0, "car"], {"outputs.vehicle": {"$slice": [0, 1]}}),
+            (["flow_id"], {"flow_id": True}),
+        ],
+    )
+    def test_get_attribute_projection(self, attribute_index, projection):
+        assert get_attribute_projection(attribute_index) == {
+            "unique_hash": True,
+            **projection,
+        }
+
+    @pytest.fixture(scope="class")
+    def projection_results(self, results_db_service):
+        results = [
+            Result(
+                project_name="generic",
+                flow_id="test_flow_projection",
+                inputs={"input1": float(i)},
+                outputs={
+                    "output1": float(i),
+                    "output2": np.arange(5) * i,
+                    "output3": pd.DataFrame({"x": [0, 1, i]}),
+                    "output4": ["first", f"second{i}"],
+                },
+            )
+            for i in range(3)
+        ]
+        Result.insert_many(results, results_db_service=results_db_service)
+        return results
+
+    @pytest.mark.parametrize(
+        ("attribute_index", "expected"),
+        [
+            (["outputs", "output1"], [0.0, 1.0, 2.0]),
+            (["outputs", "output2", 2], [0, 2, 4]),
+            (["outputs", "output3", "x", 2], [0, 1, 2]),
+            (["outputs", "output4", -1], ["second0", "second1", "second2"]),
+            (["flow_id"], ["test_flow_projection"] * 3),
+        ],
+    )
+    def test_load_result_attributes(
+        self, projection_results, results_db_service, attribute_index, expected
+    ):
+        values = load_result_attributes(
+            [result.unique_rep() for result in projection_results],
+            attribute_index,
+            results_db_service=results_db_service,
+        )
+        assert values == expected
+
+    def test_load_result_attribute(self, projection_results, results_db_service):
+        result = projection_results[1]
+        value = load_result_attribute(
+            result.unique_rep(),
+            ["outputs", "output2"],
+            results_db_service=results_db_service,
+        )
+        assert np.array_equal(value, result.outputs["output2"])
+
+        with pytest.raises(KeyError):
+            load_result_attribute(
+                result.unique_rep(),
+                ["outputs", "missing"],
+                results_db_service=results_db_service,
+            )
+
+
+class TestResultsMirror:
+    def test_incremental_sync(self, results_db_service, tmp_path):
+        def get_result(i):
+            return Result(
+                project_name="mirror",
+                flow_id="test_flow_mirror",
+                inputs={"input1": float(i)},
+                outputs={"output1": float(i)},
+            )
+
+        Result.insert_many(
+            [get_result(i) for i in range(3)], results_db_service=results_db_service
+        )
+
+        mirror = ResultsMirror(str(tmp_path))
+        assert mirror.sync("mirror", "test_flow_mirror", results_db_service) == 3
+        assert mirror.sync("mirror", "test_flow_mirror", results_db_service) == 0
+
+        df = mirror.get_results_df("mirror", "test_flow_mirror", results_db_service)
+        assert sorted(df["inputs.input1"]) == [0.0, 1.0, 2.0]
+
+        Result.insert_many(
+            [get_result(i) for i in range(3, 5)], results_db_service=results_db_service
+        )
+        assert mirror.sync("mirror", "test_flow_mirror", results_db_service) == 2
+
+        df = mirror.get_results_df("mirror", "test_flow_mirror", results_db_service)
+        assert sorted(df["inputs.input1"]) == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+        # rebuilt from the mirror files
+        df = ResultsMirror(str(tmp_path)).get_results_df(
+            "mirror", "test_flow_mirror", results_db_service
+        )
+        assert len(df) == 5
+        assert df["id"].is_unique
+
+    def test_home_directory(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+
+        mirror = ResultsMirror("~/mirror")
+        document_path, _ = mirror._get_paths("mirror", "test_flow_mirror")
+        assert document_path.startswith(str(tmp_path / "mirror"))
@@ -2,13 +2,17 @@ import json
 from functools import partial
 from types import FunctionType, MethodType
 
+import numpy as np
+import pandas as pd
 import pytest
 from pydantic.json import custom_pydantic_encoder
 
 from lume_services.utils import (
     CallableModel,
+    fingerprint_dict,
     get_callable_from_string,
     JSON_ENCODERS,
+    legacy_fingerprint_dict,
     ObjLoader,
     validate_and_compose_signature,
 )
@@ -322,3 +326,45 @@ class TestObjLoader:
         json_encoder = partial(custom_pydantic_encoder, JSON_ENCODERS)
         serialized = json.dumps(loader, default=json_encoder)
         self.misc_class_loader_type.parse_raw(serialized)
+
+
+class TestFingerprintDict:
+    def test_key_order(self):
+        assert fingerprint_dict({"x": 1, "y": {"a": 1.0, "b": "c"}}) == (
+            fingerprint_dict({"y": {"b": "c", "a": 1.0}, "x": 1})
+        )
+
+    @pytest.mark.parametrize(
+        "first,second",
+        [
+            ({"x": 1}, {"x": 1.0}),
+            ({"x": "1"}, {"x": 1}),
+            ({"x": np.arange(6).reshape(2, 3)}, {"x": np.arange(6).reshape(3, 2)}),
+            ({"x": np.arange(3, dtype=np.int32)}, {"x": np.arange(3)}),
+            ({"x": ["a", "b"]}, {"x": ["ab"]}),
+        ],
+    )
+    def test_distinct_values(self, first, second):
+        assert fingerprint_dict(first) != fingerprint_dict(second)
+
+    def test_array_layout(self):
+        array = np.random.random((3, 4))
+        assert fingerprint_dict({"x": array}) == fingerprint_dict(
+            {"x": np.asfortranarray(array)}
+        )
+        assert fingerprint_dict({"x": array}) == fingerprint_dict(
+            {"x": array.astype(">f8")}
+        )
+
+    def test_dataframe(self):
+        df = pd.DataFrame({"x": [0, 1, 2], "y": ["a", "b", "c"]})
+        assert fingerprint_dict({"df": df}) == fingerprint_dict({"df": df.copy()})
+        assert fingerprint_dict({"df": df}) != fingerprint_dict(
+            {"df": df.assign(x=[0, 1, 3])}
+        )
+
+    def test_legacy(self):
+        dictionary = {"x": np.arange(3), "y": 1.0}
+        assert fingerprint_dict(dictionary, legacy=True) == legacy_fingerprint_dict(
+            dictionary
+        )
@@ -70,8 +70,97 @@ def get_jsonable_dict(dictionary: dict):
     return convert_array_values(dictionary)
 
 
-def fingerprint_dict(dictionary: dict):
-    """Create a hash for a dictionary
+def _update_fingerprint(hasher, value) -> None:
+    """Feed the canonical representation of a value to a hasher. Each value is
+    written as a type tag followed by its length-prefixed content, so distinct values
+    cannot produce the same byte stream. Dictionary keys are visited in sorted order
+    and array buffers are hashed directly along with their dtype and shape.
+
+    """
+
+    def update(tag: bytes, content: bytes) -> None:
+        hasher.update(tag + len(content).to_bytes(8, "little"))
+        hasher.update(content)
+
+    if value is None:
+        update(b"n", b"")
+
+    elif isinstance(value, (bool, np.bool_)):
+        update(b"t" if value else b"f", b"")
+
+    elif isinstance(value, (int, np.integer)):
+        update(b"i", str(int(value)).encode("utf-8"))
+
+    elif isinstance(value, (float, np.floating)):
+        update(b"r", float(value).hex().encode("utf-8"))
+
+    elif isinstance(value, (str,)):
+        update(b"s", value.encode("utf-8"))
+
+    elif isinstance(value, (bytes,)):
+        update(b"b", value)
+
+    elif isinstance(value, (dict,)):
+        items = sorted(value.items(), key=lambda item: str(item[0]))
+        update(b"d", len(items).to_bytes(8, "little"))
+        for key, item in items:
+            _update_fingerprint(hasher, key)
+            _update_fingerprint(hasher, item)
+
+    elif isinstance(value, (list, tuple)):
+        update(b"l", len(value).to_bytes(8, "little"))
+        for item in value:
+            _update_fingerprint(hasher, item)
+
+    elif isinstance(value, (np.ndarray,)):
+        if value.dtype.hasobject:
+            update(b"o", json.dumps(list(value.shape)).encode("utf-8"))
+            _update_fingerprint(hasher, value.ravel().tolist())
+
+        else:
+            # hash little endian, c ordered buffers so equal arrays match
+            dtype = value.dtype.newbyteorder("<")
+            value = np.ascontiguousarray(value, dtype=dtype)
+            update(b"a", json.dumps([dtype.str, value.shape]).encode("utf-8"))
+            update(b"B", value.reshape(-1).view(np.uint8))
+
+    elif isinstance(value, (pd.DataFrame,)):
+        update(b"p", json.dumps([str(dtype) for dtype in value.dtypes]).encode())
+        _update_fingerprint(hasher, value.columns.tolist())
+        _update_fingerprint(hasher, value.index.to_numpy())
+        for i in range(value.shape[1]):
+            _update_fingerprint(hasher, value.iloc[:, i].to_numpy())
+
+    # files are fingerprinted by their serialized representation
+    elif hasattr(value, "jsonable_dict"):
+        _update_fingerprint(hasher, value.jsonable_dict())
+
+    else:
+        update(b"j", json.dumps(value, default=str).encode("utf-8"))
+
+
+def fingerprint_dict(dictionary: dict, legacy: bool = False):
+    """Create a hash for a dictionary. The hash is computed from a canonical
+    representation of the dictionary, so it does not depend on key order and arrays
+    and DataFrames are hashed without conversion to python objects.
+
+    Args:
+        dictionary (dict): Dictionary for which to create a fingerprint hash.
+        legacy (bool): Whether to compute the md5 hash of the json representation
+            used by earlier versions. Use for matching hashes of existing data.
+
+    """
+    if legacy:
+        return legacy_fingerprint_dict(dictionary)
+
+    hasher = hashlib.blake2b(digest_size=16)
+    _update_fingerprint(hasher, dictionary)
+    return hasher.hexdigest()
+
+
+def legacy_fingerprint_dict(dictionary: dict):
+    """Create a hash for a dictionary from the md5 hash of its json representation,
+    as computed by earlier versions of fingerprint_dict.
 
     Args:
         dictionary (dict): Dictionary for which to create a fingerprint hash.
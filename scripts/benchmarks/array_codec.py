@@ -0,0 +1,77 @@
+"""Compare encode and decode throughput of the raw buffer numpy array codec against
+the legacy pickle encoding used by get_bson_dict. Timings include BSON encoding and
+decoding of the document holding the array.
+"""
+
+import pickle
+import time
+
+import bson
+import click
+import numpy as np
+from bson import Binary
+
+from lume_services.results.generic import get_bson_dict, load_db_dict
+
+
+def legacy_encode(dictionary: dict) -> dict:
+    return {
+        key: Binary(pickle.dumps(value, protocol=2))
+        for key, value in dictionary.items()
+    }
+
+
+def legacy_decode(dictionary: dict) -> dict:
+    return {key: pickle.loads(value) for key, value in dictionary.items()}
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+@click.command()
+@click.option("--repeat", default=5, type=int)
+def benchmark_array_codec(repeat):
+    sizes = [1e3, 1e4, 1e5, 1e6, 1e7, 1e8]
+
+    click.echo(f"{'size':>8} {'codec':>7} {'encode MB/s':>12} {'decode MB/s':>12}")
+    for size in sizes:
+        array = np.random.random(int(size) // 8)
+        megabytes = array.nbytes / 1e6
+        dictionary = {"array": array}
+
+        codecs = {
+            "pickle": (legacy_encode, legacy_decode),
+            "raw": (get_bson_dict, load_db_dict),
+        }
+
+        for name, (encode, decode) in codecs.items():
+            encoded = bson.encode(encode(dictionary))
+
+            encode_time = best_of(lambda: bson.encode(encode(dictionary)), repeat)
+            decode_time = best_of(lambda: decode(bson.decode(encoded)), repeat)
+
+            assert np.array_equal(decode(bson.decode(encoded))["array"], array)
+
+            click.echo(
+                f"{array.nbytes:>8.0e} {name:>7} {megabytes / encode_time:>12.1f} "
+                f"{megabytes / decode_time:>12.1f}"
+            )
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_array_codec)
+
+
+if __name__ == "__main__":
+    main()
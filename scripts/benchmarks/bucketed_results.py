@@ -0,0 +1,128 @@
+"""Compare stored size, index entries and decode time of small scalar results stored
+as one document per result and packed into bucket documents. Documents are encoded
+as stored by MongodbResultsDB.insert_many and MongodbResultsDB.insert_bucketed.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import bson
+import click
+
+from lume_services.results import Result
+
+
+def get_results(n_results: int, n_values: int, interval: float) -> list:
+    start = datetime(2022, 1, 1)
+    return [
+        Result(
+            project_name="benchmark",
+            flow_id="benchmark",
+            date_modified=start + timedelta(seconds=i * interval),
+            inputs={f"input{j}": float(i + j) for j in range(n_values)},
+            outputs={f"output{j}": float(i * j) for j in range(n_values)},
+        )
+        for i in range(n_results)
+    ]
+
+
+def get_documents(results: list) -> list:
+    documents = []
+    for result in results:
+        rep = result.get_db_dict()
+        rep.pop("collection")
+        rep["_id"] = bson.ObjectId()
+        documents.append(bson.encode(rep))
+
+    return documents
+
+
+def get_buckets(results: list, bucket_seconds: int, bucket_size: int) -> list:
+    windows = {}
+    for result in results:
+        timestamp = int(result.date_modified.timestamp())
+        windows.setdefault(timestamp - timestamp % bucket_seconds, []).append(result)
+
+    buckets = []
+    for window in windows.values():
+        for start in range(0, len(window), bucket_size):
+            chunk = window[start : start + bucket_size]
+            buckets.append(
+                bson.encode(
+                    {
+                        "_id": bson.ObjectId(),
+                        "flow_id": chunk[0].flow_id,
+                        "result_type_string": chunk[0].result_type_string,
+                        "bucket_start": chunk[0].date_modified,
+                        "columns": [
+                            f"{field}.{key}"
+                            for field in ["inputs", "outputs"]
+                            for key in getattr(chunk[0], field)
+                        ],
+                        "count": len(chunk),
+                        "start": chunk[0].date_modified,
+                        "end": chunk[-1].date_modified,
+                        "date_modified": [result.date_modified for result in chunk],
+                        "inputs": {
+                            key: [result.inputs[key] for result in chunk]
+                            for key in chunk[0].inputs
+                        },
+                        "outputs": {
+                            key: [result.outputs[key] for result in chunk]
+                            for key in chunk[0].outputs
+                        },
+                    }
+                )
+            )
+
+    return buckets
+
+
+def time_decode(encoded: list) -> float:
+    start = time.perf_counter()
+    for data in encoded:
+        bson.decode(data)
+
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--n_results", default=100000, type=int)
+@click.option("--n_values", default=2, type=int)
+@click.option("--interval", default=5.0, type=float, help="Seconds between results")
+@click.option("--bucket_seconds", default=86400, type=int)
+@click.option("--bucket_size", default=1000, type=int)
+def benchmark_bucketed_results(
+    n_results, n_values, interval, bucket_seconds, bucket_size
+):
+    results = get_results(n_results, n_values, interval)
+    documents = get_documents(results)
+    buckets = get_buckets(results, bucket_seconds, bucket_size)
+
+    click.echo(f"{n_results} results, {n_values} inputs and outputs per result")
+    click.echo(f"{'layout':>9} {'documents':>10} {'MB':>8} {'decode s':>9}")
+    for name, encoded in [("documents", documents), ("buckets", buckets)]:
+        size = sum(len(data) for data in encoded)
+        click.echo(
+            f"{name:>9} {len(encoded):>10} {size / 1e6:>8.1f} "
+            f"{time_decode(encoded):>9.2f}"
+        )
+
+    # the results layout indexes _id and unique_hash, buckets _id and the compound
+    # bucket lookup index
+    click.echo(
+        f"index entries: {2 * len(documents)} for documents, {2 * len(buckets)} for "
+        "buckets"
+    )
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_bucketed_results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare stored size and encode and decode throughput of result arrays for each
+supported compression codec. Timings include BSON encoding and decoding of the
+document holding the array.
+"""
+
+import time
+
+import bson
+import click
+import numpy as np
+
+from lume_services.results.generic import get_bson_dict, load_db_dict
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def get_arrays(n_values: int) -> dict:
+    """Sample arrays resembling simulation outputs."""
+    z = np.linspace(0, 10, n_values)
+    return {
+        "linspace": z,
+        "smooth": np.sin(z) * np.exp(-z / 5),
+        "integers": np.arange(n_values),
+        "particles": np.random.normal(size=n_values),
+        "rounded": np.round(np.random.random(n_values), 3),
+    }
+
+
+@click.command()
+@click.option("--n_values", default=1000000, type=int)
+@click.option("--repeat", default=5, type=int)
+def benchmark_compression(n_values, repeat):
+    codecs = [None, "zlib", "zstd", "lz4"]
+
+    click.echo(
+        f"{'array':>10} {'codec':>6} {'ratio':>7} {'encode MB/s':>12} "
+        f"{'decode MB/s':>12}"
+    )
+    for name, array in get_arrays(n_values).items():
+        megabytes = array.nbytes / 1e6
+        dictionary = {"array": array}
+
+        for compression in codecs:
+            encoded = bson.encode(get_bson_dict(dictionary, compression=compression))
+
+            encode_time = best_of(
+                lambda: bson.encode(get_bson_dict(dictionary, compression=compression)),
+                repeat,
+            )
+            decode_time = best_of(lambda: load_db_dict(bson.decode(encoded)), repeat)
+
+            assert np.array_equal(load_db_dict(bson.decode(encoded))["array"], array)
+
+            click.echo(
+                f"{name:>10} {str(compression):>6} "
+                f"{array.nbytes / len(encoded):>7.2f} "
+                f"{megabytes / encode_time:>12.1f} {megabytes / decode_time:>12.1f}"
+            )
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_compression)
+
+
+if __name__ == "__main__":
+    main()
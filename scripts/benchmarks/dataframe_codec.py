@@ -0,0 +1,70 @@
+"""Compare round trip time and encoded size of the columnar DataFrame codec against
+the json encoding. Timings include BSON encoding and decoding of the document holding
+the DataFrame.
+"""
+
+import time
+
+import bson
+import click
+import numpy as np
+import pandas as pd
+
+from lume_services.results.generic import encode_dataframe, load_db_dict
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+@click.command()
+@click.option("--repeat", default=3, type=int)
+def benchmark_dataframe_codec(repeat):
+    click.echo(
+        f"{'rows':>8} {'format':>8} {'size MB':>8} {'round trip s':>13} "
+        f"{'dtypes kept':>12}"
+    )
+
+    for n_rows in [1_000, 10_000, 100_000, 1_000_000]:
+        df = pd.DataFrame(
+            {
+                "x": np.random.random(n_rows),
+                "y": np.random.random(n_rows).astype(np.float32),
+                "step": np.arange(n_rows, dtype=np.int32),
+                "flag": np.random.random(n_rows) > 0.5,
+                "t": pd.date_range("2022-01-01", periods=n_rows, freq="s"),
+            }
+        )
+
+        for format in ["json", "columns"]:
+
+            def round_trip():
+                encoded = bson.encode({"df": encode_dataframe(df, format=format)})
+                return load_db_dict(bson.decode(encoded))["df"]
+
+            size = len(bson.encode({"df": encode_dataframe(df, format=format)})) / 1e6
+            elapsed = best_of(round_trip, repeat)
+            dtypes_kept = (round_trip().dtypes.values == df.dtypes.values).all()
+
+            click.echo(
+                f"{n_rows:>8} {format:>8} {size:>8.2f} {elapsed:>13.4f} "
+                f"{str(dtypes_kept):>12}"
+            )
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_dataframe_codec)
+
+
+if __name__ == "__main__":
+    main()
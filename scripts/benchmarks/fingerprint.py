@@ -0,0 +1,61 @@
+"""Compare the time for computing result hashes with the canonical fingerprint and
+the legacy json based fingerprint.
+"""
+
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from lume_services.utils import fingerprint_dict, legacy_fingerprint_dict
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+@click.command()
+@click.option("--repeat", default=3, type=int)
+def benchmark_fingerprint(repeat):
+    sizes = [1e3, 1e4, 1e5, 1e6, 1e7]
+
+    click.echo(f"{'size':>8} {'legacy ms':>10} {'canonical ms':>13} {'speedup':>8}")
+    for size in sizes:
+        n_values = int(size)
+        dictionary = {
+            "inputs": {"x": 1.0, "label": "scan"},
+            "outputs": {
+                "array": np.random.random(n_values),
+                "df": pd.DataFrame(
+                    {"x": np.arange(n_values // 10), "y": np.zeros(n_values // 10)}
+                ),
+            },
+            "flow_id": "flow",
+        }
+
+        legacy_time = best_of(lambda: legacy_fingerprint_dict(dictionary), repeat)
+        canonical_time = best_of(lambda: fingerprint_dict(dictionary), repeat)
+
+        click.echo(
+            f"{n_values:>8.0e} {legacy_time * 1e3:>10.2f} "
+            f"{canonical_time * 1e3:>13.2f} {legacy_time / canonical_time:>8.1f}"
+        )
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_fingerprint)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare the cost of listing results eagerly, lazily and by id only. Documents are
+held as raw BSON, as returned by the database cursor, so timings include decoding.
+"""
+
+import gc
+import time
+
+import bson
+import click
+import numpy as np
+import pandas as pd
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+from lume_services.results import LazyResult, Result
+
+
+def get_encoded_documents(n_results: int, n_values: int) -> list:
+    documents = []
+    for i in range(n_results):
+        result = Result(
+            project_name="benchmark",
+            flow_id="benchmark",
+            inputs={"x": float(i), "distgen:n_particle": 10000},
+            outputs={
+                "array": np.random.random(n_values),
+                "df": pd.DataFrame({"x": np.arange(n_values // 10)}),
+                "scalar": float(i),
+            },
+        )
+        rep = result.get_db_dict()
+        rep.pop("collection")
+        rep["_id"] = bson.ObjectId()
+
+        documents.append(bson.encode(rep))
+
+    return documents
+
+
+@click.command()
+@click.option("--n_results", default=10000, type=int)
+@click.option("--n_values", default=1000, type=int)
+def benchmark_lazy_results(n_results, n_values):
+    encoded = get_encoded_documents(n_results, n_values)
+    codec_options = CodecOptions(document_class=RawBSONDocument)
+
+    def list_ids(documents):
+        return [document["_id"] for document in documents]
+
+    def list_eager(documents):
+        results = []
+        for document in documents:
+            values = bson.decode(document.raw)
+            values.pop("result_type_string")
+            results.append(Result(project_name="benchmark", **values))
+
+        return [result.unique_hash for result in results]
+
+    def list_lazy(documents):
+        results = [LazyResult(document, "benchmark") for document in documents]
+        return [result.unique_hash for result in results]
+
+    def read_lazy_scalar(documents):
+        results = [LazyResult(document, "benchmark") for document in documents]
+        return [result.outputs["scalar"] for result in results]
+
+    click.echo(f"{n_results} results, {n_values} values per array")
+    for name, fn in [
+        ("ids", list_ids),
+        ("eager", list_eager),
+        ("lazy", list_lazy),
+        ("lazy scalar", read_lazy_scalar),
+    ]:
+        # raw documents cache their decoded fields, so each run gets new ones
+        documents = [
+            RawBSONDocument(data, codec_options=codec_options) for data in encoded
+        ]
+
+        gc.collect()
+
+        start = time.perf_counter()
+        fn(documents)
+        click.echo(f"{name:>12}: {time.perf_counter() - start:.3f}s")
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_lazy_results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare per-call latency of scoped and pooled MongodbResultsDB clients.
+
+Requires a running MongoDB instance, for example the one started with
+`lume-services docker start-services`.
+"""
+
+import time
+import statistics
+import click
+
+from lume_services.services.results import MongodbResultsDB, MongodbResultsDBConfig
+
+
+def time_calls(results_db: MongodbResultsDB, collection: str, n_calls: int) -> dict:
+    """Time insert_one and find calls against the results database.
+
+    Returns:
+        dict: Mapping of operation name to list of per-call latencies in ms.
+
+    """
+    latencies = {"insert_one": [], "find": []}
+
+    for i in range(n_calls):
+        start = time.perf_counter()
+        results_db.insert_one(collection, call=i, value=float(i))
+        latencies["insert_one"].append((time.perf_counter() - start) * 1e3)
+
+        start = time.perf_counter()
+        results_db.find(collection, query={"call": i})
+        latencies["find"].append((time.perf_counter() - start) * 1e3)
+
+    return latencies
+
+
+def summarize(latencies: list) -> str:
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    return (
+        f"mean={statistics.mean(latencies):.2f}ms "
+        f"median={statistics.median(latencies):.2f}ms p95={p95:.2f}ms"
+    )
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", type=str)
+@click.option("--port", default=27017, type=int)
+@click.option("--username", default="root", type=str)
+@click.option("--password", default="password", type=str)
+@click.option("--database", default="benchmark", type=str)
+@click.option("--n_calls", default=1000, type=int)
+@click.option("--pool_size", default=10, type=int)
+def benchmark_client_modes(
+    host, port, username, password, database, n_calls, pool_size
+):
+    collection = "client_mode_benchmark"
+
+    for pooled in [False, True]:
+        config = MongodbResultsDBConfig(
+            host=host,
+            port=port,
+            username=username,
+            password=password,
+            database=database,
+            pooled=pooled,
+            maxPoolSize=pool_size,
+            minPoolSize=1 if pooled else 0,
+        )
+        results_db = MongodbResultsDB(config)
+        # warms up the pool in pooled mode
+        results_db.configure({})
+
+        latencies = time_calls(results_db, collection, n_calls)
+
+        mode = "pooled" if pooled else "scoped"
+        for operation, values in latencies.items():
+            click.echo(f"{mode:>6} {operation:>10}: {summarize(values)}")
+
+        with results_db.client() as client:
+            client.drop_database(database)
+
+        results_db.close()
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_client_modes)
+
+
+if __name__ == "__main__":
+    main()
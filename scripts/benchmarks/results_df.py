@@ -0,0 +1,94 @@
+"""Compare time and peak memory of building a results DataFrame through Result
+objects, as Model.get_results_df did, and by streaming documents into columns.
+Documents are decoded from BSON, as returned by the database cursor.
+"""
+
+import gc
+import time
+import tracemalloc
+
+import bson
+import click
+import pandas as pd
+
+from lume_services.results import Result
+from lume_services.results.utils import get_results_df_from_documents
+from lume_services.utils import flatten_dict
+
+
+def get_encoded_documents(n_results: int, n_values: int) -> list:
+    documents = []
+    for i in range(n_results):
+        result = Result(
+            project_name="benchmark",
+            flow_id="benchmark",
+            inputs={f"input{j}": float(i + j) for j in range(n_values)},
+            outputs={
+                **{f"output{j}": float(i * j) for j in range(n_values)},
+                "label": f"result {i}",
+            },
+        )
+        rep = result.get_db_dict()
+        rep.pop("collection")
+        rep["_id"] = bson.ObjectId()
+
+        documents.append(bson.encode(rep))
+
+    return documents
+
+
+def measure(fn) -> tuple:
+    """Time a run, then trace the peak memory of a second run, as tracing slows
+    down allocations.
+
+    """
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+
+@click.command()
+@click.option("--n_results", default=100000, type=int)
+@click.option("--n_values", default=5, type=int)
+def benchmark_results_df(n_results, n_values):
+    encoded = get_encoded_documents(n_results, n_values)
+
+    def results_df():
+        results = []
+        for document in [bson.decode(data) for data in encoded]:
+            document.pop("result_type_string")
+            results.append(Result(project_name="benchmark", **document))
+
+        return pd.DataFrame([flatten_dict(result.dict()) for result in results])
+
+    def columnar_df():
+        return get_results_df_from_documents(
+            ("benchmark", bson.decode(data)) for data in encoded
+        )
+
+    click.echo(f"{n_results} results, {n_values} inputs and outputs per result")
+    click.echo(f"{'path':>9} {'time s':>8} {'peak MB':>8}")
+    for name, fn in [("results", results_df), ("columnar", columnar_df)]:
+        elapsed, peak = measure(fn)
+        click.echo(f"{name:>9} {elapsed:>8.2f} {peak / 1e6:>8.1f}")
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_results_df)
+
+
+if __name__ == "__main__":
+    main()
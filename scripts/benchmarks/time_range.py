@@ -0,0 +1,144 @@
+"""Compare time-window queries of a flow's results before and after the compound
+flow_id/date_modified index declared in the secondary indices of Result and created
+by Result.configure.
+
+Requires a running MongoDB instance, for example the one started with
+`lume-services docker start-services`.
+"""
+
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import click
+
+from lume_services.results import Result
+from lume_services.services.results import (
+    MongodbResultsDB,
+    MongodbResultsDBConfig,
+    ResultsDBService,
+)
+
+
+def time_queries(fn, n_queries: int) -> float:
+    """Get the median latency of repeated queries in ms."""
+    latencies = []
+    for _ in range(n_queries):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1e3)
+
+    return statistics.median(latencies)
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", type=str)
+@click.option("--port", default=27017, type=int)
+@click.option("--username", default="root", type=str)
+@click.option("--password", default="password", type=str)
+@click.option("--database", default="benchmark", type=str)
+@click.option("--n_results", default=200000, type=int)
+@click.option("--n_flows", default=20, type=int)
+@click.option("--window_hours", default=8, type=int)
+@click.option("--n_queries", default=20, type=int)
+def benchmark_time_range(
+    host,
+    port,
+    username,
+    password,
+    database,
+    n_results,
+    n_flows,
+    window_hours,
+    n_queries,
+):
+    collection = "time_range_benchmark"
+    config = MongodbResultsDBConfig(
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        database=database,
+        pooled=True,
+    )
+    results_db = MongodbResultsDB(config)
+    results_db_service = ResultsDBService(results_db)
+
+    with results_db.client() as client:
+        client[database].drop_collection(collection)
+
+    # one result per minute and flow
+    start = datetime(2022, 1, 1)
+    for batch_start in range(0, n_results, 10000):
+        Result.insert_many(
+            [
+                Result(
+                    project_name=collection,
+                    flow_id=f"flow{i % n_flows}",
+                    date_modified=start + timedelta(minutes=i // n_flows),
+                    inputs={"input1": float(i)},
+                    outputs={"output1": float(i)},
+                )
+                for i in range(batch_start, min(batch_start + 10000, n_results))
+            ],
+            results_db_service=results_db_service,
+        )
+
+    window_start = start + timedelta(minutes=n_results // n_flows // 2)
+    window_end = window_start + timedelta(hours=window_hours)
+    query = {
+        "flow_id": "flow0",
+        "date_modified": {"$gte": window_start, "$lt": window_end},
+    }
+
+    def explain() -> dict:
+        with results_db.client() as client:
+            stats = client[database][collection].find(query).explain()
+        return stats["executionStats"]
+
+    click.echo(f"{n_results} results of {n_flows} flows, {window_hours} h window")
+    click.echo(f"{'query':>10} {'median ms':>10} {'examined':>9} {'returned':>9}")
+
+    # before: no time index
+    elapsed = time_queries(
+        lambda: results_db_service.find(collection=collection, query=query), n_queries
+    )
+    stats = explain()
+    click.echo(
+        f"{'find':>10} {elapsed:>10.2f} {stats['totalDocsExamined']:>9} "
+        f"{stats['nReturned']:>9}"
+    )
+
+    # after: time index created as on startup
+    Result.configure(collection, results_db_service=results_db_service)
+    elapsed = time_queries(
+        lambda: results_db_service.find_time_range(
+            collection=collection,
+            start=window_start,
+            end=window_end,
+            query={"flow_id": "flow0"},
+        ),
+        n_queries,
+    )
+    stats = explain()
+    click.echo(
+        f"{'time_range':>10} {elapsed:>10.2f} {stats['totalDocsExamined']:>9} "
+        f"{stats['nReturned']:>9}"
+    )
+
+    with results_db.client() as client:
+        client[database].drop_collection(collection)
+
+    results_db.close()
+
+
+@click.group()
+def main():
+    pass
+
+
+main.add_command(benchmark_time_range)
+
+
+if __name__ == "__main__":
+    main()